@@ -2,32 +2,86 @@
 
 # Language Configuration (No hardcoding!)
 # To add new language, just add here with Twilio codes
+# "tts_deadline_seconds": how long a turn waits for ElevenLabs before using the Twilio voice
 LANGUAGE_CONFIG = {
     "English": {
         "twilio_code": "en-US",
-        "twilio_voice": "Polly.Joanna-Neural"
+        "twilio_voice": "Polly.Joanna-Neural",
+        "tts_deadline_seconds": 1.5
     },
     "Tamil": {
         "twilio_code": "ta-IN",
-        "twilio_voice": "Polly.Aditi-Neural"
+        "twilio_voice": "Polly.Aditi-Neural",
+        "tts_deadline_seconds": 2.0
     },
     "Malayalam": {
         "twilio_code": "ml-IN",
-        "twilio_voice": "Polly.Aditi-Neural"
+        "twilio_voice": "Polly.Aditi-Neural",
+        "tts_deadline_seconds": 2.0
     }
     # To add more languages (e.g., Hindi):
     # "Hindi": {
     #     "twilio_code": "hi-IN",
-    #     "twilio_voice": "Polly.Aditi-Neural"
+    #     "twilio_voice": "Polly.Aditi-Neural",
+    #     "tts_deadline_seconds": 2.0
     # }
 }
 
+# Local slot extraction patterns (see slot_extractor.py)
+CURRENCY_PATTERNS = [
+    r"(?:₹|\$|\brs\.?|\binr)\s?\d(?:[\d,]*\d)?(?:\.\d+)?",
+    r"\b\d(?:[\d,]*\d)?(?:\.\d+)?\s?(?:rupees?|rs\b\.?|inr\b|dollars?|usd\b)"
+]
+
+TIME_PATTERNS = [
+    r"(?:\b(?:today|tomorrow|tonight)\s+(?:at\s+|by\s+|around\s+)?)?\b\d{1,2}(?::\d{2})?\s?[ap]\.?m\b\.?(?:\s+(?:today|tomorrow))?",
+    r"(?:\b(?:today|tomorrow)\s+(?:at\s+|by\s+)?)?\b\d{1,2}:\d{2}\b(?!\s?[ap]\.?m\b)"
+]
+
 AGENT_METADATA = {
     "PIZZA": {
         "system_prompt": """You are an AI assistant for a Pizza delivery service. 
 Extract: pizza_type, size, delivery_address, delivery_time.
 Be friendly and professional.""",
         
+        # Information to collect (slot name -> what the LLM should extract)
+        # "extract" (optional) lets simple replies be matched locally without the LLM
+        "slots": {
+            "pizza_type": {
+                "description": "extracted pizza type",
+                "extract": {
+                    "kind": "choices",
+                    "choices": {
+                        "Margherita": ["margherita", "margarita"],
+                        "Pepperoni": ["pepperoni"],
+                        "Veggie": ["veggie", "vegetarian", "veg"],
+                        "BBQ Chicken": ["bbq chicken", "barbecue chicken"],
+                        "Hawaiian": ["hawaiian"],
+                        "Paneer Tikka": ["paneer tikka", "paneer"]
+                    }
+                }
+            },
+            "size": {
+                "description": "extracted size",
+                "extract": {
+                    "kind": "choices",
+                    "choices": {
+                        "small": ["small"],
+                        "medium": ["medium", "regular"],
+                        "large": ["large", "big"]
+                    }
+                }
+            },
+            "delivery_address": {"description": "extracted address"},
+            "delivery_time": {
+                "description": "extracted delivery time",
+                "extract": {"kind": "regex", "patterns": TIME_PATTERNS}
+            }
+        },
+        
+        # Slots that must be filled before the order is read back for confirmation
+        "required_slots": ["pizza_type", "size", "delivery_address", "delivery_time"],
+        
         "positive_thank_you_msg": "Thank you for your order! Your pizza will be delivered soon.",
         
         "negative_thank_you_msg": "No problem! Call us back anytime.",
@@ -56,6 +110,20 @@ Be friendly and professional.""",
             "Malayalam": "മനസ്സിലായില്ല. വിവരങ്ങൾ ശരിയാണെങ്കിൽ 'അതെ' എന്ന് പറയുക, അല്ലെങ്കിൽ മാറ്റാൻ ആഗ്രഹിക്കുന്നുവെങ്കിൽ 'ഇല്ല' എന്ന് പറയുക."
         },
         
+        # Said when the turn budget runs out before the reply is ready
+        "reprompt_msg": {
+            "English": "Sorry for the delay. Could you please say that again?",
+            "Tamil": "தாமதத்திற்கு மன்னிக்கவும். தயவுசெய்து மீண்டும் சொல்லுங்கள்.",
+            "Malayalam": "വൈകിയതിൽ ക്ഷമിക്കണം. ദയവായി ഒന്നുകൂടി പറയാമോ?"
+        },
+        
+        # Latency budget per turn in seconds (per stage, "default" for the rest)
+        "turn_budget_seconds": {
+            "collecting": 8,
+            "confirmation": 4,
+            "default": 5
+        },
+        
         "language_selection": ["English", "Tamil", "Malayalam"]  # Multi-language enabled
     },
     
@@ -64,6 +132,21 @@ Be friendly and professional.""",
 Extract: charges (with currency), availability_time.
 Be professional and efficient.""",
         
+        # Information to collect (slot name -> what the LLM should extract)
+        "slots": {
+            "charge": {
+                "description": "extracted charge",
+                "extract": {"kind": "regex", "patterns": CURRENCY_PATTERNS}
+            },
+            "availability_time": {
+                "description": "extracted time",
+                "extract": {"kind": "regex", "patterns": TIME_PATTERNS}
+            }
+        },
+        
+        # Slots that must be filled before the details are read back for confirmation
+        "required_slots": ["charge", "availability_time"],
+        
         "positive_thank_you_msg": "Thank you! Your information has been updated in our ERP system.",
         
         "negative_thank_you_msg": "Thank you for your time. Please call back when ready.",
@@ -92,6 +175,21 @@ Be professional and efficient.""",
             "Malayalam": "മനസ്സിലായില്ല. വിവരങ്ങൾ ശരിയാണെങ്കിൽ 'അതെ' എന്ന് പറയുക, അല്ലെങ്കിൽ മാറ്റാൻ ആഗ്രഹിക്കുന്നുവെങ്കിൽ 'ഇല്ല' എന്ന് പറയുക."
         },
         
+        # Said when the turn budget runs out before the reply is ready
+        "reprompt_msg": {
+            "English": "Sorry for the delay. Could you please say that again?",
+            "Tamil": "தாமதத்திற்கு மன்னிக்கவும். தயவுசெய்து மீண்டும் சொல்லுங்கள்.",
+            "Malayalam": "വൈകിയതിൽ ക്ഷമിക്കണം. ദയവായി ഒന്നുകൂടി പറയാമോ?"
+        },
+        
+        # Latency budget per turn in seconds (per stage, "default" for the rest)
+        "turn_budget_seconds": {
+            "welcome": 6,
+            "collecting": 6,
+            "confirmation": 4,
+            "default": 5
+        },
+        
         "language_selection": ["English"]  # Single language (optional selection disabled)
         # To enable multi-language, add more: ["English", "Tamil", "Malayalam"]
     }
@@ -3,33 +3,18 @@ Multi-Agent Conversational LLM
 Based on agent_config.py - Supports PIZZA, LOGISTICS, and more
 """
 
-from pydantic import BaseModel, Field
-from typing import Optional, Literal, Dict, Any
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
-from agent_config import AGENT_METADATA
 from dotenv import load_dotenv
-import os
-import json
 
+# Load .env before the local modules below read their settings
 load_dotenv()
 
-
-class LLMOutput(BaseModel):
-    """Structured output from LLM"""
-    response_type: Literal['THANK_YOU_RESPONSE', 'HANDOVER_TO_HUMAN', 'NEED_MORE_INFO']
-    
-    # LOGISTICS fields
-    charge: Optional[str] = None
-    availability_time: Optional[str] = None
-    
-    # PIZZA fields
-    pizza_type: Optional[str] = None
-    size: Optional[str] = None
-    delivery_address: Optional[str] = None
-    delivery_time: Optional[str] = None
-    
-    feedback: str
+from agent_config import AGENT_METADATA
+from model_router import model_router
+from json_stream import parse_llm_reply
+from agent_registry import LLMOutput, get_agent_profile
+import json
+import asyncio
 
 
 class AgentConversation:
@@ -43,68 +28,12 @@ class AgentConversation:
         self.language = language
         self.agent_config = AGENT_METADATA[agent_type]
         
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash",
-            google_api_key=os.getenv("GEMINI_API_KEY"),
-            temperature=0.7
-        )
-        
         self.conversation_history = []
         self.collected_data = {}
         
-        # Build system prompt from agent config
-        self.system_prompt = self._build_system_prompt()
-    
-    def _build_system_prompt(self) -> str:
-        """Build system prompt based on agent type"""
-        
-        base_prompt = self.agent_config["system_prompt"]
-        
-        # Add conversational instructions
-        conversational_prompt = f"""
-{base_prompt}
-
-CONVERSATION STYLE:
-- Be natural, friendly, and conversational
-- Adapt to user's responses
-- Handle questions, greetings, confusion naturally
-- Guide conversation to collect required information
-- Be patient and understanding
-- If user wants human, transfer them
-
-RESPONSE FORMAT (JSON):
-{{
-  "response_type": "THANK_YOU_RESPONSE" | "NEED_MORE_INFO" | "HANDOVER_TO_HUMAN",
-"""
-        
-        # Add fields based on agent type
-        if self.agent_type == "LOGISTICS":
-            conversational_prompt += """
-  "charge": "extracted charge or null",
-  "availability_time": "extracted time or null",
-"""
-        elif self.agent_type == "PIZZA":
-            conversational_prompt += """
-  "pizza_type": "extracted pizza type or null",
-  "size": "extracted size or null",
-  "delivery_address": "extracted address or null",
-  "delivery_time": "extracted delivery time or null",
-"""
-        
-        conversational_prompt += """
-  "feedback": "Your natural conversational response"
-}
-
-CRITICAL RULES:
-1. ALWAYS return ONLY valid JSON - no extra text before or after
-2. When you have ALL required information → response_type = "THANK_YOU_RESPONSE"
-3. When missing information → response_type = "NEED_MORE_INFO", ask naturally
-4. When user wants human → response_type = "HANDOVER_TO_HUMAN"
-5. If user is confused, explain clearly in feedback
-
-IMPORTANT: Your entire response must be ONLY the JSON object, nothing else!"""
-        
-        return conversational_prompt
+        # Precompiled prompt and response model from the agent registry
+        self.profile = get_agent_profile(agent_type)
+        self.system_prompt = self.profile.system_prompt
     
     def start_conversation(self):
         """Start the conversation"""
@@ -131,8 +60,8 @@ IMPORTANT: Your entire response must be ONLY the JSON object, nothing else!"""
             "content": welcome_msg
         })
     
-    def process_user_input(self, user_input: str) -> LLMOutput:
-        """Process user input and get AI response"""
+    async def process_user_input(self, user_input: str) -> LLMOutput:
+        """Process user input and get AI response (runs on the shared async engine)"""
         
         # Add user message to history
         self.conversation_history.append({
@@ -140,6 +69,15 @@ IMPORTANT: Your entire response must be ONLY the JSON object, nothing else!"""
             "content": user_input
         })
         
+        # Match slots locally first; the LLM is skipped when every slot is resolved
+        llm_output = self.profile.extract_slots(user_input, self.collected_data)
+        if llm_output:
+            self.conversation_history.append({
+                "role": "assistant",
+                "content": llm_output.feedback
+            })
+            return llm_output
+        
         # Build messages for LLM
         messages = [SystemMessage(content=self.system_prompt)]
         
@@ -154,55 +92,28 @@ IMPORTANT: Your entire response must be ONLY the JSON object, nothing else!"""
         context = f"\nCurrent collected data: {json.dumps(self.collected_data)}"
         messages.append(HumanMessage(content=context))
         
-        # Call LLM
-        response = self.llm.invoke(messages)
-        
-        # Parse JSON response
-        content = response.content.strip()
+        # Call LLM (fast or main tier, shared pooled clients)
+        response, tier = await model_router.ainvoke(messages, user_input, self.profile, self.collected_data, **self.profile.llm_kwargs)
         
-        # Remove markdown code blocks if present
-        if content.startswith('```json'):
-            content = content.replace('```json', '').replace('```', '').strip()
-        elif content.startswith('```'):
-            content = content.replace('```', '').strip()
+        # Parse JSON response in one pass (tolerates code fences and leading text)
+        result_dict = parse_llm_reply(response.content)
         
-        # Try to find JSON in the response
-        try:
-            # Try direct parsing
-            result_dict = json.loads(content)
-        except json.JSONDecodeError:
-            # Try to extract JSON from text
-            import re
-            json_match = re.search(r'\{.*\}', content, re.DOTALL)
-            if json_match:
-                result_dict = json.loads(json_match.group())
-            else:
-                # Fallback: Create a default response
-                result_dict = {
-                    "response_type": "NEED_MORE_INFO",
-                    "charge": None,
-                    "availability_time": None,
-                    "feedback": content if content else "Could you please provide the shipment charge and availability time?"
-                }
+        if result_dict is None:
+            # Fallback: Create a default response
+            content = response.content.strip()
+            result_dict = {
+                "response_type": "NEED_MORE_INFO",
+                "feedback": content if content else "Could you please provide the shipment charge and availability time?"
+            }
         
-        llm_output = LLMOutput(**result_dict)
+        llm_output = self.profile.validate_output(result_dict)
         
-        # Update collected data based on agent type
-        if self.agent_type == "LOGISTICS":
-            if llm_output.charge:
-                self.collected_data["charge"] = llm_output.charge
-            if llm_output.availability_time:
-                self.collected_data["availability_time"] = llm_output.availability_time
+        # Update collected data from the agent's slots
+        self.profile.merge_slots(llm_output, self.collected_data)
         
-        elif self.agent_type == "PIZZA":
-            if llm_output.pizza_type:
-                self.collected_data["pizza_type"] = llm_output.pizza_type
-            if llm_output.size:
-                self.collected_data["size"] = llm_output.size
-            if llm_output.delivery_address:
-                self.collected_data["delivery_address"] = llm_output.delivery_address
-            if llm_output.delivery_time:
-                self.collected_data["delivery_time"] = llm_output.delivery_time
+        # Every required slot is filled - finish without waiting for the model's verdict
+        if llm_output.response_type == "NEED_MORE_INFO" and self.profile.is_complete(self.collected_data):
+            llm_output = llm_output.model_copy(update={"response_type": "THANK_YOU_RESPONSE"})
         
         # Add AI response to history
         self.conversation_history.append({
@@ -221,7 +132,7 @@ IMPORTANT: Your entire response must be ONLY the JSON object, nothing else!"""
                 print(f"   {emoji} {key.replace('_', ' ').title()}: {value}")
             print()
     
-    def run_conversation(self):
+    async def run_conversation(self):
         """Run the full conversation"""
         
         self.start_conversation()
@@ -240,7 +151,7 @@ IMPORTANT: Your entire response must be ONLY the JSON object, nothing else!"""
             
             try:
                 # Process with LLM
-                result = self.process_user_input(user_input)
+                result = await self.process_user_input(user_input)
                 
                 # Display AI response
                 print(f"🤖 AI: {result.feedback}")
@@ -267,14 +178,8 @@ IMPORTANT: Your entire response must be ONLY the JSON object, nothing else!"""
                     }
                     
                     # Add agent-specific fields
-                    if self.agent_type == "LOGISTICS":
-                        final_response["charge"] = result.charge
-                        final_response["availability_time"] = result.availability_time
-                    elif self.agent_type == "PIZZA":
-                        final_response["pizza_type"] = result.pizza_type
-                        final_response["size"] = result.size
-                        final_response["delivery_address"] = result.delivery_address
-                        final_response["delivery_time"] = result.delivery_time
+                    for slot_name in self.profile.slots:
+                        final_response[slot_name] = getattr(result, slot_name)
                     
                     print("📄 Final Response (JSON):")
                     print(json.dumps(final_response, indent=2))
@@ -325,7 +230,7 @@ def main():
     
     # Start conversation
     conversation = AgentConversation(agent_type=agent_type, language="English")
-    conversation.run_conversation()
+    asyncio.run(conversation.run_conversation())
     
     print()
     print("=" * 70)
@@ -0,0 +1,202 @@
+"""
+Agent Registry
+Precompiled per-agent prompt, response schema, templates and slots.
+Built once at startup from AGENT_METADATA; sessions only keep the agent_type reference.
+"""
+
+import os
+import logging
+from string import Formatter
+from typing import Any, Dict, List, Literal, Optional, Type
+from pydantic import BaseModel, create_model
+from agent_config import AGENT_METADATA
+from slot_extractor import SlotExtractor, extraction_stats
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_TYPES = ["THANK_YOU_RESPONSE", "NEED_MORE_INFO", "HANDOVER_TO_HUMAN"]
+
+# Use Gemini's native JSON mode with the agent's response schema
+GEMINI_JSON_MODE = os.getenv("GEMINI_JSON_MODE", "true").lower() == "true"
+
+# Skip the LLM when local extraction resolves every slot
+SLOT_FAST_PATH = os.getenv("SLOT_FAST_PATH", "true").lower() == "true"
+
+# History entry for turns answered without the LLM (the caller hears the confirmation message)
+FAST_PATH_FEEDBACK = "Thank you, I have all the details."
+
+
+class LLMOutput(BaseModel):
+    """Structured output from LLM (base of the per-agent response models)"""
+    response_type: Literal['THANK_YOU_RESPONSE', 'HANDOVER_TO_HUMAN', 'NEED_MORE_INFO']
+    feedback: str
+
+
+def build_system_prompt(agent_config: Dict[str, Any]) -> str:
+    """Build system prompt based on agent config"""
+
+    base_prompt = agent_config["system_prompt"]
+
+    # Add conversational instructions
+    conversational_prompt = f"""
+{base_prompt}
+
+CONVERSATION STYLE:
+- Be natural, friendly, and conversational
+- Adapt to user's responses
+- Handle questions, greetings, confusion naturally
+- Guide conversation to collect required information
+- Be patient and understanding
+- If user wants human, transfer them
+
+RESPONSE FORMAT (JSON):
+{{
+  "response_type": "THANK_YOU_RESPONSE" | "NEED_MORE_INFO" | "HANDOVER_TO_HUMAN",
+"""
+
+    # Add fields from the agent's slot declaration
+    conversational_prompt += "\n"
+    for slot_name, slot_config in agent_config.get("slots", {}).items():
+        conversational_prompt += f'  "{slot_name}": "{slot_config["description"]} or null",\n'
+
+    conversational_prompt += """
+  "feedback": "Your natural conversational response"
+}
+
+CRITICAL RULES:
+1. ALWAYS return ONLY valid JSON - no extra text before or after
+2. When you have ALL required information → response_type = "THANK_YOU_RESPONSE"
+3. When missing information → response_type = "NEED_MORE_INFO", ask naturally
+4. When user wants human → response_type = "HANDOVER_TO_HUMAN"
+5. If user is confused, explain clearly in feedback
+
+IMPORTANT: Your entire response must be ONLY the JSON object, nothing else!"""
+
+    return conversational_prompt
+
+
+def build_response_schema(slots: List[str]) -> Dict[str, Any]:
+    """Build Gemini response schema of the LLM reply for an agent's slots"""
+    properties = {"response_type": {"type": "STRING", "format": "enum", "enum": RESPONSE_TYPES}}
+    for slot_name in slots:
+        properties[slot_name] = {"type": "STRING", "nullable": True}
+    properties["feedback"] = {"type": "STRING"}
+
+    return {
+        "type": "OBJECT",
+        "properties": properties,
+        "required": ["response_type", "feedback"]
+    }
+
+
+def build_response_model(agent_type: str, slots: List[str]) -> Type[LLMOutput]:
+    """Generate the Pydantic response model of an agent from its slots"""
+    slot_fields = {slot_name: (Optional[str], None) for slot_name in slots}
+    return create_model(f"{agent_type.title()}Output", __base__=LLMOutput, **slot_fields)
+
+
+class AgentProfile:
+    """Precompiled, read-only configuration of one agent"""
+
+    def __init__(self, agent_type: str, agent_config: Dict[str, Any]):
+        self.agent_type = agent_type
+        self.config = agent_config
+        self.slots: List[str] = list(agent_config.get("slots", {}).keys())
+        self.system_prompt = build_system_prompt(agent_config)
+        self.response_schema = build_response_schema(self.slots)
+        self.response_model = build_response_model(agent_type, self.slots)
+        self.required_slots: List[str] = list(agent_config.get("required_slots", self.slots))
+        self.confirmation_templates: Dict[str, str] = agent_config.get("confirmation_msg", {})
+        self._check_config()
+        self.slot_extractor = SlotExtractor(agent_config.get("slots", {}))
+
+        # Extra LLM call arguments (native JSON mode)
+        self.llm_kwargs: Dict[str, Any] = {}
+        self.stream_llm_kwargs: Dict[str, Any] = {}
+        if GEMINI_JSON_MODE:
+            self.llm_kwargs["generation_config"] = {
+                "response_mime_type": "application/json",
+                "response_schema": self.response_schema
+            }
+            # Gemini emits schema properties alphabetically (feedback before response_type);
+            # streamed turns need the prompt's order, so they only ask for JSON
+            self.stream_llm_kwargs["generation_config"] = {"response_mime_type": "application/json"}
+
+    def _check_config(self):
+        """Fail at startup if required slots or template placeholders name unknown slots"""
+        unknown = [slot_name for slot_name in self.required_slots if slot_name not in self.slots]
+        if unknown:
+            raise ValueError(f"{self.agent_type}: required_slots not declared in slots: {unknown}")
+
+        for language, template in self.confirmation_templates.items():
+            placeholders = {field for _, field, _, _ in Formatter().parse(template) if field}
+            unknown = sorted(placeholders - set(self.slots))
+            if unknown:
+                raise ValueError(f"{self.agent_type}: confirmation_msg[{language}] uses undeclared slots: {unknown}")
+
+    def is_complete(self, collected_data: Dict[str, Any]) -> bool:
+        """Whether every required slot has a value"""
+        return all(collected_data.get(slot_name) for slot_name in self.required_slots)
+
+    def would_complete(self, collected_data: Dict[str, Any], result_fields: Dict[str, Any]) -> bool:
+        """Whether merging a (partially) parsed LLM reply would fill every required slot"""
+        merged = dict(collected_data)
+        merged.update({key: value for key, value in result_fields.items() if key in self.slots and value})
+        return self.is_complete(merged)
+
+    def render_confirmation(self, collected_data: Dict[str, Any], language: str) -> Optional[str]:
+        """Fill the confirmation template for a language (None if not configured)"""
+        template = self.confirmation_templates.get(language)
+        if not template:
+            return None
+        return template.format(**self.confirmation_values(collected_data))
+
+    def confirmation_values(self, collected_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Values the confirmation template is filled with (missing slots read "not provided")"""
+        return {slot_name: collected_data.get(slot_name) or "not provided" for slot_name in self.slots}
+
+    def validate_output(self, result_dict: Dict[str, Any]) -> LLMOutput:
+        """Validate a parsed LLM reply against the agent's response model"""
+        return self.response_model.model_validate(result_dict)
+
+    def merge_slots(self, llm_output: LLMOutput, collected_data: Dict[str, Any]):
+        """Copy the slot values the LLM extracted into collected data"""
+        for slot_name in self.slots:
+            value = getattr(llm_output, slot_name)
+            if value:
+                collected_data[slot_name] = value
+
+    def extract_slots(self, user_input: str, collected_data: Dict[str, Any]) -> Optional[LLMOutput]:
+        """Fill slots matched locally; returns a THANK_YOU output if the LLM can be skipped"""
+        if not SLOT_FAST_PATH:
+            return None
+
+        filled = self.slot_extractor.fill(user_input, collected_data)
+        fast_path = bool(filled) and self.is_complete(collected_data)
+        extraction_stats.record(filled, fast_path)
+
+        if filled:
+            logger.info(f"🔎 Slots extracted locally ({self.agent_type}): {filled}")
+        if not fast_path:
+            return None
+
+        result_dict = {slot_name: collected_data.get(slot_name) for slot_name in self.slots}
+        return self.validate_output({"response_type": "THANK_YOU_RESPONSE", "feedback": FAST_PATH_FEEDBACK, **result_dict})
+
+
+def build_agent_registry(agent_metadata: Dict[str, Dict[str, Any]]) -> Dict[str, AgentProfile]:
+    """Compile a profile for every configured agent"""
+    registry = {agent_type: AgentProfile(agent_type, agent_config) for agent_type, agent_config in agent_metadata.items()}
+    logger.info(f"Agent registry built: {list(registry.keys())}")
+    return registry
+
+
+def get_agent_profile(agent_type: str) -> AgentProfile:
+    """Get the precompiled profile of an agent"""
+    if agent_type not in AGENT_REGISTRY:
+        raise ValueError(f"Invalid agent_type: {agent_type}")
+    return AGENT_REGISTRY[agent_type]
+
+
+# Global registry - built once at startup
+AGENT_REGISTRY = build_agent_registry(AGENT_METADATA)
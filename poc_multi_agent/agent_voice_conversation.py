@@ -4,25 +4,50 @@ Integrates MongoDB, Twilio, and ElevenLabs with agent_conversation.py logic
 No hardcoding - fully configurable via agent_config.py
 """
 
-from fastapi import FastAPI, Request, Form
-from fastapi.responses import Response, FileResponse
+from fastapi import FastAPI, Request, Form, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from twilio.rest import Client
 from twilio.twiml.voice_response import VoiceResponse
-from pydantic import BaseModel, Field
-from typing import Optional, Literal, Dict, Any
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+from typing import Optional, Dict, Any, AsyncIterator, List, NamedTuple, Tuple
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+# Load .env before the local modules below read their settings
+load_dotenv()
+
 from agent_config import AGENT_METADATA
-from elevenlabs_service import ElevenLabsTTS
+from elevenlabs_service import AudioStream, ElevenLabsTTS
 from database import CallDatabase
 from audio_storage import init_audio_storage
-from dotenv import load_dotenv
+from llm_engine import llm_engine
+from llm_pool import llm_pool, LLM_WARMUP
+from model_router import model_router
+from turn_pipeline import StreamingTurn
+from json_stream import parse_llm_reply
+from history_manager import history_manager
+from agent_registry import AGENT_REGISTRY, LLMOutput, get_agent_profile
+from slot_extractor import extraction_stats
+from response_cache import response_cache, build_cache_key
+from speculative_turns import speculative_turns, SPECULATIVE_TURNS
+from segmented_tts import SegmentedRenderer, template_fragments
+from audio_cache import audio_cache
+from tts_queue import tts_queue, PRIORITY_PREFETCH
+from audio_formats import payload, WAV_HEADER_BYTES
+from audio_response import clip_response
+from media_stream import (
+    EnergyVAD, GeminiTranscriber, MediaStreamPlayer, media_stream_stats, MEDIA_STREAM_OUTPUT_FORMAT
+)
+from turn_deadline import (
+    TurnDeadline, get_turn_budget, TTS_RESERVE_SECONDS, MIN_TTS_SECONDS, DB_WRITE_RESERVE_SECONDS,
+    FALLBACK_REPROMPT, FALLBACK_TWILIO_SAY, FALLBACK_DEFERRED_DB_WRITE
+)
 import os
-import json
+import copy
+import time
+import base64
+import asyncio
 import logging
 
-load_dotenv()
-
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -43,11 +68,6 @@ if not TWILIO_ACCOUNT_SID:
 
 # Initialize services
 twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN) if TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN else None
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash",
-    google_api_key=GEMINI_API_KEY,
-    temperature=0.7
-)
 
 # Initialize audio storage (like original code)
 audio_storage = init_audio_storage(WEBHOOK_BASE_URL)
@@ -55,24 +75,101 @@ audio_storage = init_audio_storage(WEBHOOK_BASE_URL)
 # Initialize ElevenLabs with audio_storage (like original code)
 elevenlabs_tts = ElevenLabsTTS(audio_storage=audio_storage)
 
+# Confirmation messages are voiced from cached template fragments plus the slot values
+segmented_renderer = SegmentedRenderer(elevenlabs_tts)
+
+# Media stream calls (/voice-stream) are answered in 8 kHz u-law, the only audio Twilio plays back on a stream
+stream_tts = ElevenLabsTTS(audio_storage=audio_storage, output_format=MEDIA_STREAM_OUTPUT_FORMAT)
+
+# Speech-to-text of caller turns on media stream calls (replace with another Transcriber to change the STT service)
+media_stream_transcriber = GeminiTranscriber()
+
 # Initialize database
 db = CallDatabase()
 
 # Active calls storage
 active_calls: Dict[str, Dict[str, Any]] = {}
 
+# Streamed turns whose remaining audio is still being synthesized (turn_id -> turn)
+streaming_turns: Dict[str, StreamingTurn] = {}
+
+# Background completion of streamed turns (call_sid -> (turn_id, task))
+pending_turns: Dict[str, Tuple[str, asyncio.Task]] = {}
+
+# Twilio call statuses after which the call's in-memory state is dropped
+CALL_ENDED_STATUSES = {"completed", "busy", "failed", "no-answer", "canceled"}
+
+# Call writes deferred to the background because the turn budget ran out
+deferred_writes: set = set()
+
+# Static prompts being rendered in the background after a pre-rendered audio miss
+background_renders: set = set()
+
+# LLM connection and static prompt warmup, started at startup without holding it up
+startup_warmup: Optional[asyncio.Task] = None
+
+# ElevenLabs streams opened by a turn and handed out as /audio-stream URLs, read when Twilio fetches them
+pending_audio_streams: "OrderedDict[str, AudioStream]" = OrderedDict()
+
+DEFAULT_REPROMPT_MSG = "Sorry for the delay. Could you please say that again?"
+
+TECHNICAL_ERROR_MSG = "I apologize, but our system is experiencing technical difficulties. Please try again later or contact support."
+
+# Render every static prompt with ElevenLabs at startup so /voice never waits on TTS
+TTS_WARMUP = os.getenv("TTS_WARMUP", "true").lower() == "true"
+TTS_WARMUP_CONCURRENCY = int(os.getenv("TTS_WARMUP_CONCURRENCY", "4"))
+
+# Play ElevenLabs audio as soon as the stream has started instead of waiting for the whole file
+TTS_STREAMING = os.getenv("TTS_STREAMING", "true").lower() == "true"
+MAX_PENDING_AUDIO_STREAMS = int(os.getenv("MAX_PENDING_AUDIO_STREAMS", "1000"))
+
+# Finished streamed turns of calls that never came back (no status callback, e.g. inbound calls) are dropped after this
+STREAMING_TURN_TTL_SECONDS = float(os.getenv("STREAMING_TURN_TTL_SECONDS", "300"))
+
+# Hedged TTS: use Twilio <Say> when ElevenLabs misses the language's deadline (render continues in the background)
+TTS_HEDGE = os.getenv("TTS_HEDGE", "true").lower() == "true"
+DEFAULT_TTS_DEADLINE_SECONDS = float(os.getenv("TTS_DEADLINE_SECONDS", "2.0"))
+
+# Media stream calls: stop the reply when the caller talks over it; how long a goodbye may play before the stream closes
+MEDIA_STREAM_BARGE_IN = os.getenv("MEDIA_STREAM_BARGE_IN", "true").lower() == "true"
+MEDIA_STREAM_HANGUP_WAIT_SECONDS = float(os.getenv("MEDIA_STREAM_HANGUP_WAIT_SECONDS", "15"))
+
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize application on startup (like original code)"""
     logger.info("Starting Multi-Agent Voice Conversation System")
     logger.info(f"MongoDB connection: {'Connected' if db.client else 'Using memory fallback'}")
+    logger.info(f"Agent registry: {list(AGENT_REGISTRY.keys())}")
     logger.info(f"Audio storage: {audio_storage.audio_dir}")
     logger.info(f"ElevenLabs: {'Configured' if elevenlabs_tts.api_key else 'Not configured (will use Twilio TTS)'}")
+    logger.info(f"ElevenLabs output format: {elevenlabs_tts.output_format}")
     logger.info(f"Active calls in memory: {len(active_calls)}")
+    
+    # Calls are served while the warmup runs - a prompt not rendered yet falls back like any cache miss
+    global startup_warmup
+    startup_warmup = asyncio.create_task(warm_up())
+    
     logger.info("Application startup complete")
 
 
+async def warm_up():
+    """Open the LLM connections and pre-render the static prompts (progress in /metrics)"""
+    try:
+        # Open the LLM connections (both model tiers) before the first call comes in
+        if LLM_WARMUP and GEMINI_API_KEY:
+            await llm_pool.warmup(model_router.tier_keys())
+        
+        # Pre-render the static prompts (welcome, language selection, thank-yous, ...) in every language
+        if TTS_WARMUP and elevenlabs_tts.is_configured():
+            prompts = get_static_prompts()
+            logger.info(f"🎙️ Pre-rendering {len(prompts)} static prompts with ElevenLabs")
+            cached = await elevenlabs_tts.warmup(prompts, TTS_WARMUP_CONCURRENCY)
+            logger.info(f"🎙️ Static prompts ready: {cached}/{len(prompts)}")
+    except Exception as e:
+        logger.error(f"Warmup failed: {str(e) or type(e).__name__}", exc_info=True)
+
+
 @app.on_event("shutdown")
 async def shutdown_event():
     """Clean up on application shutdown (like original code)"""
@@ -90,6 +187,14 @@ async def shutdown_event():
     if db.client:
         db.close_connection()
     
+    # Stop a warmup still in progress, then the TTS workers, and close the pooled ElevenLabs connections
+    if startup_warmup is not None and not startup_warmup.done():
+        startup_warmup.cancel()
+        await asyncio.gather(startup_warmup, return_exceptions=True)
+    await tts_queue.aclose()
+    await elevenlabs_tts.aclose()
+    await stream_tts.aclose()
+    
     # Cleanup old audio files
     try:
         audio_storage.cleanup_old_files(max_age_hours=24)
@@ -99,157 +204,299 @@ async def shutdown_event():
     logger.info("Application shutdown complete")
 
 
-class LLMOutput(BaseModel):
-    """Structured output from LLM"""
-    response_type: Literal['THANK_YOU_RESPONSE', 'HANDOVER_TO_HUMAN', 'NEED_MORE_INFO']
+def build_language_prompt(supported_languages: List[str]) -> str:
+    """Language selection prompt played when an agent supports several languages"""
+    return f"Please select your language: {', '.join(supported_languages)}"
+
+
+def get_static_prompts() -> List[Tuple[str, str]]:
+    """Every fixed (message, language) the agents speak, for pre-rendering at startup"""
+    prompts = []
+    for metadata in AGENT_METADATA.values():
+        supported_languages = metadata.get("language_selection", ["English"])
+        if len(supported_languages) > 1:
+            prompts.append((build_language_prompt(supported_languages), "English"))
+        
+        for language in supported_languages:
+            for key in ("welcome_msg", "retry_msg", "clarify_msg"):
+                message = metadata.get(key, {}).get(language)
+                if message:
+                    prompts.append((message, language))
+            prompts.append((metadata.get("reprompt_msg", {}).get(language, DEFAULT_REPROMPT_MSG), language))
+            prompts.append((metadata["positive_thank_you_msg"], language))
+            prompts.append((metadata["negative_thank_you_msg"], language))
+            prompts.append((TECHNICAL_ERROR_MSG, language))
+            
+            # Fixed parts of the confirmation template (segmented TTS adds the slot values)
+            for fragment in template_fragments(metadata.get("confirmation_msg", {}).get(language, "")):
+                prompts.append((fragment, language))
+    
+    # Agents share some messages (e.g. the default reprompt)
+    return list(dict.fromkeys(prompts))
+
+
+def get_llm():
+    """Get the main-tier LLM client (used for streamed turns)"""
+    return model_router.main.get_client()
+
+
+def build_llm_messages(session: Dict[str, Any]) -> list:
+    """Build LLM messages within the history token budget (latest user input is already in history)"""
+    profile = get_agent_profile(session["agent_type"])
+    return history_manager.build_messages(profile.system_prompt, session)
+
+
+def parse_llm_output(result_dict: Optional[Dict[str, Any]], content: str, session: Dict[str, Any]) -> LLMOutput:
+    """Validate the parsed reply against the agent's response model and update collected data"""
+    
+    profile = get_agent_profile(session["agent_type"])
     
-    # LOGISTICS fields
-    charge: Optional[str] = None
-    availability_time: Optional[str] = None
+    if result_dict is None:
+        # Fallback: No JSON object in the reply - use the text as feedback
+        content = content.strip()
+        result_dict = {
+            "response_type": "NEED_MORE_INFO",
+            "feedback": content if content else "Could you please provide the information again?"
+        }
     
-    # PIZZA fields
-    pizza_type: Optional[str] = None
-    size: Optional[str] = None
-    delivery_address: Optional[str] = None
-    delivery_time: Optional[str] = None
+    llm_output = profile.validate_output(result_dict)
     
-    feedback: str
+    # Update collected data from the agent's slots
+    profile.merge_slots(llm_output, session["collected_data"])
+    
+    return llm_output
 
 
-def build_system_prompt(agent_type: str) -> str:
-    """Build system prompt based on agent type"""
+async def process_llm_response(user_input: str, session: Dict[str, Any]) -> LLMOutput:
+    """Process user input with LLM (runs on the shared async engine, never blocks the event loop)"""
     
-    if agent_type not in AGENT_METADATA:
-        raise ValueError(f"Invalid agent_type: {agent_type}")
-    
-    agent_config = AGENT_METADATA[agent_type]
-    base_prompt = agent_config["system_prompt"]
-    
-    # Add conversational instructions
-    conversational_prompt = f"""
-{base_prompt}
-
-CONVERSATION STYLE:
-- Be natural, friendly, and conversational
-- Adapt to user's responses
-- Handle questions, greetings, confusion naturally
-- Guide conversation to collect required information
-- Be patient and understanding
-- If user wants human, transfer them
-
-RESPONSE FORMAT (JSON):
-{{
-  "response_type": "THANK_YOU_RESPONSE" | "NEED_MORE_INFO" | "HANDOVER_TO_HUMAN",
-"""
+    messages = build_llm_messages(session)
+    profile = get_agent_profile(session["agent_type"])
     
-    # Add fields based on agent type
-    if agent_type == "LOGISTICS":
-        conversational_prompt += """
-  "charge": "extracted charge or null",
-  "availability_time": "extracted time or null",
-"""
-    elif agent_type == "PIZZA":
-        conversational_prompt += """
-  "pizza_type": "extracted pizza type or null",
-  "size": "extracted size or null",
-  "delivery_address": "extracted address or null",
-  "delivery_time": "extracted delivery time or null",
-"""
+    # Call LLM (fast or main tier; native JSON mode with the agent's response schema)
+    response, tier = await model_router.ainvoke(messages, user_input, profile, session["collected_data"], **profile.llm_kwargs)
+    logger.info(f"🧭 LLM turn answered by the {tier} tier")
     
-    conversational_prompt += """
-  "feedback": "Your natural conversational response"
-}
+    # Parse JSON response in one pass (tolerates code fences and leading text)
+    return parse_llm_output(parse_llm_reply(response.content), response.content, session)
 
-CRITICAL RULES:
-1. ALWAYS return ONLY valid JSON - no extra text before or after
-2. When you have ALL required information → response_type = "THANK_YOU_RESPONSE"
-3. When missing information → response_type = "NEED_MORE_INFO", ask naturally
-4. When user wants human → response_type = "HANDOVER_TO_HUMAN"
-5. If user is confused, explain clearly in feedback
 
-IMPORTANT: Your entire response must be ONLY the JSON object, nothing else!"""
+def start_streaming_turn(user_input: str, session: Dict[str, Any], language: str) -> Tuple[StreamingTurn, asyncio.Task]:
+    """Start streaming the LLM reply; feedback sentences are synthesized as they arrive"""
     
-    return conversational_prompt
+    messages = build_llm_messages(session)
+    profile = get_agent_profile(session["agent_type"])
+    collected_data = session["collected_data"]
+    
+    # The feedback is not spoken when the reply completes the slots (the confirmation is played instead)
+    turn = StreamingTurn(elevenlabs_tts, language, suppress_feedback=lambda fields: profile.would_complete(collected_data, fields))
+    stream_task = asyncio.create_task(turn.run(llm_engine.astream(get_llm(), messages, **profile.stream_llm_kwargs)))
+    return turn, stream_task
+
+
+async def finish_streaming_turn(call_sid: str, session: Dict[str, Any], turn: StreamingTurn, stream_task: asyncio.Task, cache_key: tuple):
+    """Complete a turn whose first audio segment was already returned to Twilio"""
+    try:
+        await stream_task
+        llm_output = parse_llm_output(turn.result(), turn.content, session)
+        logger.info(f"📝 LLM Response (streamed) - Type: {llm_output.response_type}, Feedback: {llm_output.feedback[:100]}...")
+        response_cache.put(cache_key, llm_output.model_dump(), get_agent_profile(session["agent_type"]).slots)
+        
+        session["history"].append({"role": "assistant", "content": llm_output.feedback})
+        db.save_call(call_sid, session)
+    except Exception as e:
+        logger.error(f"❌ Error finishing streamed turn for CallSid {call_sid}: {str(e)}", exc_info=True)
+
+
+async def run_speculative_turn(text: str, session: Dict[str, Any], language: str) -> Optional[Dict[str, Any]]:
+    """Run the LLM on a copy of the session as if the caller had finished saying `text`"""
+    try:
+        snapshot = copy.deepcopy(session)
+        snapshot["history"].append({"role": "user", "content": text})
+        
+        messages = build_llm_messages(snapshot)
+        profile = get_agent_profile(snapshot["agent_type"])
+        response, tier = await model_router.ainvoke(messages, text, profile, snapshot["collected_data"], **profile.llm_kwargs)
+        result_dict = parse_llm_reply(response.content)
+        
+        # Synthesize the spoken reply ahead too (lands in the TTS file cache)
+        if result_dict and result_dict.get("response_type") == "NEED_MORE_INFO" and result_dict.get("feedback") and elevenlabs_tts.is_configured():
+            await elevenlabs_tts.agenerate_audio_url(result_dict["feedback"], language, priority=PRIORITY_PREFETCH)
+        
+        return {"result": result_dict, "content": response.content, "session": snapshot}
+    except Exception as e:
+        logger.warning(f"Speculative turn failed: {str(e)}")
+        return None
 
 
-def process_llm_response(user_input: str, session: Dict[str, Any]) -> LLMOutput:
-    """Process user input with LLM"""
+def end_call_state(call_sid: str):
+    """Forget a finished call: its speculative and streamed turns, then its session (saved to the database first)"""
+    speculative_turns.end_call(call_sid)
     
-    agent_type = session["agent_type"]
-    system_prompt = session["system_prompt"]
-    history = session["history"]
-    collected_data = session["collected_data"]
+    def forget(_=None):
+        session = active_calls.pop(call_sid, None)
+        if session is not None:
+            db.save_call(call_sid, session)
     
-    # Build messages for LLM
-    messages = [SystemMessage(content=system_prompt)]
+    pending = pending_turns.pop(call_sid, None)
+    if pending is None:
+        forget()
+        return
     
-    # Add conversation history
-    for msg in history:
-        if msg["role"] == "user":
-            messages.append(HumanMessage(content=msg["content"]))
-        elif msg["role"] == "assistant":
-            messages.append(AIMessage(content=msg["content"]))
+    # A streamed turn still completing writes to the session - let it finish first
+    turn_id, task = pending
+    streaming_turns.pop(turn_id, None)
+    if task.done():
+        forget()
+    else:
+        task.add_done_callback(forget)
+
+
+def evict_stale_turns():
+    """Drop streamed turns finished long ago whose call never sent another turn (e.g. hung up mid-turn)"""
+    now = time.monotonic()
+    for call_sid, (turn_id, task) in list(pending_turns.items()):
+        turn = streaming_turns.get(turn_id)
+        finished_at = turn.finished_at if turn else None
+        if task.done() and (turn is None or (finished_at is not None and now - finished_at > STREAMING_TURN_TTL_SECONDS)):
+            pending_turns.pop(call_sid, None)
+            streaming_turns.pop(turn_id, None)
+            speculative_turns.end_call(call_sid)
+
+
+def get_partial_result_callback() -> Dict[str, str]:
+    """Gather attributes that send interim transcripts to /partial-speech"""
+    if not SPECULATIVE_TURNS:
+        return {}
+    return {
+        "partial_result_callback": f"{WEBHOOK_BASE_URL}/partial-speech",
+        "partial_result_callback_method": "POST"
+    }
+
+
+async def synthesize_within(message: str, language: str, deadline: Optional[TurnDeadline] = None) -> Optional[str]:
+    """Get ElevenLabs audio within the language's TTS deadline and the turn budget (None means use Twilio <Say>)"""
+    if not elevenlabs_tts.is_configured():
+        return None
     
-    # Add current user input
-    messages.append(HumanMessage(content=user_input))
+    cached_url = elevenlabs_tts.get_cached_audio_url(message, language)
+    if cached_url:
+        return cached_url
     
-    # Add current collected data context
-    context = f"\nCurrent collected data: {json.dumps(collected_data)}"
-    messages.append(HumanMessage(content=context))
+    if deadline is not None and deadline.remaining() < MIN_TTS_SECONDS:
+        # Only already-cached audio could still be played
+        deadline.record_fallback(FALLBACK_TWILIO_SAY, "no turn budget left for ElevenLabs")
+        return None
     
-    # Call LLM
-    response = llm.invoke(messages)
+    timeout = get_tts_deadline(language) if TTS_HEDGE else None
+    if deadline is not None:
+        timeout = deadline.remaining() if timeout is None else min(timeout, deadline.remaining())
     
-    # Parse JSON response
-    content = response.content.strip()
+    filename = elevenlabs_tts.get_cache_filename(message, language)
+    if TTS_STREAMING and not elevenlabs_tts.is_synthesizing(filename):
+        # Twilio starts playing as soon as the first chunks arrive - only the start of the stream is waited for
+        return await open_audio_stream_within(message, language, timeout, deadline)
     
-    # Remove markdown code blocks if present
-    if content.startswith('```json'):
-        content = content.replace('```json', '').replace('```', '').strip()
-    elif content.startswith('```'):
-        content = content.replace('```', '').strip()
+    if timeout is None:
+        return await elevenlabs_tts.agenerate_audio_url(message, language)
     
-    # Try to find JSON in the response
     try:
-        # Try direct parsing
-        result_dict = json.loads(content)
-    except json.JSONDecodeError:
-        # Try to extract JSON from text
-        import re
-        json_match = re.search(r'\{.*\}', content, re.DOTALL)
-        if json_match:
-            result_dict = json.loads(json_match.group())
-        else:
-            # Fallback: Create a default response
-            result_dict = {
-                "response_type": "NEED_MORE_INFO",
-                "feedback": content if content else "Could you please provide the information again?"
-            }
-    
-    llm_output = LLMOutput(**result_dict)
-    
-    # Update collected data based on agent type
-    if agent_type == "LOGISTICS":
-        if llm_output.charge:
-            collected_data["charge"] = llm_output.charge
-        if llm_output.availability_time:
-            collected_data["availability_time"] = llm_output.availability_time
-    
-    elif agent_type == "PIZZA":
-        if llm_output.pizza_type:
-            collected_data["pizza_type"] = llm_output.pizza_type
-        if llm_output.size:
-            collected_data["size"] = llm_output.size
-        if llm_output.delivery_address:
-            collected_data["delivery_address"] = llm_output.delivery_address
-        if llm_output.delivery_time:
-            collected_data["delivery_time"] = llm_output.delivery_time
+        # Shielded: on timeout the synthesis still finishes and fills the audio cache for the next time
+        return await asyncio.wait_for(asyncio.shield(elevenlabs_tts.agenerate_audio_url(message, language)), timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"⏱️ ElevenLabs missed its {timeout:.1f}s deadline ({language}), using Twilio TTS")
+        if deadline is not None:
+            deadline.record_fallback(FALLBACK_TWILIO_SAY, "ElevenLabs did not finish within the TTS deadline")
+        return None
+
+
+async def open_audio_stream_within(message: str, language: str, timeout: Optional[float], deadline: Optional[TurnDeadline] = None) -> Optional[str]:
+    """Open an ElevenLabs stream within the timeout and get its /audio-stream URL (None means use Twilio <Say>)"""
+    opening = asyncio.ensure_future(elevenlabs_tts.open_audio_stream(message, language))
+    try:
+        # Shielded: a stream that starts late is still read to the end and fills the audio cache for the next time
+        stream = await asyncio.wait_for(asyncio.shield(opening), timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"⏱️ ElevenLabs stream did not start within its {timeout:.1f}s deadline ({language}), using Twilio TTS")
+        if deadline is not None:
+            deadline.record_fallback(FALLBACK_TWILIO_SAY, "ElevenLabs stream did not start within the TTS deadline")
+        task = asyncio.create_task(drain_audio_stream(opening))
+        background_renders.add(task)
+        task.add_done_callback(background_renders.discard)
+        return None
     
-    return llm_output
+    if stream is None:
+        if deadline is not None:
+            deadline.record_fallback(FALLBACK_TWILIO_SAY, "ElevenLabs stream failed")
+        return None
+    
+    filename = elevenlabs_tts.get_cache_filename(message, language)
+    pending_audio_streams[filename] = stream
+    pending_audio_streams.move_to_end(filename)
+    
+    # Streams of calls that hung up before playing are never fetched
+    while len(pending_audio_streams) > MAX_PENDING_AUDIO_STREAMS:
+        _, stale = pending_audio_streams.popitem(last=False)
+        await stale.aclose()
+    
+    return f"{WEBHOOK_BASE_URL}/audio-stream/{filename}"
+
+
+async def drain_audio_stream(opening: "asyncio.Future[Optional[AudioStream]]"):
+    """Read a stream that started too late to play to the end, so its audio still lands in the cache"""
+    stream = await opening
+    if stream is not None:
+        async for _ in stream:
+            pass
+
 
+def prerendered_audio_url(message: str, language: str) -> Optional[str]:
+    """Get pre-rendered audio without waiting on ElevenLabs (None means use Twilio <Say>)
 
-def generate_twiml(message: str, action: str, language: str = "English") -> str:
-    """Generate TwiML response with ElevenLabs voice or Twilio TTS fallback"""
+    On a miss the audio is rendered in the background so the next call finds it cached.
+    """
+    audio_url = elevenlabs_tts.get_cached_audio_url(message, language)
+    if audio_url or not elevenlabs_tts.is_configured():
+        return audio_url
+    
+    logger.info(f"🎙️ Prompt not pre-rendered yet ({language}), using Twilio TTS")
+    task = asyncio.create_task(elevenlabs_tts.agenerate_audio_url(message, language, priority=PRIORITY_PREFETCH))
+    background_renders.add(task)
+    task.add_done_callback(background_renders.discard)
+    return None
+
+
+async def save_call_within(call_sid: str, session: Dict[str, Any], deadline: TurnDeadline):
+    """Save the call now, or in the background when the turn budget is nearly spent"""
+    if deadline.remaining() > DB_WRITE_RESERVE_SECONDS:
+        db.save_call(call_sid, session)
+        return
+    
+    deadline.record_fallback(FALLBACK_DEFERRED_DB_WRITE, "turn budget nearly spent")
+    # The write thread gets a snapshot - the next turn keeps changing the live session
+    task = asyncio.create_task(asyncio.to_thread(db.save_call, call_sid, copy.deepcopy(session)))
+    deferred_writes.add(task)
+    task.add_done_callback(deferred_writes.discard)
+
+
+class TurnReply(NamedTuple):
+    """What the agent says next - rendered as TwiML for webhook calls, spoken over the stream for media stream calls"""
+    message: str
+    language: str
+    hang_up: bool = False
+    # Only audio rendered at startup is played (a goodbye without it is always spoken with Twilio TTS)
+    prerendered: bool = False
+    # Turn budget left to synthesize the message in
+    deadline: Optional[TurnDeadline] = None
+    # Audio of the message synthesized during the turn (webhook calls only)
+    audio_urls: Optional[List[str]] = None
+
+
+async def generate_twiml(message: str, action: str, language: str = "English", deadline: Optional[TurnDeadline] = None, prerendered: bool = False) -> str:
+    """Generate TwiML response with ElevenLabs voice or Twilio TTS fallback
+
+    With prerendered=True only audio rendered at startup is played (no ElevenLabs round trip).
+    """
     response = VoiceResponse()
     gather = response.gather(
         input='speech',
@@ -257,11 +504,15 @@ def generate_twiml(message: str, action: str, language: str = "English") -> str:
         method='POST',
         timeout=10,
         speech_timeout='auto',
-        language=get_twilio_language_code(language)
+        language=get_twilio_language_code(language),
+        **get_partial_result_callback()
     )
     
-    # Try to generate ElevenLabs audio
-    audio_url = elevenlabs_tts.generate_audio_url(message, language)
+    # Try to generate ElevenLabs audio (within the turn budget, if any)
+    if prerendered:
+        audio_url = prerendered_audio_url(message, language)
+    else:
+        audio_url = await synthesize_within(message, language, deadline)
     
     if audio_url:
         # Use ElevenLabs voice
@@ -273,6 +524,49 @@ def generate_twiml(message: str, action: str, language: str = "English") -> str:
     return str(response)
 
 
+def generate_goodbye_twiml(message: str, language: str = "English", prerendered: bool = True) -> str:
+    """Generate TwiML that says a closing message (pre-rendered audio if available) and hangs up
+
+    With prerendered=False the message is always spoken with Twilio TTS.
+    """
+    response = VoiceResponse()
+    audio_url = prerendered_audio_url(message, language) if prerendered else None
+    if audio_url:
+        response.play(audio_url)
+    else:
+        response.say(message, voice=get_twilio_voice(language), language=get_twilio_language_code(language))
+    response.hangup()
+    return str(response)
+
+
+def generate_play_twiml(audio_urls: List[str], action: str, language: str = "English") -> str:
+    """Generate TwiML response that plays pre-synthesized audio segments in order"""
+    response = VoiceResponse()
+    gather = response.gather(
+        input='speech',
+        action=action,
+        method='POST',
+        timeout=10,
+        speech_timeout='auto',
+        language=get_twilio_language_code(language),
+        **get_partial_result_callback()
+    )
+    
+    for audio_url in audio_urls:
+        gather.play(audio_url)
+    
+    return str(response)
+
+
+async def generate_reply_twiml(reply: TurnReply, action: str) -> str:
+    """Generate the TwiML of a turn reply: its synthesized audio, a goodbye that hangs up, or the message"""
+    if reply.audio_urls:
+        return generate_play_twiml(reply.audio_urls, action, reply.language)
+    if reply.hang_up:
+        return generate_goodbye_twiml(reply.message, reply.language, reply.prerendered)
+    return await generate_twiml(reply.message, action, reply.language, reply.deadline, reply.prerendered)
+
+
 def get_twilio_language_code(language: str) -> str:
     """Get Twilio language code from configuration - No hardcoding!"""
     from agent_config import LANGUAGE_CONFIG
@@ -285,6 +579,12 @@ def get_twilio_voice(language: str) -> str:
     return LANGUAGE_CONFIG.get(language, {}).get("twilio_voice", "Polly.Joanna-Neural")
 
 
+def get_tts_deadline(language: str) -> float:
+    """Get how long a turn waits for ElevenLabs in a language from configuration"""
+    from agent_config import LANGUAGE_CONFIG
+    return float(LANGUAGE_CONFIG.get(language, {}).get("tts_deadline_seconds", DEFAULT_TTS_DEADLINE_SECONDS))
+
+
 def detect_language(speech: str, supported_languages: list) -> str:
     """Detect language from user speech - Configuration-driven, no hardcoding"""
     speech_lower = speech.lower()
@@ -301,45 +601,182 @@ def detect_language(speech: str, supported_languages: list) -> str:
 def build_confirmation_message(collected_data: Dict[str, Any], agent_type: str, language: str) -> str:
     """Build confirmation message based on collected data from agent_config.py"""
     
-    # Get confirmation message template from agent_config.py
-    agent_config = AGENT_METADATA.get(agent_type, {})
-    confirmation_template = agent_config.get("confirmation_msg", {}).get(language, "")
+    # Precompiled template (placeholders are checked against the slots at startup);
+    # slots without a value are read out as "not provided"
+    confirmation_msg = get_agent_profile(agent_type).render_confirmation(collected_data, language)
     
-    if not confirmation_template:
+    if not confirmation_msg:
         # Fallback if not configured
         return "Let me confirm the information I collected. Is this correct? Please say yes or no."
     
-    # Replace placeholders with actual collected data
+    return confirmation_msg
+
+
+async def synthesize_confirmation(collected_data: Dict[str, Any], agent_type: str, language: str, deadline: TurnDeadline) -> Optional[str]:
+    """Voice the confirmation from cached template fragments and the slot values (None to synthesize it whole)"""
+    profile = get_agent_profile(agent_type)
+    template = profile.confirmation_templates.get(language)
+    if not template or not segmented_renderer.enabled:
+        return None
+    
     try:
-        # Add default values for missing fields
-        data_with_defaults = {key: value if value else "not provided" for key, value in collected_data.items()}
-        return confirmation_template.format(**data_with_defaults)
-    except KeyError as e:
-        # If template has placeholders not in collected_data, use fallback
-        logger.warning(f"Missing field in confirmation template: {e}")
-        return "Let me confirm the information I collected. Is this correct? Please say yes or no."
+        # Shielded: on timeout the joined audio is still cached for a repeat of the same confirmation
+        render = segmented_renderer.render(template, profile.confirmation_values(collected_data), language)
+        return await deadline.run(asyncio.shield(render))
+    except asyncio.TimeoutError:
+        logger.warning("Segmented confirmation audio did not finish within the turn budget")
+        return None
+
+
+def init_call_session(call_sid: str, agent_type: str) -> Tuple[str, str]:
+    """Start the session of a new call; returns the first message and its language"""
+    
+    # Get supported languages from agent_config.py
+    supported_languages = AGENT_METADATA[agent_type].get("language_selection", ["English"])
+    
+    # Check if multi-language support is enabled (more than 1 language)
+    if len(supported_languages) > 1:
+        # Multi-language: Ask user to select
+        logger.info(f"Multi-language enabled: {supported_languages}")
+        
+        # Initialize session with language selection stage
+        active_calls[call_sid] = {
+            "agent_type": agent_type,
+            "stage": "language_selection",
+            "language": None,
+            "history": [],
+            "collected_data": {}
+        }
+        
+        # Save to database
+        db.save_call(call_sid, active_calls[call_sid])
+        
+        # Ask for language
+        return build_language_prompt(supported_languages), "English"
+    
+    # Single language: Skip language selection, use default (English)
+    default_language = supported_languages[0] if supported_languages else "English"
+    logger.info(f"Single language mode: Using {default_language}")
+    
+    # Initialize session directly with welcome stage
+    active_calls[call_sid] = {
+        "agent_type": agent_type,
+        "stage": "welcome",
+        "language": default_language,
+        "history": [],
+        "collected_data": {}
+    }
+    
+    # Save to database
+    db.save_call(call_sid, active_calls[call_sid])
+    
+    # Send welcome message directly
+    welcome_msg = AGENT_METADATA[agent_type]["welcome_msg"].get(default_language, "")
+    active_calls[call_sid]["history"].append({"role": "assistant", "content": welcome_msg})
+    
+    logger.info(f"🔊 Welcome Message ({default_language}): {welcome_msg}")
+    return welcome_msg, default_language
+
+
+def get_media_stream_url() -> str:
+    """WebSocket URL Twilio streams call audio to (the webhook base URL with a ws/wss scheme)"""
+    return "ws" + WEBHOOK_BASE_URL[len("http"):] + "/media-stream" if WEBHOOK_BASE_URL.startswith("http") else f"{WEBHOOK_BASE_URL}/media-stream"
+
+
+async def stream_reply_audio(message: str, language: str) -> AsyncIterator[bytes]:
+    """Raw u-law audio of a reply on a media stream - the cached clip, or ElevenLabs chunks as they arrive"""
+    if not stream_tts.is_configured():
+        logger.warning("ElevenLabs not configured - media stream replies cannot be voiced")
+        return
+    
+    filename = stream_tts.get_cache_filename(message, language)
+    if stream_tts.is_synthesizing(filename):
+        # Another call is voicing the same message - wait for its file
+        await stream_tts.agenerate_audio_url(message, language)
+    
+    audio = stream_tts.read_audio(filename) if stream_tts.get_cached_audio_url(message, language) else None
+    if audio:
+        yield payload(audio, stream_tts.output_format)
+        return
+    
+    chunks = await stream_tts.open_audio_stream(message, language)
+    if chunks is None:
+        return
+    
+    # The stream starts with a WAV header, which is not audio
+    header_left = WAV_HEADER_BYTES
+    async for chunk in chunks:
+        if header_left:
+            skipped = min(header_left, len(chunk))
+            chunk, header_left = chunk[skipped:], header_left - skipped
+        yield chunk
+
+
+async def run_media_stream_call(call_sid: str, agent_type: str, player: MediaStreamPlayer, utterances: asyncio.Queue):
+    """Greet the caller, then answer their utterances in order until the agent hangs up"""
+    message, language = init_call_session(call_sid, agent_type)
+    reply = TurnReply(message, language)
+    utterance_ended_at = None
+    
+    while True:
+        first_audio_at = await player.play(stream_reply_audio(reply.message, reply.language))
+        media_stream_stats.replies += 1
+        if first_audio_at and utterance_ended_at:
+            media_stream_stats.record_first_audio(first_audio_at - utterance_ended_at)
+        
+        if reply.hang_up:
+            # Let the goodbye play out, then end the call
+            await player.wait_played(MEDIA_STREAM_HANGUP_WAIT_SECONDS)
+            await player.close()
+            return
+        
+        # Wait for the caller's next utterance (noise that transcribes to nothing is ignored)
+        text = None
+        while not text:
+            utterance, utterance_ended_at = await utterances.get()
+            session = active_calls.get(call_sid, {})
+            started_at = time.monotonic()
+            text = await media_stream_transcriber.transcribe(utterance, session.get("language"))
+            media_stream_stats.record_transcription(time.monotonic() - started_at, text)
+        
+        logger.info(f"🎧 Caller said: {text} - CallSid: {call_sid}")
+        
+        # Same session, LLM and agent logic as the /process-response webhook
+        reply = await run_turn(call_sid, text, play_urls=False)
+        if reply is None:
+            logger.warning(f"Media stream call has no session any more - CallSid: {call_sid}")
+            await player.close()
+            return
 
 
 @app.post("/start-call")
-async def start_call(agent_type: str = "LOGISTICS", phone_number: str = "+919876543210"):
-    """Start a call with specified agent type"""
+async def start_call(agent_type: str = "LOGISTICS", phone_number: str = "+919876543210", mode: str = "gather"):
+    """Start a call with specified agent type (mode "stream" runs it over a media stream)"""
     
     if agent_type not in AGENT_METADATA:
         logger.error(f"❌ Invalid agent_type: {agent_type}")
         return {"error": f"Invalid agent_type. Choose: {list(AGENT_METADATA.keys())}"}
     
+    if mode not in ("gather", "stream"):
+        logger.error(f"❌ Invalid mode: {mode}")
+        return {"error": "Invalid mode. Choose: ['gather', 'stream']"}
+    
     if not twilio_client:
         logger.error("❌ Twilio client not configured")
         return {"error": "Service temporarily unavailable. Twilio is not configured. Please contact support."}
     
     try:
-        logger.info(f"📞 Initiating call - Agent: {agent_type}, Phone: {phone_number}")
+        logger.info(f"📞 Initiating call - Agent: {agent_type}, Phone: {phone_number}, Mode: {mode}")
         
+        voice_path = "/voice-stream" if mode == "stream" else "/voice"
         call = twilio_client.calls.create(
             to=phone_number,
             from_=TWILIO_PHONE_NUMBER,
-            url=f"{WEBHOOK_BASE_URL}/voice?agent_type={agent_type}",
-            method='POST'
+            url=f"{WEBHOOK_BASE_URL}{voice_path}?agent_type={agent_type}",
+            method='POST',
+            status_callback=f"{WEBHOOK_BASE_URL}/call-status-callback",
+            status_callback_event=["completed"],
+            status_callback_method='POST'
         )
         
         logger.info(f"✅ Call initiated successfully - CallSid: {call.sid}")
@@ -348,7 +785,8 @@ async def start_call(agent_type: str = "LOGISTICS", phone_number: str = "+919876
             "success": True,
             "call_sid": call.sid,
             "agent_type": agent_type,
-            "phone_number": phone_number
+            "phone_number": phone_number,
+            "mode": mode
         }
     except Exception as e:
         logger.error(f"❌ Error starting call: {e}", exc_info=True)
@@ -367,65 +805,35 @@ async def voice_webhook(request: Request):
     
     logger.info(f"Call connected: {call_sid}, Agent: {agent_type}")
     
-    # Get supported languages from agent_config.py
-    supported_languages = AGENT_METADATA[agent_type].get("language_selection", ["English"])
+    # Ask for the language, or welcome the caller directly
+    message, language = init_call_session(call_sid, agent_type)
     
-    # Check if multi-language support is enabled (more than 1 language)
-    if len(supported_languages) > 1:
-        # Multi-language: Ask user to select
-        logger.info(f"Multi-language enabled: {supported_languages}")
-        
-        # Initialize session with language selection stage
-        active_calls[call_sid] = {
-            "agent_type": agent_type,
-            "stage": "language_selection",
-            "language": None,
-            "system_prompt": build_system_prompt(agent_type),
-            "history": [],
-            "collected_data": {}
-        }
-        
-        # Save to database
-        db.save_call(call_sid, active_calls[call_sid])
-        
-        # Ask for language
-        lang_text = ", ".join(supported_languages)
-        message = f"Please select your language: {lang_text}"
-        
-        twiml = generate_twiml(message, '/process-response', "English")
-        return Response(content=twiml, media_type="application/xml")
+    twiml = await generate_twiml(message, "/process-response", language, prerendered=True)
+    return Response(content=twiml, media_type="application/xml")
+
+
+@app.post("/voice-stream")
+async def voice_stream_webhook(request: Request):
+    """Handle initial call connection in media stream mode - caller and agent audio both flow over /media-stream"""
+    form_data = await request.form()
+    call_sid = form_data.get("CallSid")
+    agent_type = request.query_params.get("agent_type", "LOGISTICS")
     
-    else:
-        # Single language: Skip language selection, use default (English)
-        default_language = supported_languages[0] if supported_languages else "English"
-        logger.info(f"Single language mode: Using {default_language}")
-        
-        # Initialize session directly with welcome stage
-        active_calls[call_sid] = {
-            "agent_type": agent_type,
-            "stage": "welcome",
-            "language": default_language,
-            "system_prompt": build_system_prompt(agent_type),
-            "history": [],
-            "collected_data": {}
-        }
-        
-        # Save to database
-        db.save_call(call_sid, active_calls[call_sid])
-        
-        # Send welcome message directly
-        welcome_msg = AGENT_METADATA[agent_type]["welcome_msg"].get(default_language, "")
-        active_calls[call_sid]["history"].append({"role": "assistant", "content": welcome_msg})
-        
-        logger.info(f"🔊 Welcome Message ({default_language}): {welcome_msg}")
-        
-        twiml = generate_twiml(welcome_msg, "/process-response", default_language)
-        return Response(content=twiml, media_type="application/xml")
+    logger.info(f"Call connected (media stream): {call_sid}, Agent: {agent_type}")
+    
+    # The session starts when Twilio opens the stream; the agent type travels as a stream parameter
+    response = VoiceResponse()
+    connect = response.connect()
+    stream = connect.stream(url=get_media_stream_url())
+    stream.parameter(name="agent_type", value=agent_type)
+    return Response(content=str(response), media_type="application/xml")
 
 
-@app.post("/process-response")
-async def process_response(CallSid: str = Form(...), SpeechResult: Optional[str] = Form(None)):
-    """Process user response based on conversation stage"""
+async def run_turn(CallSid: str, SpeechResult: Optional[str], play_urls: bool = True) -> Optional[TurnReply]:
+    """Process user response based on conversation stage; returns what to say next (None if the call is unknown)
+
+    With play_urls=False (media streams) no audio is synthesized ahead as URLs - the caller voices the reply itself.
+    """
     
     if CallSid not in active_calls:
         # Try to load from database
@@ -433,22 +841,29 @@ async def process_response(CallSid: str = Form(...), SpeechResult: Optional[str]
         if call_data:
             active_calls[CallSid] = call_data
         else:
-            return Response(
-                content="<Response><Say>Call not found</Say></Response>",
-                media_type="application/xml"
-            )
+            return None
     
     session = active_calls[CallSid]
     agent_type = session["agent_type"]
     stage = session["stage"]
     
+    # Latency budget of this turn, shared by its LLM, TTS and database calls
+    deadline = TurnDeadline(
+        get_turn_budget(agent_type, stage), session.setdefault("fallbacks", []), stage, session.setdefault("fallback_counts", {})
+    )
+    
+    # Let the previous streamed turn finish updating the session first
+    if CallSid in pending_turns:
+        turn_id, pending_task = pending_turns.pop(CallSid)
+        await pending_task
+        streaming_turns.pop(turn_id, None)
+    
     logger.info(f"CallSid: {CallSid}, Stage: {stage}, Speech: {SpeechResult}")
     
     if not SpeechResult:
         message = "I didn't catch that. Please repeat."
         language = session.get("language", "English")
-        twiml = generate_twiml(message, "/process-response", language)
-        return Response(content=twiml, media_type="application/xml")
+        return TurnReply(message, language, deadline=deadline)
     
     # Stage 1: Language Selection
     if stage == "language_selection":
@@ -465,8 +880,7 @@ async def process_response(CallSid: str = Form(...), SpeechResult: Optional[str]
         welcome_msg = AGENT_METADATA[agent_type]["welcome_msg"].get(language, "")
         session["history"].append({"role": "assistant", "content": welcome_msg})
         
-        twiml = generate_twiml(welcome_msg, "/process-response", language)
-        return Response(content=twiml, media_type="application/xml")
+        return TurnReply(welcome_msg, language, prerendered=True)
     
     # Stage 2 & 3: Welcome + Collecting Information
     if stage in ["welcome", "collecting"]:
@@ -475,19 +889,93 @@ async def process_response(CallSid: str = Form(...), SpeechResult: Optional[str]
         
         # Process with LLM
         try:
-            llm_output = process_llm_response(SpeechResult, session)
+            language = session.get("language", "English")
+            turn = None
+            
+            # Match slots locally first; the LLM is skipped when every slot is resolved
+            profile = get_agent_profile(agent_type)
+            llm_output = profile.extract_slots(SpeechResult, session["collected_data"])
+            
+            # Repeated small talk in the same context (question asked, values collected) is answered from the response cache
+            filled_slots = {slot_name: session["collected_data"][slot_name] for slot_name in profile.slots if session["collected_data"].get(slot_name)}
+            last_assistant_msg = next((entry["content"] for entry in reversed(session["history"]) if entry["role"] == "assistant"), "")
+            cache_key = build_cache_key(agent_type, stage, language, SpeechResult, filled_slots, last_assistant_msg)
+            cached_reply = None if llm_output else response_cache.get(cache_key)
+            
+            # Claim the turn started from partial speech if it was started with the same text
+            speculative_task = speculative_turns.take(CallSid, SpeechResult)
+            if speculative_task and (llm_output or cached_reply):
+                speculative_task.cancel()
+                speculative_task = None
+            
+            try:
+                speculation = await deadline.run(speculative_task, TTS_RESERVE_SECONDS) if speculative_task else None
+                
+                if llm_output:
+                    logger.info(f"⚡ All slots resolved locally - skipping LLM - CallSid: {CallSid}")
+                elif cached_reply:
+                    logger.info(f"💾 Reply served from response cache - CallSid: {CallSid}")
+                    llm_output = parse_llm_output(cached_reply, "", session)
+                elif speculation:
+                    speculative_turns.record_reuse(CallSid)
+                    for key in ("history_summary", "summarized_count", "token_usage", "token_totals"):
+                        if key in speculation["session"]:
+                            session[key] = speculation["session"][key]
+                    llm_output = parse_llm_output(speculation["result"], speculation["content"], session)
+                    response_cache.put(cache_key, llm_output.model_dump(), profile.slots)
+                elif play_urls and elevenlabs_tts.is_configured() and not model_router.is_simple(SpeechResult):
+                    # Stream the reply and synthesize feedback sentence by sentence
+                    turn, stream_task = start_streaming_turn(SpeechResult, session, language)
+                    first_audio_url = await deadline.run(turn.wait_for_first_segment())
+                    
+                    if first_audio_url and not turn.finished:
+                        # Play the first sentence now; the rest streams from /turn-audio
+                        logger.info(f"⚡ Streaming turn {turn.turn_id} - CallSid: {CallSid}")
+                        evict_stale_turns()
+                        streaming_turns[turn.turn_id] = turn
+                        pending_turns[CallSid] = (
+                            turn.turn_id,
+                            asyncio.create_task(finish_streaming_turn(CallSid, session, turn, stream_task, cache_key))
+                        )
+                        
+                        # The feedback text is still being generated - only its audio is known yet
+                        audio_urls = [first_audio_url, f"{WEBHOOK_BASE_URL}/turn-audio/{turn.turn_id}"]
+                        return TurnReply("", language, audio_urls=audio_urls)
+                    
+                    await deadline.run(stream_task, TTS_RESERVE_SECONDS)
+                    llm_output = parse_llm_output(turn.result(), turn.content, session)
+                    response_cache.put(cache_key, llm_output.model_dump(), profile.slots)
+                else:
+                    llm_output = await deadline.run(process_llm_response(SpeechResult, session), TTS_RESERVE_SECONDS)
+                    response_cache.put(cache_key, llm_output.model_dump(), profile.slots)
+            
+            except asyncio.TimeoutError:
+                # No reply within the budget - ask the caller to repeat instead of staying silent
+                if turn:
+                    stream_task.cancel()
+                deadline.record_fallback(FALLBACK_REPROMPT, "LLM reply not ready within the turn budget")
+                
+                reprompt_msg = AGENT_METADATA[agent_type].get("reprompt_msg", {}).get(language, DEFAULT_REPROMPT_MSG)
+                logger.info(f"🔊 Reprompt Message: {reprompt_msg}")
+                session["history"].append({"role": "assistant", "content": reprompt_msg})
+                await save_call_within(CallSid, session, deadline)
+                
+                return TurnReply(reprompt_msg, language, deadline=deadline)
             
             # Log LLM response
             logger.info(f"📝 LLM Response - Type: {llm_output.response_type}, Feedback: {llm_output.feedback[:100]}...")
             
+            # Every required slot is filled - confirm now instead of waiting for the model's verdict
+            if llm_output.response_type == "NEED_MORE_INFO" and profile.is_complete(session["collected_data"]):
+                logger.info(f"🧩 All required slots collected - moving to confirmation - CallSid: {CallSid}")
+                llm_output = llm_output.model_copy(update={"response_type": "THANK_YOU_RESPONSE"})
+            
             # Add AI response to history
             session["history"].append({"role": "assistant", "content": llm_output.feedback})
             
             # Save to database
             active_calls[CallSid] = session
-            db.save_call(CallSid, session)
-            
-            language = session.get("language", "English")
+            await save_call_within(CallSid, session, deadline)
             
             # Handle response type
             if llm_output.response_type == "THANK_YOU_RESPONSE":
@@ -501,45 +989,47 @@ async def process_response(CallSid: str = Form(...), SpeechResult: Optional[str]
                 logger.info(f"🔊 Confirmation Message: {confirmation_msg}")
                 
                 # Save to database
-                db.save_call(CallSid, session)
+                await save_call_within(CallSid, session, deadline)
                 
                 # Ask for confirmation (using same endpoint)
-                twiml = generate_twiml(confirmation_msg, "/process-response", language)
-                return Response(content=twiml, media_type="application/xml")
+                audio_url = await synthesize_confirmation(session["collected_data"], agent_type, language, deadline) if play_urls else None
+                return TurnReply(confirmation_msg, language, deadline=deadline, audio_urls=[audio_url] if audio_url else None)
             
             elif llm_output.response_type == "HANDOVER_TO_HUMAN":
                 # Transfer to human
                 logger.info(f"📞 Handover to human requested - CallSid: {CallSid}")
+                speculative_turns.end_call(CallSid)
                 negative_msg = AGENT_METADATA[agent_type]["negative_thank_you_msg"]
                 logger.info(f"🔊 Response Message: {negative_msg}")
                 
-                response = VoiceResponse()
-                response.say(negative_msg, voice=get_twilio_voice(language), language=get_twilio_language_code(language))
-                response.hangup()
-                return Response(content=str(response), media_type="application/xml")
+                return TurnReply(negative_msg, language, hang_up=True, prerendered=True)
             
             else:
                 # Need more info
                 logger.info(f"❓ Need more info - CallSid: {CallSid}")
                 logger.info(f"🔊 Response Message: {llm_output.feedback}")
                 
-                twiml = generate_twiml(llm_output.feedback, "/process-response", language)
-                return Response(content=twiml, media_type="application/xml")
+                # Reuse the audio segments synthesized while streaming
+                try:
+                    audio_urls = await deadline.run(turn.collect_audio_urls()) if turn else None
+                except asyncio.TimeoutError:
+                    audio_urls = None
+                return TurnReply(llm_output.feedback, language, deadline=deadline, audio_urls=audio_urls or None)
         
         except Exception as e:
             # ✅ CHANGE 3: Better error message
             logger.error(f"❌ Error processing response for CallSid {CallSid}: {str(e)}", exc_info=True)
             
-            message = "I apologize, but our system is experiencing technical difficulties. Please try again later or contact support."
+            message = TECHNICAL_ERROR_MSG
             language = session.get("language", "English")
             logger.info(f"🔊 Error Response Message: {message}")
             
-            twiml = generate_twiml(message, "/process-response", language)
-            return Response(content=twiml, media_type="application/xml")
+            return TurnReply(message, language, deadline=deadline)
     
     # Stage 4: Confirmation
     if stage == "confirmation":
         session["history"].append({"role": "user", "content": SpeechResult})
+        language = session.get("language", "English")
         
         try:
             # Check if user confirmed
@@ -555,14 +1045,12 @@ async def process_response(CallSid: str = Form(...), SpeechResult: Optional[str]
                 db.save_collected_data(CallSid, agent_type, session["collected_data"])
                 
                 logger.info(f"✅ Call completed successfully - CallSid: {CallSid}")
+                speculative_turns.end_call(CallSid)
                 logger.info(f"📊 Final Data: {session['collected_data']}")
                 logger.info(f"🔊 Thank You Message: {thank_you_msg}")
                 
                 # End call
-                response = VoiceResponse()
-                response.say(thank_you_msg, voice=get_twilio_voice(language), language=get_twilio_language_code(language))
-                response.hangup()
-                return Response(content=str(response), media_type="application/xml")
+                return TurnReply(thank_you_msg, language, hang_up=True, prerendered=True)
             
             elif any(word in confirmation_response for word in ["no", "wrong", "incorrect", "change", "modify"]):
                 # Not confirmed - Go back to collecting
@@ -576,10 +1064,9 @@ async def process_response(CallSid: str = Form(...), SpeechResult: Optional[str]
                 logger.info(f"🔊 Retry Message: {retry_msg}")
                 
                 # Save to database
-                db.save_call(CallSid, session)
+                await save_call_within(CallSid, session, deadline)
                 
-                twiml = generate_twiml(retry_msg, "/process-response", language)
-                return Response(content=twiml, media_type="application/xml")
+                return TurnReply(retry_msg, language, deadline=deadline)
             
             else:
                 # Unclear response - Ask again
@@ -589,8 +1076,7 @@ async def process_response(CallSid: str = Form(...), SpeechResult: Optional[str]
                 clarify_msg = AGENT_METADATA[agent_type]["clarify_msg"].get(language, "I didn't understand. Please say 'yes' if the information is correct, or 'no' if you want to change it.")
                 logger.info(f"🔊 Clarification Message: {clarify_msg}")
                 
-                twiml = generate_twiml(clarify_msg, "/process-response", language)
-                return Response(content=twiml, media_type="application/xml")
+                return TurnReply(clarify_msg, language, deadline=deadline)
         
         except Exception as e:
             # ✅ CHANGE 3: Better error message
@@ -600,18 +1086,128 @@ async def process_response(CallSid: str = Form(...), SpeechResult: Optional[str]
             language = session.get("language", "English")
             logger.info(f"🔊 Error Response Message: {message}")
             
-            response = VoiceResponse()
-            response.say(message, voice=get_twilio_voice(language), language=get_twilio_language_code(language))
-            response.hangup()
-            return Response(content=str(response), media_type="application/xml")
+            return TurnReply(message, language, hang_up=True)
     
     # Default
     message = "Could you please repeat?"
     language = session.get("language", "English")
-    twiml = generate_twiml(message, "/process-response", language)
+    return TurnReply(message, language, deadline=deadline)
+
+
+@app.post("/process-response")
+async def process_response(CallSid: str = Form(...), SpeechResult: Optional[str] = Form(None)):
+    """Twilio <Gather> action - run the caller's turn and answer with TwiML"""
+    reply = await run_turn(CallSid, SpeechResult)
+    if reply is None:
+        return Response(
+            content="<Response><Say>Call not found</Say></Response>",
+            media_type="application/xml"
+        )
+    
+    twiml = await generate_reply_twiml(reply, "/process-response")
     return Response(content=twiml, media_type="application/xml")
 
 
+@app.post("/partial-speech")
+async def partial_speech(CallSid: str = Form(...), StableSpeechResult: Optional[str] = Form(None), UnstableSpeechResult: Optional[str] = Form(None)):
+    """Twilio partialResultCallback - start the LLM turn early once the partial transcript is stable"""
+    session = active_calls.get(CallSid)
+    if not SPECULATIVE_TURNS or not session or session["stage"] not in ["welcome", "collecting"]:
+        return Response(status_code=204)
+    
+    # The previous streamed turn must finish updating the session first
+    if CallSid in pending_turns and not pending_turns[CallSid][1].done():
+        return Response(status_code=204)
+    
+    text = speculative_turns.is_stable(CallSid, StableSpeechResult or "", UnstableSpeechResult or "")
+    if text:
+        language = session.get("language", "English")
+        speculative_turns.start(CallSid, text, lambda: run_speculative_turn(text, session, language))
+    
+    return Response(status_code=204)
+
+
+@app.websocket("/media-stream")
+async def media_stream(websocket: WebSocket):
+    """Twilio Media Stream of a /voice-stream call - caller audio is cut into turns by VAD, replies stream back"""
+    await websocket.accept()
+    
+    vad = EnergyVAD()
+    utterances: asyncio.Queue = asyncio.Queue()
+    player: Optional[MediaStreamPlayer] = None
+    call_task: Optional[asyncio.Task] = None
+    call_sid = None
+    closing: List[asyncio.Task] = []
+    
+    def call_done(task: asyncio.Task):
+        """End the stream of a call that failed - the caller would otherwise sit in silence"""
+        if task.cancelled() or task.exception() is None:
+            return
+        error = task.exception()
+        logger.error(f"❌ Media stream call failed - CallSid: {call_sid}: {str(error) or type(error).__name__}", exc_info=error)
+        closing.append(asyncio.create_task(player.close()))
+    
+    try:
+        while player is None or not player.closed:
+            message = await websocket.receive_json()
+            event = message.get("event")
+            
+            if event == "start":
+                start = message["start"]
+                call_sid = start["callSid"]
+                agent_type = start.get("customParameters", {}).get("agent_type", "LOGISTICS")
+                if agent_type not in AGENT_METADATA:
+                    logger.error(f"❌ Invalid agent_type: {agent_type} - closing media stream of CallSid: {call_sid}")
+                    await websocket.close()
+                    break
+                logger.info(f"🎧 Media stream started: {start['streamSid']} - CallSid: {call_sid}, Agent: {agent_type}")
+                
+                media_stream_stats.calls += 1
+                media_stream_stats.active_calls += 1
+                player = MediaStreamPlayer(websocket, start["streamSid"])
+                call_task = asyncio.create_task(run_media_stream_call(call_sid, agent_type, player, utterances))
+                call_task.add_done_callback(call_done)
+            
+            elif event == "media" and player is not None:
+                utterance = vad.feed(base64.b64decode(message["media"]["payload"]))
+                
+                if vad.speaking and MEDIA_STREAM_BARGE_IN and player.is_playing():
+                    # The caller talks over the reply - stop it
+                    logger.info(f"✋ Barge-in - CallSid: {call_sid}")
+                    media_stream_stats.barge_ins += 1
+                    await player.clear()
+                
+                if utterance:
+                    utterances.put_nowait((utterance, time.monotonic()))
+            
+            elif event == "mark" and player is not None:
+                player.played(message["mark"]["name"])
+            
+            elif event == "stop":
+                logger.info(f"🎧 Media stream stopped - CallSid: {call_sid}")
+                break
+    
+    except WebSocketDisconnect:
+        logger.info(f"🎧 Media stream disconnected - CallSid: {call_sid}")
+    
+    finally:
+        if call_task:
+            media_stream_stats.active_calls -= 1
+            call_task.cancel()
+            await asyncio.gather(call_task, *closing, return_exceptions=True)
+        if call_sid in active_calls:
+            db.save_call(call_sid, active_calls[call_sid])
+
+
+@app.post("/call-status-callback")
+async def call_status_callback(CallSid: str = Form(...), CallStatus: Optional[str] = Form(None)):
+    """Twilio statusCallback - drop the in-memory state of a call that has ended"""
+    if CallStatus in CALL_ENDED_STATUSES:
+        logger.info(f"📴 Call ended ({CallStatus}) - CallSid: {CallSid}")
+        end_call_state(CallSid)
+    return Response(status_code=204)
+
+
 @app.get("/call-status/{call_sid}")
 async def get_call_status(call_sid: str):
     """Get current call status and collected data"""
@@ -632,19 +1228,79 @@ async def get_call_status(call_sid: str):
     return {"error": "Call not found"}
 
 
-@app.get("/audio/{filename}")
-async def serve_audio_file(filename: str):
-    """Serve ElevenLabs generated audio files"""
-    file_path = os.path.join("temp_audio", filename)
+@app.api_route("/audio/{filename}", methods=["GET", "HEAD"])
+async def serve_audio_file(filename: str, request: Request):
+    """Serve ElevenLabs generated audio files (hot clips from memory, the rest streamed from disk)
+
+    Strong ETags from the content hash let Twilio, CDNs and proxies revalidate with a 304; byte ranges get a 206.
+    """
+    # Manifest lookup (sqlite, and a one-off hash of files written before ETags were recorded)
+    clip = await asyncio.to_thread(audio_storage.get_clip_info, filename)
     
-    if os.path.exists(file_path):
-        return FileResponse(
-            file_path,
-            media_type="audio/mpeg",
-            headers={"Cache-Control": "public, max-age=3600"}
-        )
-    else:
-        return {"error": "Audio file not found"}
+    if clip is None:
+        return JSONResponse({"error": "Audio file not found"}, status_code=404)
+    
+    size, etag = clip
+    content = audio_cache.get(filename)
+    if content is None and audio_cache.admits(size):
+        # Small clips (static prompts, common phrases) are kept in memory again after a restart or eviction
+        content = await asyncio.to_thread(audio_storage.load_audio_file, filename)
+        if content is None:
+            return JSONResponse({"error": "Audio file not found"}, status_code=404)
+    
+    return clip_response(
+        request, size, etag,
+        media_type=audio_storage.get_media_type(filename),
+        cache_control=audio_storage.get_cache_control(filename),
+        content=content,
+        path=audio_storage.get_file_path(filename)
+    )
+
+
+@app.get("/audio-stream/{filename}")
+async def stream_audio_file(filename: str, request: Request):
+    """Play an ElevenLabs stream opened by the turn while it is being synthesized (cached to temp_audio in the same pass)"""
+    if audio_storage.file_exists(filename):
+        return await serve_audio_file(filename, request)
+    
+    stream = pending_audio_streams.pop(filename, None)
+    if stream is not None and not stream.started and not stream.closed:
+        return StreamingResponse(stream, media_type=audio_storage.get_media_type(filename))
+    
+    # Fetched again while the stream is still being read (e.g. a retry) - wait for its file
+    if await elevenlabs_tts.wait_for_file(filename):
+        return await serve_audio_file(filename, request)
+    
+    return JSONResponse({"error": "Audio file not found"}, status_code=404)
+
+
+@app.get("/turn-audio/{turn_id}")
+async def serve_turn_audio(turn_id: str):
+    """Stream the remaining audio segments of a turn as they are synthesized"""
+    turn = streaming_turns.get(turn_id)
+    
+    if not turn:
+        return JSONResponse({"error": "Turn not found"}, status_code=404)
+    
+    return StreamingResponse(turn.iter_remaining_audio(), media_type=audio_storage.get_media_type(f"{turn_id}{elevenlabs_tts.file_extension}"))
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Get runtime metrics (LLM concurrency, client pool, model tiers, local slot extraction, response cache, segmented TTS, audio cache, TTS requests, warmup and queue, speculative turns, media streams)"""
+    return {
+        "llm": llm_engine.get_metrics(),
+        "llm_pool": llm_pool.get_metrics(),
+        "model_router": model_router.get_metrics(),
+        "slot_extraction": extraction_stats.get_metrics(),
+        "response_cache": response_cache.get_metrics(),
+        "segmented_tts": segmented_renderer.get_metrics(),
+        "audio_cache": audio_cache.get_metrics(),
+        "tts": elevenlabs_tts.get_metrics(),
+        "tts_queue": tts_queue.get_metrics(),
+        "speculative_turns": speculative_turns.get_metrics(),
+        "media_streams": media_stream_stats.get_metrics()
+    }
 
 
 @app.get("/")
@@ -658,8 +1314,10 @@ async def root():
         "database": "MongoDB",
         "endpoints": {
             "start_call": "POST /start-call?agent_type=PIZZA&phone_number=+91xxx",
+            "start_stream_call": "POST /start-call?agent_type=PIZZA&phone_number=+91xxx&mode=stream",
             "call_status": "GET /call-status/{call_sid}",
-            "audio": "GET /audio/{filename}"
+            "audio": "GET /audio/{filename}",
+            "metrics": "GET /metrics"
         }
     }
 
@@ -0,0 +1,103 @@
+"""
+In-Memory Audio Cache
+Byte-bounded LRU of hot audio clips (static prompts, common phrases), keyed by audio filename.
+Shared by the TTS cache lookup and the /audio serving path so hot clips never touch the disk.
+"""
+
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AudioCache:
+    """LRU of audio bytes bounded by total size"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, enabled: bool = True, max_promote_bytes: int = 512 * 1024):
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+
+        # Clips up to this size are loaded into memory when served from disk; larger ones are streamed from the file
+        self.max_promote_bytes = max_promote_bytes
+        self._clips: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+
+        # The sync TTS path runs in worker threads
+        self._lock = threading.Lock()
+
+        # Stats
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, filename: str) -> bool:
+        """Membership check that does not count as a lookup or refresh the entry"""
+        return self.enabled and filename in self._clips
+
+    def get(self, filename: str) -> Optional[bytes]:
+        """Get a clip (None on miss)"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            audio = self._clips.get(filename)
+            if audio is None:
+                self.misses += 1
+                return None
+            self._clips.move_to_end(filename)
+            self.hits += 1
+            return audio
+
+    def put(self, filename: str, audio: bytes) -> bool:
+        """Keep a clip in memory, evicting the least recently used ones; returns True if stored"""
+        if not self.enabled or not audio or len(audio) > self.max_bytes:
+            return False
+
+        with self._lock:
+            previous = self._clips.pop(filename, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._clips[filename] = audio
+            self._size += len(audio)
+
+            while self._size > self.max_bytes:
+                _, evicted = self._clips.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+        return True
+
+    def admits(self, size: int) -> bool:
+        """Whether a clip of this size read from disk should be kept in memory"""
+        return self.enabled and 0 < size <= min(self.max_promote_bytes, self.max_bytes)
+
+    def discard(self, filename: str):
+        """Drop a clip (e.g. when its file is deleted)"""
+        with self._lock:
+            audio = self._clips.pop(filename, None)
+            if audio is not None:
+                self._size -= len(audio)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "clips": len(self._clips),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "max_promote_bytes": self.max_promote_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+
+# Global instance - shared by audio storage, the TTS service and the audio endpoints
+audio_cache = AudioCache(
+    max_bytes=int(float(os.getenv("AUDIO_CACHE_MAX_MB", "64")) * 1024 * 1024),
+    enabled=os.getenv("AUDIO_CACHE_ENABLED", "true").lower() == "true",
+    max_promote_bytes=int(float(os.getenv("AUDIO_CACHE_PROMOTE_MAX_KB", "512")) * 1024)
+)
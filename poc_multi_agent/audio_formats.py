@@ -0,0 +1,90 @@
+"""
+Audio Formats
+ElevenLabs output formats and how their clips are stored and served (MP3 as is, u-law/PCM wrapped in WAV).
+Telephony-grade formats (ulaw_8000, mp3_22050_32) keep clips small - Twilio plays 8 kHz audio anyway.
+"""
+
+import os
+import struct
+from typing import Iterable, Optional, Tuple
+
+MEDIA_TYPES = {".mp3": "audio/mpeg", ".wav": "audio/wav"}
+
+# WAV format tags and the header written in front of raw u-law/PCM audio
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_MULAW = 7
+WAV_HEADER_BYTES = 44
+
+# Size fields of a WAV header whose length is not known yet (streamed audio)
+STREAMING_SIZE = 0xFFFFFFFF
+
+
+def parse_output_format(output_format: str) -> Tuple[str, int]:
+    """Split an ElevenLabs output format (e.g. "mp3_22050_32", "ulaw_8000") into (codec, sample rate)"""
+    parts = output_format.split("_")
+    if len(parts) < 2 or parts[0] not in ("mp3", "ulaw", "pcm") or not parts[1].isdigit():
+        raise ValueError(f"Unsupported ElevenLabs output format: {output_format}")
+    return parts[0], int(parts[1])
+
+
+def file_extension(output_format: str) -> str:
+    """Extension of stored clips in an output format"""
+    codec, _ = parse_output_format(output_format)
+    return ".mp3" if codec == "mp3" else ".wav"
+
+
+def media_type(filename: str) -> str:
+    """Media type an audio file is served with (by extension)"""
+    return MEDIA_TYPES.get(os.path.splitext(filename)[1], "application/octet-stream")
+
+
+def wav_header(output_format: str, data_size: Optional[int] = None) -> bytes:
+    """WAV header for raw u-law/PCM audio (data_size None: unknown length, for streaming)"""
+    codec, sample_rate = parse_output_format(output_format)
+    format_tag, bits_per_sample = (WAVE_FORMAT_MULAW, 8) if codec == "ulaw" else (WAVE_FORMAT_PCM, 16)
+    block_align = bits_per_sample // 8
+    riff_size = STREAMING_SIZE if data_size is None else 36 + data_size
+    data_size = STREAMING_SIZE if data_size is None else data_size
+
+    return (
+        b"RIFF" + struct.pack("<I", riff_size) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, format_tag, 1, sample_rate, sample_rate * block_align, block_align, bits_per_sample)
+        + b"data" + struct.pack("<I", data_size)
+    )
+
+
+def strip_id3(audio: bytes) -> bytes:
+    """Drop ID3v2/ID3v1 tags so the MP3 frames of several files can be joined"""
+    if audio[:3] == b"ID3" and len(audio) >= 10:
+        # Tag size is a 28-bit syncsafe integer; a footer adds another 10 bytes
+        size = (audio[6] << 21) | (audio[7] << 14) | (audio[8] << 7) | audio[9]
+        footer = 10 if audio[5] & 0x10 else 0
+        audio = audio[10 + size + footer:]
+    if len(audio) >= 128 and audio[-128:-125] == b"TAG":
+        audio = audio[:-128]
+    return audio
+
+
+def is_mp3(output_format: str) -> bool:
+    return parse_output_format(output_format)[0] == "mp3"
+
+
+def to_stored(audio: bytes, output_format: str) -> bytes:
+    """Playable file content for audio returned by ElevenLabs"""
+    return audio if is_mp3(output_format) else wav_header(output_format, len(audio)) + audio
+
+
+def stream_header(output_format: str) -> bytes:
+    """Bytes sent before streamed audio (a WAV header of unknown length for u-law/PCM)"""
+    return b"" if is_mp3(output_format) else wav_header(output_format)
+
+
+def payload(stored: bytes, output_format: str) -> bytes:
+    """Audio frames of a stored clip, without tags or headers"""
+    return strip_id3(stored) if is_mp3(output_format) else stored[WAV_HEADER_BYTES:]
+
+
+def join_clips(clips: Iterable[bytes], output_format: str) -> bytes:
+    """Join stored clips of the same format into one playable file"""
+    audio = b"".join(payload(clip, output_format) for clip in clips)
+    return audio if is_mp3(output_format) else wav_header(output_format, len(audio)) + audio
@@ -0,0 +1,168 @@
+"""
+Audio Responses
+Serves stored clips with strong ETags, conditional GET (304) and byte ranges (206, multipart/byteranges).
+Hot clips go out from memory; file bodies are read in chunks with os.pread in a worker thread.
+"""
+
+import os
+import uuid
+import anyio
+from typing import Dict, List, Optional, Tuple, Union
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+# Bytes read from the file per send
+FILE_CHUNK_BYTES = 64 * 1024
+
+# More (coalesced) ranges than this are answered with the whole file
+MAX_RANGES = 16
+
+# A body part: bytes, or (offset, count) of the file
+BodyPart = Union[bytes, Tuple[int, int]]
+
+
+def etag_matches(header: str, etag: str, weak: bool = True) -> bool:
+    """Whether an If-None-Match / If-Range header matches the ETag (weak=False: W/ tags never match)"""
+    if header.strip() == "*":
+        return True
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            if not weak:
+                continue
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def parse_range(header: str, size: int) -> Optional[List[Tuple[int, int]]]:
+    """Byte ranges of a Range header as sorted, coalesced (start, end) pairs, end inclusive
+
+    None means the header is ignored (not bytes, or malformed); [] means no range is satisfiable.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec.strip():
+        return None
+
+    ranges = []
+    for part in spec.split(","):
+        first, dash, last = part.strip().partition("-")
+        first, last = first.strip(), last.strip()
+        if not dash or not (first or last) or (first and not first.isdigit()) or (last and not last.isdigit()):
+            return None
+
+        if not first:
+            # Suffix range: the last N bytes
+            if int(last) > 0 and size > 0:
+                ranges.append((max(0, size - int(last)), size - 1))
+            continue
+
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        if start < size:
+            ranges.append((start, min(int(last), size - 1) if last else size - 1))
+
+    coalesced = []
+    for start, end in sorted(ranges):
+        if coalesced and start <= coalesced[-1][1] + 1:
+            coalesced[-1] = (coalesced[-1][0], max(coalesced[-1][1], end))
+        else:
+            coalesced.append((start, end))
+    return coalesced
+
+
+class ClipResponse(Response):
+    """Body made of byte strings and file segments, streamed part by part"""
+
+    def __init__(self, parts: List[BodyPart], path: Optional[str], status_code: int, headers: Dict[str, str], media_type: str, send_body: bool = True):
+        self.parts = parts
+        self.path = path
+        self.send_body = send_body
+
+        length = sum(part[1] if isinstance(part, tuple) else len(part) for part in parts)
+        super().__init__(status_code=status_code, headers={**headers, "Content-Length": str(length)}, media_type=media_type)
+
+    async def __call__(self, scope, receive, send):
+        file = None
+        if self.send_body and any(isinstance(part, tuple) for part in self.parts):
+            try:
+                file = await anyio.to_thread.run_sync(open, self.path, "rb")
+            except FileNotFoundError:
+                # Deleted since the manifest lookup (e.g. by cleanup)
+                await JSONResponse({"error": "Audio file not found"}, status_code=404)(scope, receive, send)
+                return
+
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            if not self.send_body:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+                return
+
+            for index, part in enumerate(self.parts):
+                more_body = index < len(self.parts) - 1
+                if isinstance(part, bytes):
+                    await send({"type": "http.response.body", "body": part, "more_body": more_body})
+                elif not await self._send_file_segment(send, file, part, more_body):
+                    break
+        finally:
+            if file is not None:
+                file.close()
+
+    @staticmethod
+    async def _send_file_segment(send, file, segment: Tuple[int, int], more_body: bool) -> bool:
+        """Send a file segment in chunks; returns False if the file ended early (the body is closed then)"""
+        offset, count = segment
+        if count == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": more_body})
+        while count > 0:
+            chunk = await anyio.to_thread.run_sync(os.pread, file.fileno(), min(FILE_CHUNK_BYTES, count), offset)
+            if not chunk:
+                # Truncated behind our back - end the body rather than hang the client
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+                return False
+            offset += len(chunk)
+            count -= len(chunk)
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body or count > 0})
+        return True
+
+
+def clip_response(request: Request, size: int, etag: str, media_type: str, cache_control: str, content: Optional[bytes] = None, path: Optional[str] = None) -> Response:
+    """Response for a stored clip (content from memory, else the file at path), honoring conditional and range headers"""
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Accept-Ranges": "bytes"}
+    if content is not None:
+        size = len(content)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    ranges = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or etag_matches(if_range, etag, weak=False)):
+        ranges = parse_range(range_header, size)
+        if ranges == []:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    def segment(start: int, end: int) -> BodyPart:
+        return content[start:end + 1] if content is not None else (start, end - start + 1)
+
+    send_body = request.method != "HEAD"
+    if not ranges or len(ranges) > MAX_RANGES:
+        return ClipResponse([content if content is not None else (0, size)], path, 200, headers, media_type, send_body)
+
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        return ClipResponse([segment(start, end)], path, 206, headers, media_type, send_body)
+
+    boundary = uuid.uuid4().hex
+    parts: List[BodyPart] = []
+    for start, end in ranges:
+        part_headers = f"--{boundary}\r\nContent-Type: {media_type}\r\nContent-Range: bytes {start}-{end}/{size}\r\n\r\n"
+        parts.append((b"\r\n" if parts else b"") + part_headers.encode())
+        parts.append(segment(start, end))
+    parts.append(f"\r\n--{boundary}--\r\n".encode())
+    return ClipResponse(parts, path, 206, headers, f"multipart/byteranges; boundary={boundary}", send_body)
@@ -1,22 +1,126 @@
 """
 Audio Storage Service
 Handles audio file storage and serving for Twilio (like original app/audio_storage.py)
+Files are sharded into subdirectories and indexed in a SQLite manifest, so lookups never stat the disk.
+The manifest also keeps each file's content hash, served as its ETag.
 """
 
 import os
+import re
+import time
+import uuid
+import sqlite3
+import hashlib
 import logging
-from typing import Optional
+import threading
+from typing import List, Optional, Tuple
+from audio_cache import audio_cache
+from audio_formats import media_type
 
 logger = logging.getLogger(__name__)
 
+MANIFEST_FILENAME = "manifest.sqlite3"
+
+# Directory the clips and their manifest are stored in
+AUDIO_DIR = os.getenv("AUDIO_DIR", "temp_audio")
+
+# ElevenLabs clips (and clips joined from them) are named by the hash of their synthesis requests - a name never changes content
+CONTENT_ADDRESSED_FILENAME = re.compile(r"^(elevenlabs|segmented)_[0-9a-f]{64}\.\w+$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+DEFAULT_CACHE_CONTROL = "public, max-age=3600"
+
+
+def write_file_atomic(file_path: str, content: bytes):
+    """Write a file through a temp file + rename, so readers never see a partial file"""
+    temp_path = f"{file_path}.{uuid.uuid4().hex}.part"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(content)
+        os.replace(temp_path, file_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def content_etag(content: bytes) -> str:
+    """Strong ETag of a file (sha256 of its content)"""
+    return f'"{hashlib.sha256(content).hexdigest()}"'
+
+
+def shard_path(filename: str) -> str:
+    """Relative path of a file in the two-level shard layout (ab/cd/filename)"""
+    digest = hashlib.sha256(filename.encode()).hexdigest()
+    return os.path.join(digest[:2], digest[2:4], filename)
+
+
+class AudioManifest:
+    """SQLite index of the stored audio files (filename, size, creation time, ETag)"""
+    
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS clips ("
+            "filename TEXT PRIMARY KEY, size INTEGER NOT NULL, created_at REAL NOT NULL, etag TEXT)"
+        )
+        
+        # Manifests written before ETags were recorded
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(clips)")]
+        if "etag" not in columns:
+            self._conn.execute("ALTER TABLE clips ADD COLUMN etag TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS clips_created_at ON clips (created_at)")
+    
+    def contains(self, filename: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM clips WHERE filename = ?", (filename,)).fetchone()
+        return row is not None
+    
+    def get(self, filename: str) -> Optional[Tuple[int, Optional[str]]]:
+        """Size and ETag of a file (None if not stored)"""
+        with self._lock:
+            row = self._conn.execute("SELECT size, etag FROM clips WHERE filename = ?", (filename,)).fetchone()
+        return (row[0], row[1]) if row else None
+    
+    def add(self, filename: str, size: int, etag: Optional[str] = None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO clips (filename, size, created_at, etag) VALUES (?, ?, ?, ?)",
+                (filename, size, time.time(), etag)
+            )
+    
+    def set_etag(self, filename: str, etag: str):
+        with self._lock:
+            self._conn.execute("UPDATE clips SET etag = ? WHERE filename = ?", (etag, filename))
+    
+    def remove(self, filename: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM clips WHERE filename = ?", (filename,))
+    
+    def created_before(self, cutoff: float) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT filename FROM clips WHERE created_at < ?", (cutoff,)).fetchall()
+        return [row[0] for row in rows]
+    
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM clips").fetchone()[0]
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
 
 class AudioStorage:
     """Handle audio file storage and serving for Twilio"""
     
     def __init__(self, base_url: str = "http://localhost:8000"):
         self.base_url = base_url
-        self.audio_dir = "temp_audio"
+        self.audio_dir = AUDIO_DIR
         self.ensure_audio_directory()
+        self.manifest = AudioManifest(os.path.join(self.audio_dir, MANIFEST_FILENAME))
     
     def ensure_audio_directory(self):
         """Ensure audio directory exists"""
@@ -24,13 +128,23 @@ class AudioStorage:
             os.makedirs(self.audio_dir)
             logger.info(f"Created audio directory: {self.audio_dir}")
     
+    def get_file_path(self, filename: str) -> str:
+        """Local path of an audio file (in its shard directory)"""
+        return os.path.join(self.audio_dir, shard_path(filename))
+    
+    def record_file(self, filename: str, audio_content: bytes):
+        """Add a file written into its shard directory to the manifest"""
+        self.manifest.add(filename, len(audio_content), content_etag(audio_content))
+    
     def save_audio_file(self, audio_content: bytes, filename: str) -> Optional[str]:
         """Save audio content and return public URL"""
         try:
-            file_path = os.path.join(self.audio_dir, filename)
+            file_path = self.get_file_path(filename)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
             
-            with open(file_path, 'wb') as f:
-                f.write(audio_content)
+            write_file_atomic(file_path, audio_content)
+            self.record_file(filename, audio_content)
+            audio_cache.put(filename, audio_content)
             
             # Return public URL that Twilio can access
             public_url = f"{self.base_url}/audio/{filename}"
@@ -42,10 +156,57 @@ class AudioStorage:
             logger.error(f"Error saving audio file: {str(e)}")
             return None
     
+    def read_audio_file(self, filename: str) -> Optional[bytes]:
+        """Read saved audio content (None if missing) - hot clips come from memory"""
+        audio_content = audio_cache.get(filename)
+        if audio_content is not None:
+            return audio_content
+        return self.load_audio_file(filename)
+    
+    def load_audio_file(self, filename: str) -> Optional[bytes]:
+        """Read saved audio content from disk into the memory cache (None if missing)"""
+        try:
+            with open(self.get_file_path(filename), 'rb') as f:
+                audio_content = f.read()
+            audio_cache.put(filename, audio_content)
+            return audio_content
+        except FileNotFoundError:
+            # Deleted behind the manifest's back
+            self.manifest.remove(filename)
+            return None
+        except Exception as e:
+            logger.error(f"Error reading audio file {filename}: {str(e)}")
+            return None
+    
     def file_exists(self, filename: str) -> bool:
-        """Check if audio file already exists"""
-        file_path = os.path.join(self.audio_dir, filename)
-        return os.path.exists(file_path)
+        """Check if audio file already exists (memory cache, then manifest - no filesystem stat)"""
+        if filename in audio_cache:
+            return True
+        return self.manifest.contains(filename)
+    
+    def get_clip_info(self, filename: str) -> Optional[Tuple[int, str]]:
+        """Size and ETag of a stored file (None if missing) - from the manifest, no filesystem stat"""
+        info = self.manifest.get(filename)
+        if info is None:
+            return None
+        
+        size, etag = info
+        if etag is None:
+            # Recorded before ETags were - hash it once
+            audio_content = self.read_audio_file(filename)
+            if audio_content is None:
+                return None
+            etag = content_etag(audio_content)
+            self.manifest.set_etag(filename, etag)
+        return size, etag
+    
+    def get_cache_control(self, filename: str) -> str:
+        """Cache-Control of a served file (content-addressed clips never change)"""
+        return IMMUTABLE_CACHE_CONTROL if CONTENT_ADDRESSED_FILENAME.match(filename) else DEFAULT_CACHE_CONTROL
+    
+    def get_media_type(self, filename: str) -> str:
+        """Media type a stored file is served with (by extension, e.g. audio/mpeg or audio/wav)"""
+        return media_type(filename)
     
     def get_file_url(self, filename: str) -> str:
         """Get public URL for existing file"""
@@ -54,21 +215,21 @@ class AudioStorage:
     def cleanup_old_files(self, max_age_hours: int = 24):
         """Clean up old audio files"""
         try:
-            import time
-            current_time = time.time()
+            cutoff = time.time() - max_age_hours * 3600
+            
+            for filename in self.manifest.created_before(cutoff):
+                try:
+                    os.remove(self.get_file_path(filename))
+                except FileNotFoundError:
+                    pass
+                self.manifest.remove(filename)
+                audio_cache.discard(filename)
+                logger.info(f"Cleaned up old audio file: {filename}")
             
-            for filename in os.listdir(self.audio_dir):
-                file_path = os.path.join(self.audio_dir, filename)
-                
-                # Skip if not a file
-                if not os.path.isfile(file_path):
-                    continue
-                
-                file_age = current_time - os.path.getctime(file_path)
-                
-                if file_age > (max_age_hours * 3600):  # Convert hours to seconds
-                    os.remove(file_path)
-                    logger.info(f"Cleaned up old audio file: {filename}")
+            # Files left at the top level by the earlier flat layout are never looked up again
+            for entry in os.scandir(self.audio_dir):
+                if entry.is_file() and entry.name.endswith((".mp3", ".wav", ".part")) and entry.stat().st_ctime < cutoff:
+                    os.remove(entry.path)
                     
         except Exception as e:
             logger.error(f"Error cleaning up audio files: {str(e)}")
@@ -82,7 +82,14 @@ class CallDatabase:
                 "stage": session.get("stage"),
                 "language": session.get("language"),
                 "history": session.get("history", []),
+                "history_summary": session.get("history_summary", ""),
+                "summarized_count": session.get("summarized_count", 0),
+                "token_usage": session.get("token_usage", []),
+                "token_totals": session.get("token_totals", {}),
                 "data": session.get("data", {}),
+                "collected_data": session.get("collected_data", {}),
+                "fallbacks": session.get("fallbacks", []),
+                "fallback_counts": session.get("fallback_counts", {}),
                 "updated_at": datetime.utcnow()
             }
             
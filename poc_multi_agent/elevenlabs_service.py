@@ -4,21 +4,110 @@ Matches original app/twilio_service.py implementation with audio_storage
 """
 
 import os
+import uuid
+import asyncio
+import threading
 import requests
+import httpx
+import json
 import hashlib
 import logging
-from typing import Optional
+import importlib.util
+from typing import Any, AsyncGenerator, AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+from audio_cache import audio_cache
+from audio_storage import write_file_atomic
+from audio_formats import file_extension, is_mp3, to_stored, stream_header, wav_header
+from tts_queue import tts_queue, PRIORITY_LIVE, PRIORITY_WARMUP
+
+# httpx negotiates HTTP/2 only with the h2 package installed
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
 
 logger = logging.getLogger(__name__)
 
+# Async client toward the ElevenLabs API (shared by all calls, kept alive between requests)
+ELEVENLABS_HTTP2 = os.getenv("ELEVENLABS_HTTP2", "true").lower() == "true"
+ELEVENLABS_MAX_CONNECTIONS = int(os.getenv("ELEVENLABS_MAX_CONNECTIONS", "10"))
+ELEVENLABS_KEEPALIVE_SECONDS = float(os.getenv("ELEVENLABS_KEEPALIVE_SECONDS", "120"))
+
+# Most synthesis requests in flight at once (ElevenLabs plans cap concurrent requests)
+ELEVENLABS_MAX_CONCURRENCY = int(os.getenv("ELEVENLABS_MAX_CONCURRENCY", "5"))
+
+# Of those, requests prefetch and warmup synthesis may never take - always free for live turns
+ELEVENLABS_LIVE_RESERVED = int(os.getenv("ELEVENLABS_LIVE_RESERVED", "2"))
+
+ELEVENLABS_CONNECT_TIMEOUT_SECONDS = float(os.getenv("ELEVENLABS_CONNECT_TIMEOUT_SECONDS", "3"))
+ELEVENLABS_READ_TIMEOUT_SECONDS = float(os.getenv("ELEVENLABS_READ_TIMEOUT_SECONDS", "15"))
+
+# Telephony-grade encoding by default - Twilio plays 8 kHz audio on the phone line anyway
+# (e.g. "mp3_22050_32", "ulaw_8000"; u-law/PCM clips are stored as WAV)
+ELEVENLABS_OUTPUT_FORMAT = os.getenv("ELEVENLABS_OUTPUT_FORMAT", "mp3_22050_32")
+
+# Latency optimization level of the streaming endpoint (0 = none ... 4 = max, ElevenLabs API)
+ELEVENLABS_STREAM_LATENCY = int(os.getenv("ELEVENLABS_STREAM_LATENCY", "2"))
+
+# Bytes forwarded per chunk while streaming
+STREAM_CHUNK_BYTES = 4096
+
+
+class AudioStream:
+    """Audio chunks of an opened ElevenLabs stream (iterate once)
+
+    The stream holds a client slot and its HTTP response until the chunks are read to the end.
+    aclose() frees both for a stream that is dropped unread - a never-started generator skips its finally.
+    """
+
+    def __init__(self, chunks: AsyncGenerator[bytes, None], release: Callable[[], Awaitable[None]]):
+        self._chunks = chunks
+        self._release = release
+        self.started = False
+        self.closed = False
+
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        self.started = True
+        return self._chunks
+
+    async def aclose(self):
+        self.closed = True
+        if self.started:
+            await self._chunks.aclose()
+        else:
+            await self._release()
+
 
 class ElevenLabsTTS:
-    def __init__(self, audio_storage=None):
+    def __init__(self, audio_storage=None, output_format: str = ELEVENLABS_OUTPUT_FORMAT):
         self.api_key = os.getenv("ELEVENLABS_API_KEY")
         self.voice_id = os.getenv("ELEVENLABS_VOICE_ID")
         self.base_url = "https://api.elevenlabs.io/v1"
         self.audio_storage = audio_storage
         
+        # Raises ValueError at startup for an unknown format
+        self.output_format = output_format
+        self.file_extension = file_extension(output_format)
+        
+        # Sync path (CLI / scripts) reuses its connection through a session
+        self.session = requests.Session()
+        
+        # Async path - created inside the running event loop on first use
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._bulk_slots: Optional[asyncio.Semaphore] = None
+        self._bulk_loop: Optional[asyncio.AbstractEventLoop] = None
+        
+        # Single-flight: one synthesis per cache filename, concurrent callers wait for it
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._sync_inflight: Dict[str, threading.Event] = {}
+        self._sync_lock = threading.Lock()
+        
+        # Stats
+        self.requests = 0
+        self.coalesced = 0
+        self.errors = 0
+        
+        # Static prompt pre-rendering, reported in /metrics while it runs in the background
+        self.warmup_progress = {"running": False, "total": 0, "done": 0, "cached": 0}
+        
         # Voice configurations for different languages
         self.voice_configs = {
             "English": {
@@ -44,65 +133,420 @@ class ElevenLabsTTS:
             }
         }
     
+    def is_configured(self) -> bool:
+        """Check if ElevenLabs credentials are available"""
+        return bool(self.api_key and self.voice_id)
+    
+    def get_cache_filename(self, text: str, language: str = "English") -> str:
+        """Get cache filename for a message - sha256 over the text and every synthesis parameter
+
+        Voice, model, voice settings and output format are part of the key, so changing any of them never serves stale audio.
+        """
+        url, _, params, data = self._build_request(text, language)
+        key = json.dumps({"url": url, "params": params, "body": data}, sort_keys=True, ensure_ascii=False)
+        return f"elevenlabs_{hashlib.sha256(key.encode()).hexdigest()}{self.file_extension}"
+    
+    def get_audio_path(self, filename: str) -> str:
+        """Local path of an audio file in the cache directory"""
+        if self.audio_storage:
+            return self.audio_storage.get_file_path(filename)
+        return os.path.join("temp_audio", filename)
+    
+    def get_cached_audio_url(self, text: str, language: str = "English") -> Optional[str]:
+        """Get the public URL of already generated audio (None if it was never generated)"""
+        return self.get_cached_file_url(self.get_cache_filename(text, language))
+    
+    def get_cached_file_url(self, filename: str) -> Optional[str]:
+        """Get the public URL of an audio file in the cache (None if it is not there)"""
+        # Check using audio_storage if available
+        if self.audio_storage:
+            if self.audio_storage.file_exists(filename):
+                return self.audio_storage.get_file_url(filename)
+            return None
+        
+        # Fallback: check file system directly
+        if os.path.exists(os.path.join("temp_audio", filename)):
+            return self.get_file_url(filename)
+        
+        return None
+    
+    def get_file_url(self, filename: str) -> str:
+        """Public URL of an audio file"""
+        if self.audio_storage:
+            return self.audio_storage.get_file_url(filename)
+        webhook_base = os.getenv("WEBHOOK_BASE_URL", "http://localhost:8000")
+        return f"{webhook_base}/audio/{filename}"
+    
+    async def warmup(self, prompts: Iterable[Tuple[str, str]], concurrency: int = 4) -> int:
+        """Generate audio for (text, language) prompts in parallel; returns how many are cached"""
+        prompts = list(prompts)
+        if not self.is_configured() or not prompts:
+            return 0
+        
+        semaphore = asyncio.Semaphore(concurrency)
+        progress = self.warmup_progress
+        progress.update(running=True, total=len(prompts), done=0, cached=0)
+        
+        async def render(text: str, language: str):
+            async with semaphore:
+                audio_url = await self.agenerate_audio_url(text, language, priority=PRIORITY_WARMUP)
+            progress["done"] += 1
+            if audio_url:
+                progress["cached"] += 1
+            logger.info(f"🎙️ Pre-rendered prompt {progress['done']}/{len(prompts)} ({language}){'' if audio_url else ' - failed'}")
+        
+        try:
+            await asyncio.gather(*(render(text, language) for text, language in prompts))
+        finally:
+            progress["running"] = False
+        return progress["cached"]
+    
+    def _build_request(self, text: str, language: str) -> Tuple[str, Dict[str, str], Dict[str, Any], Dict[str, Any]]:
+        """Get the (url, headers, query params, json body) of a text-to-speech request"""
+        voice_config = self.voice_configs.get(language, self.voice_configs["English"])
+        
+        url = f"{self.base_url}/text-to-speech/{voice_config['voice_id']}"
+        headers = {
+            "Accept": "audio/mpeg" if is_mp3(self.output_format) else "*/*",
+            "Content-Type": "application/json",
+            "xi-api-key": self.api_key
+        }
+        params = {"output_format": self.output_format}
+        data = {
+            "text": text,
+            "model_id": "eleven_multilingual_v2",
+            "voice_settings": voice_config["voice_settings"]
+        }
+        return url, headers, params, data
+    
+    def read_audio(self, filename: str) -> Optional[bytes]:
+        """Read generated audio (None if missing)"""
+        if self.audio_storage:
+            return self.audio_storage.read_audio_file(filename)
+        try:
+            with open(self.get_audio_path(filename), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+    
+    def save_audio(self, audio_content: bytes, filename: str) -> Optional[str]:
+        """Save generated audio and return its public URL"""
+        # Save audio file using audio_storage if available
+        if self.audio_storage:
+            public_url = self.audio_storage.save_audio_file(audio_content, filename)
+        else:
+            # Fallback: save directly to file system
+            os.makedirs("temp_audio", exist_ok=True)
+            write_file_atomic(os.path.join("temp_audio", filename), audio_content)
+            public_url = self.get_file_url(filename)
+        
+        logger.info(f"Generated ElevenLabs audio: {public_url}")
+        return public_url
+    
     def generate_audio_url(self, text: str, language: str = "English") -> Optional[str]:
-        """Generate audio and return public URL (matches original implementation)"""
-        if not self.api_key or not self.voice_id:
+        """Generate audio and return public URL (blocking - async code uses agenerate_audio_url)"""
+        if not self.is_configured():
             logger.warning("ElevenLabs not configured, using Twilio TTS")
             return None
         
         try:
-            # Generate unique filename based on message content
-            message_hash = hashlib.md5(text.encode()).hexdigest()
-            filename = f"elevenlabs_{message_hash}_{language.lower()}.mp3"
+            # Check if file already exists
+            cached_url = self.get_cached_audio_url(text, language)
+            if cached_url:
+                return cached_url
             
-            # Check if file already exists (using audio_storage if available)
-            if self.audio_storage and self.audio_storage.file_exists(filename):
-                return self.audio_storage.get_file_url(filename)
+            # Another thread is already synthesizing this text - wait for its file
+            filename = self.get_cache_filename(text, language)
+            with self._sync_lock:
+                inflight = self._sync_inflight.get(filename)
+                if inflight is None:
+                    self._sync_inflight[filename] = threading.Event()
+            if inflight is not None:
+                self.coalesced += 1
+                inflight.wait(ELEVENLABS_CONNECT_TIMEOUT_SECONDS + ELEVENLABS_READ_TIMEOUT_SECONDS)
+                return self.get_cached_audio_url(text, language)
             
-            # Fallback: check file system directly
-            file_path = os.path.join("temp_audio", filename)
-            if os.path.exists(file_path):
-                webhook_base = os.getenv("WEBHOOK_BASE_URL", "http://localhost:8000")
-                return f"{webhook_base}/audio/{filename}"
+            try:
+                self.requests += 1
+                url, headers, params, data = self._build_request(text, language)
+                response = self.session.post(
+                    url, json=data, headers=headers, params=params,
+                    timeout=(ELEVENLABS_CONNECT_TIMEOUT_SECONDS, ELEVENLABS_READ_TIMEOUT_SECONDS)
+                )
+                
+                if response.status_code == 200:
+                    return self.save_audio(to_stored(response.content, self.output_format), filename)
+                
+                self.errors += 1
+                logger.error(f"ElevenLabs API error: {response.status_code}")
+                return None
+            finally:
+                with self._sync_lock:
+                    self._sync_inflight.pop(filename).set()
+                
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Error generating ElevenLabs audio: {str(e)}")
+            return None
+    
+    def _get_async_client(self) -> Tuple[httpx.AsyncClient, asyncio.Semaphore]:
+        """Get the pooled async client and concurrency limit of the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            if self._async_client is not None:
+                self._close_stale_client(self._async_client, self._async_loop)
             
-            # Get voice config
-            voice_config = self.voice_configs.get(language, self.voice_configs["English"])
+            http2 = ELEVENLABS_HTTP2 and HTTP2_AVAILABLE
+            if ELEVENLABS_HTTP2 and not HTTP2_AVAILABLE:
+                logger.warning("h2 is not installed, ElevenLabs client falls back to HTTP/1.1")
             
-            # Make API request
-            url = f"{self.base_url}/text-to-speech/{voice_config['voice_id']}"
-            headers = {
-                "Accept": "audio/mpeg",
-                "Content-Type": "application/json",
-                "xi-api-key": self.api_key
-            }
-            data = {
-                "text": text,
-                "model_id": "eleven_multilingual_v2",
-                "voice_settings": voice_config["voice_settings"]
-            }
+            self._async_client = httpx.AsyncClient(
+                http2=http2,
+                limits=httpx.Limits(
+                    max_connections=ELEVENLABS_MAX_CONNECTIONS,
+                    max_keepalive_connections=ELEVENLABS_MAX_CONNECTIONS,
+                    keepalive_expiry=ELEVENLABS_KEEPALIVE_SECONDS
+                ),
+                timeout=httpx.Timeout(ELEVENLABS_READ_TIMEOUT_SECONDS, connect=ELEVENLABS_CONNECT_TIMEOUT_SECONDS)
+            )
+            self._async_loop = loop
+            self._semaphore = asyncio.Semaphore(ELEVENLABS_MAX_CONCURRENCY)
+            logger.info(f"🔌 ElevenLabs client created ({'HTTP/2' if http2 else 'HTTP/1.1'}, {ELEVENLABS_MAX_CONCURRENCY} concurrent requests)")
+        
+        return self._async_client, self._semaphore
+    
+    def _close_stale_client(self, client: httpx.AsyncClient, client_loop: Optional[asyncio.AbstractEventLoop]):
+        """Close the client of another event loop on that loop (its connections belong to it)"""
+        if client_loop is None or not client_loop.is_running():
+            # Loop stopped or closed: the client cannot be closed from here, drop it
+            return
+        asyncio.run_coroutine_threadsafe(client.aclose(), client_loop)
+    
+    def _get_bulk_slots(self) -> asyncio.Semaphore:
+        """Limit of concurrent prefetch/warmup requests in the running event loop (leaves the live reserve free)"""
+        loop = asyncio.get_running_loop()
+        if self._bulk_slots is None or self._bulk_loop is not loop:
+            self._bulk_slots = asyncio.Semaphore(max(1, ELEVENLABS_MAX_CONCURRENCY - ELEVENLABS_LIVE_RESERVED))
+            self._bulk_loop = loop
+        return self._bulk_slots
+    
+    async def agenerate_audio_url(self, text: str, language: str = "English", priority: int = PRIORITY_LIVE) -> Optional[str]:
+        """Generate audio over the shared async client and return public URL
+
+        The synthesis runs on the TTS queue at the given priority (live turn, prefetch or warmup).
+        """
+        if not self.is_configured():
+            logger.warning("ElevenLabs not configured, using Twilio TTS")
+            return None
+        
+        # Check if file already exists
+        cached_url = self.get_cached_audio_url(text, language)
+        if cached_url:
+            return cached_url
+        
+        filename = self.get_cache_filename(text, language)
+        inflight = self._get_inflight(filename)
+        if inflight is not None:
+            self.coalesced += 1
+            if tts_queue.enabled:
+                # A live turn waiting on queued warmup/prefetch work moves it up
+                tts_queue.promote(filename, priority)
+        elif tts_queue.enabled:
+            # The priority is read when a worker starts the job (it may have been promoted meanwhile)
+            inflight = self._start_inflight(filename, tts_queue.submit(
+                filename, lambda: self._asynthesize(text, language, filename, tts_queue.priority_of(filename)), priority
+            ))
+        else:
+            inflight = self._start_inflight(filename, asyncio.ensure_future(self._asynthesize(text, language, filename, priority)))
+        
+        # Shielded: a caller that gives up does not cancel the synthesis others are waiting on
+        return await asyncio.shield(inflight)
+    
+    async def _asynthesize(self, text: str, language: str, filename: str, priority: int = PRIORITY_LIVE) -> Optional[str]:
+        """One ElevenLabs request over the shared async client"""
+        try:
+            self.requests += 1
+            url, headers, params, data = self._build_request(text, language)
+            client, semaphore = self._get_async_client()
             
-            response = requests.post(url, json=data, headers=headers)
+            async def send() -> httpx.Response:
+                async with semaphore:
+                    return await client.post(url, json=data, headers=headers, params=params)
             
-            if response.status_code == 200:
-                # Save audio file using audio_storage if available
-                if self.audio_storage:
-                    public_url = self.audio_storage.save_audio_file(response.content, filename)
-                    logger.info(f"Generated ElevenLabs audio: {public_url}")
-                    return public_url
-                else:
-                    # Fallback: save directly to file system
-                    os.makedirs("temp_audio", exist_ok=True)
-                    with open(file_path, 'wb') as f:
-                        f.write(response.content)
-                    
-                    webhook_base = os.getenv("WEBHOOK_BASE_URL", "http://localhost:8000")
-                    public_url = f"{webhook_base}/audio/{filename}"
-                    logger.info(f"Generated ElevenLabs audio: {public_url}")
-                    return public_url
+            if priority > PRIORITY_LIVE:
+                # Bulk work takes a bulk slot first, so it never holds the requests reserved for live turns
+                async with self._get_bulk_slots():
+                    response = await send()
             else:
-                logger.error(f"ElevenLabs API error: {response.status_code}")
-                return None
-                
+                response = await send()
+            
+            if response.status_code == 200:
+                return self.save_audio(to_stored(response.content, self.output_format), filename)
+            
+            self.errors += 1
+            logger.error(f"ElevenLabs API error: {response.status_code}")
+            return None
+        
         except Exception as e:
-            logger.error(f"Error generating ElevenLabs audio: {str(e)}")
+            self.errors += 1
+            logger.error(f"Error generating ElevenLabs audio: {str(e) or type(e).__name__}")
             return None
+    
+    def _get_inflight(self, filename: str) -> Optional[asyncio.Future]:
+        """In-flight synthesis of a file in the running event loop (if any)"""
+        inflight = self._inflight.get(filename)
+        if inflight is not None and inflight.get_loop() is asyncio.get_running_loop():
+            return inflight
+        return None
+    
+    def _start_inflight(self, filename: str, inflight: asyncio.Future) -> asyncio.Future:
+        """Register a synthesis that concurrent requests for the same file wait on"""
+        self._inflight[filename] = inflight
+        
+        def forget(done: asyncio.Future):
+            if self._inflight.get(filename) is done:
+                del self._inflight[filename]
+        
+        inflight.add_done_callback(forget)
+        return inflight
+    
+    def is_synthesizing(self, filename: str) -> bool:
+        """Whether a synthesis of the file is in flight"""
+        return self._get_inflight(filename) is not None
+    
+    async def wait_for_file(self, filename: str) -> Optional[str]:
+        """Wait for the in-flight synthesis of a file; returns its URL (None if it failed or none is in flight)"""
+        inflight = self._get_inflight(filename)
+        return await asyncio.shield(inflight) if inflight is not None else None
+    
+    async def open_audio_stream(self, text: str, language: str = "English") -> Optional[AudioStream]:
+        """Start streaming synthesis; returns the audio chunks as they arrive (None if the request failed)
+
+        The chunks are also written to a temporary file that is renamed into the audio cache
+        once the whole stream has been received, so a later request is served from the file.
+        A stream nobody starts reading within the read timeout is closed (e.g. Twilio never fetched it).
+        """
+        if not self.is_configured():
+            return None
+        
+        # Requests for the same file made meanwhile wait for this stream (resolves to its URL)
+        filename = self.get_cache_filename(text, language)
+        loop = asyncio.get_running_loop()
+        done = self._start_inflight(filename, loop.create_future())
+        
+        url, headers, params, data = self._build_request(text, language)
+        client, semaphore = self._get_async_client()
+        
+        self.requests += 1
+        try:
+            await semaphore.acquire()
+        except asyncio.CancelledError:
+            done.set_result(None)
+            raise
+        try:
+            request = client.build_request(
+                "POST", f"{url}/stream", json=data, headers=headers,
+                params={**params, "optimize_streaming_latency": ELEVENLABS_STREAM_LATENCY}
+            )
+            response = await client.send(request, stream=True)
+        except asyncio.CancelledError:
+            # The caller went away while connecting (e.g. a media stream hung up) - the slot must not leak
+            semaphore.release()
+            done.set_result(None)
+            raise
+        except Exception as e:
+            semaphore.release()
+            self.errors += 1
+            done.set_result(None)
+            logger.error(f"Error starting ElevenLabs stream: {str(e) or type(e).__name__}")
+            return None
+        
+        if response.status_code != 200:
+            await response.aclose()
+            semaphore.release()
+            self.errors += 1
+            done.set_result(None)
+            logger.error(f"ElevenLabs streaming API error: {response.status_code}")
+            return None
+        
+        released = False
+        
+        async def release():
+            nonlocal released
+            if not released:
+                released = True
+                semaphore.release()
+                await response.aclose()
+            if not done.done():
+                done.set_result(None)
+        
+        stream = AudioStream(self._tee_to_cache(response, filename, done, release), release)
+        
+        def expire():
+            if not stream.started and not stream.closed:
+                logger.warning(f"ElevenLabs stream never read, closing it: {filename}")
+                loop.create_task(stream.aclose())
+        
+        loop.call_later(ELEVENLABS_READ_TIMEOUT_SECONDS, expire)
+        return stream
+    
+    async def _tee_to_cache(self, response: httpx.Response, filename: str, done: asyncio.Future, release: Callable[[], Awaitable[None]]) -> AsyncGenerator[bytes, None]:
+        """Yield the streamed audio while writing it to the cache"""
+        file_path = self.get_audio_path(filename)
+        temp_path = f"{file_path}.{uuid.uuid4().hex}.part"
+        chunks = []
+        completed = False
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            
+            # u-law/PCM streams go out behind a WAV header of unknown length
+            header = stream_header(self.output_format)
+            with open(temp_path, 'wb') as f:
+                if header:
+                    f.write(header)
+                    yield header
+                async for chunk in response.aiter_bytes(STREAM_CHUNK_BYTES):
+                    f.write(chunk)
+                    chunks.append(chunk)
+                    yield chunk
+                
+                if header:
+                    # The length is known now - fix up the size fields of the stored file
+                    header = wav_header(self.output_format, sum(len(chunk) for chunk in chunks))
+                    f.seek(0)
+                    f.write(header)
+            
+            # Only a complete file becomes visible in the cache
+            os.replace(temp_path, file_path)
+            audio = header + b"".join(chunks)
+            if self.audio_storage:
+                self.audio_storage.record_file(filename, audio)
+            audio_cache.put(filename, audio)
+            completed = True
+            logger.info(f"Streamed ElevenLabs audio: {filename}")
+        except Exception as e:
+            logger.error(f"Error streaming ElevenLabs audio: {str(e) or type(e).__name__}")
+        finally:
+            if not completed and os.path.exists(temp_path):
+                os.remove(temp_path)
+            if not done.done():
+                done.set_result(self.get_file_url(filename) if completed else None)
+            await release()
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "configured": self.is_configured(),
+            "output_format": self.output_format,
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "in_flight": len(self._inflight) + len(self._sync_inflight),
+            "warmup": dict(self.warmup_progress)
+        }
+    
+    async def aclose(self):
+        """Close the async client's connections (on application shutdown)"""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+            self._async_loop = None
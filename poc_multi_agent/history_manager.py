@@ -0,0 +1,125 @@
+"""
+Conversation History Manager
+Keeps the LLM prompt within a token budget: the last N turns are sent verbatim,
+older ones are folded into a compact rolling summary next to the collected data
+"""
+
+import os
+import json
+import logging
+from typing import Any, Dict, List
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+
+logger = logging.getLogger(__name__)
+
+# Rough estimate used for budgeting (~4 characters per token)
+CHARS_PER_TOKEN = 4
+
+# Longest snippet kept per folded message
+SUMMARY_SNIPPET_CHARS = 80
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate token count of a text"""
+    return max(1, len(text) // CHARS_PER_TOKEN) if text else 0
+
+
+class HistoryManager:
+    """Builds a bounded prompt from a call session's history"""
+
+    def __init__(self, token_budget: int = 1500, keep_turns: int = 3, summary_max_chars: int = 600, usage_keep_turns: int = 10):
+        self.token_budget = token_budget
+        self.keep_turns = keep_turns
+        self.summary_max_chars = summary_max_chars
+        self.usage_keep_turns = max(1, usage_keep_turns)
+
+    def build_messages(self, system_prompt: str, session: Dict[str, Any]) -> List[Any]:
+        """Build LLM messages for the session's latest turn and record its token usage"""
+        history = session["history"]
+
+        # Keep only the last N turns (caller message + agent reply) verbatim
+        overflow = len(history) - session.get("summarized_count", 0) - self.keep_turns * 2
+        if overflow > 0:
+            self._fold(session, overflow)
+
+        # Fold more messages while over budget (the latest message is always kept)
+        while True:
+            window = history[session.get("summarized_count", 0):]
+            context = self._build_context(session)
+            history_tokens = sum(estimate_tokens(msg["content"]) for msg in window)
+            total_tokens = estimate_tokens(system_prompt) + estimate_tokens(context) + history_tokens
+
+            if total_tokens <= self.token_budget or len(window) <= 1:
+                break
+            self._fold(session, 1)
+
+        messages = [SystemMessage(content=system_prompt)]
+        for msg in window:
+            if msg["role"] == "user":
+                messages.append(HumanMessage(content=msg["content"]))
+            elif msg["role"] == "assistant":
+                messages.append(AIMessage(content=msg["content"]))
+        messages.append(HumanMessage(content=context))
+
+        # Report token usage for this turn - call totals are counters, only the latest turns are kept in detail
+        # (the session is saved in full on every write)
+        usage = session.setdefault("token_usage", [])
+        totals = session.setdefault("token_totals", {"turns": len(usage), "total_tokens": 0})
+        totals["turns"] += 1
+        totals["total_tokens"] += total_tokens
+        token_report = {
+            "turn": totals["turns"],
+            "system_tokens": estimate_tokens(system_prompt),
+            "context_tokens": estimate_tokens(context),
+            "history_tokens": history_tokens,
+            "total_tokens": total_tokens,
+            "verbatim_messages": len(window),
+            "summarized_messages": session.get("summarized_count", 0)
+        }
+        usage.append(token_report)
+        del usage[:-self.usage_keep_turns]
+        logger.info(
+            f"🧮 Prompt tokens (turn {token_report['turn']}): {total_tokens} "
+            f"[system {token_report['system_tokens']}, context {token_report['context_tokens']}, "
+            f"history {history_tokens} in {len(window)} msgs, {token_report['summarized_messages']} summarized]"
+        )
+
+        return messages
+
+    def _build_context(self, session: Dict[str, Any]) -> str:
+        """Context message: rolling summary plus current collected data"""
+        context = ""
+        if session.get("history_summary"):
+            context += f"\nSummary of earlier conversation: {session['history_summary']}"
+        context += f"\nCurrent collected data: {json.dumps(session['collected_data'])}"
+        return context
+
+    def _fold(self, session: Dict[str, Any], count: int):
+        """Fold the oldest `count` verbatim messages into the rolling summary"""
+        start = session.get("summarized_count", 0)
+        folded = session["history"][start:start + count]
+
+        parts = [session.get("history_summary", "")]
+        for msg in folded:
+            speaker = "Caller" if msg["role"] == "user" else "Agent"
+            text = " ".join(msg["content"].split())
+            if len(text) > SUMMARY_SNIPPET_CHARS:
+                text = text[:SUMMARY_SNIPPET_CHARS].rstrip() + "..."
+            parts.append(f"{speaker}: {text}")
+
+        summary = " | ".join(part for part in parts if part)
+        if len(summary) > self.summary_max_chars:
+            # Drop the oldest part of the summary
+            summary = "..." + summary[-self.summary_max_chars:]
+
+        session["history_summary"] = summary
+        session["summarized_count"] = start + len(folded)
+
+
+# Global instance
+history_manager = HistoryManager(
+    token_budget=int(os.getenv("HISTORY_TOKEN_BUDGET", "1500")),
+    keep_turns=int(os.getenv("HISTORY_KEEP_TURNS", "3")),
+    summary_max_chars=int(os.getenv("HISTORY_SUMMARY_MAX_CHARS", "600")),
+    usage_keep_turns=int(os.getenv("HISTORY_TOKEN_USAGE_KEEP_TURNS", "10"))
+)
@@ -0,0 +1,230 @@
+"""
+Incremental JSON Parser for LLM replies
+Reads the reply as it streams and emits each top-level field as soon as its value is complete.
+Skips code fences and any text before the JSON object in the same single pass.
+"""
+
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Event kinds returned by StreamingJSONParser.feed()
+FIELD_DELTA = "delta"   # (FIELD_DELTA, key, text) - new text of a string value still streaming
+FIELD_VALUE = "value"   # (FIELD_VALUE, key, value) - a top-level value is complete
+
+ParserEvent = Tuple[str, str, Any]
+
+JSON_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+WHITESPACE = " \t\r\n"
+
+# Parser states
+SEEK = "seek"                  # before the opening brace (fences, leading text)
+KEY_START = "key_start"        # expecting a key or the closing brace
+KEY = "key"                    # inside a key string
+COLON = "colon"                # expecting ':'
+VALUE_START = "value_start"    # expecting a value
+STRING = "string"              # inside a string value
+LITERAL = "literal"            # inside a number / true / false / null
+NESTED = "nested"              # inside a nested object or array
+VALUE_END = "value_end"        # expecting ',' or the closing brace
+DONE = "done"
+FAILED = "failed"
+
+
+class StreamingJSONParser:
+    """Incremental parser for the JSON object in a (possibly streamed) LLM reply"""
+
+    def __init__(self):
+        self.text = ""
+        self.fields: Dict[str, Any] = {}
+        self.complete = False
+        self.failed = False
+
+        self._state = SEEK
+        self._key: Optional[str] = None
+        self._buffer: List[str] = []
+        self._delta: List[str] = []
+
+        # String decoding
+        self._escape: Optional[str] = None
+        self._high_surrogate: Optional[int] = None
+
+        # Nested value tracking
+        self._depth = 0
+        self._nested_in_string = False
+        self._nested_escape = False
+
+    def feed(self, chunk: str) -> List[ParserEvent]:
+        """Add streamed text; returns the events it completes"""
+        self.text += chunk
+        events: List[ParserEvent] = []
+
+        for char in chunk:
+            if self._state in (DONE, FAILED):
+                break
+            try:
+                self._step(char, events)
+            except ValueError as e:
+                logger.warning(f"Invalid JSON in LLM reply: {str(e)}")
+                self._state = FAILED
+                self.failed = True
+
+        self._flush_delta(events)
+        return events
+
+    def result(self) -> Optional[Dict[str, Any]]:
+        """Get the parsed object (None if no complete object was found)"""
+        return dict(self.fields) if self.complete else None
+
+    def _step(self, char: str, events: List[ParserEvent]):
+        state = self._state
+
+        if state == SEEK:
+            if char == '{':
+                self._state = KEY_START
+
+        elif state == KEY_START:
+            if char in WHITESPACE:
+                return
+            if char == '"':
+                self._buffer = []
+                self._state = KEY
+            elif char == '}':
+                self._finish()
+            else:
+                raise ValueError(f"expected key, got {char!r}")
+
+        elif state == KEY:
+            decoded = self._string_char(char)
+            if decoded is None:
+                self._key = "".join(self._buffer)
+                self._state = COLON
+            else:
+                self._buffer.append(decoded)
+
+        elif state == COLON:
+            if char in WHITESPACE:
+                return
+            if char != ':':
+                raise ValueError(f"expected ':', got {char!r}")
+            self._state = VALUE_START
+
+        elif state == VALUE_START:
+            if char in WHITESPACE:
+                return
+            if char == '"':
+                self._buffer = []
+                self._state = STRING
+            elif char in '{[':
+                self._buffer = [char]
+                self._depth = 1
+                self._nested_in_string = False
+                self._nested_escape = False
+                self._state = NESTED
+            else:
+                self._buffer = [char]
+                self._state = LITERAL
+
+        elif state == STRING:
+            decoded = self._string_char(char)
+            if decoded is None:
+                self._flush_delta(events)
+                self._emit("".join(self._buffer), events)
+            elif decoded:
+                self._buffer.append(decoded)
+                self._delta.append(decoded)
+
+        elif state == LITERAL:
+            if char in WHITESPACE or char in ',}':
+                self._emit(json.loads("".join(self._buffer)), events)
+                self._step(char, events)
+            else:
+                self._buffer.append(char)
+
+        elif state == NESTED:
+            self._buffer.append(char)
+            if self._nested_in_string:
+                if self._nested_escape:
+                    self._nested_escape = False
+                elif char == '\\':
+                    self._nested_escape = True
+                elif char == '"':
+                    self._nested_in_string = False
+            elif char == '"':
+                self._nested_in_string = True
+            elif char in '{[':
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._emit(json.loads("".join(self._buffer)), events)
+
+        elif state == VALUE_END:
+            if char in WHITESPACE:
+                return
+            if char == ',':
+                self._state = KEY_START
+            elif char == '}':
+                self._finish()
+            else:
+                raise ValueError(f"expected ',' or '}}', got {char!r}")
+
+    def _string_char(self, char: str) -> Optional[str]:
+        """Decode one character of a JSON string (None at the closing quote)"""
+        if self._escape is not None:
+            if self._escape == "":
+                if char == 'u':
+                    self._escape = "u"
+                    return ""
+                self._escape = None
+                return JSON_ESCAPES.get(char, char)
+
+            # Collecting \uXXXX
+            self._escape += char
+            if len(self._escape) < 5:
+                return ""
+            code = int(self._escape[1:], 16)
+            self._escape = None
+            return self._code_unit(code)
+
+        if char == '\\':
+            self._escape = ""
+            return ""
+        if char == '"':
+            return None
+        return char
+
+    def _code_unit(self, code: int) -> str:
+        """Combine UTF-16 surrogate pairs from \\u escapes"""
+        if 0xD800 <= code < 0xDC00:
+            self._high_surrogate = code
+            return ""
+        if 0xDC00 <= code < 0xE000 and self._high_surrogate is not None:
+            code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+            self._high_surrogate = None
+        return chr(code)
+
+    def _emit(self, value: Any, events: List[ParserEvent]):
+        self.fields[self._key] = value
+        events.append((FIELD_VALUE, self._key, value))
+        self._buffer = []
+        self._state = VALUE_END
+
+    def _flush_delta(self, events: List[ParserEvent]):
+        if self._delta:
+            events.append((FIELD_DELTA, self._key, "".join(self._delta)))
+            self._delta = []
+
+    def _finish(self):
+        self.complete = True
+        self._state = DONE
+
+
+def parse_llm_reply(content: str) -> Optional[Dict[str, Any]]:
+    """Parse a complete LLM reply in one pass (None if it has no valid JSON object)"""
+    parser = StreamingJSONParser()
+    parser.feed(content)
+    return parser.result()
@@ -0,0 +1,96 @@
+"""
+Async LLM Execution Engine
+Runs LLM calls off the event loop with a per-process concurrency limit
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+class LLMEngine:
+    """Bounded async executor for LLM calls (shared by all entry points in a process)"""
+
+    def __init__(self, max_concurrency: int = 32):
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+        # Metrics
+        self.in_flight = 0
+        self.queue_depth = 0
+        self.peak_queue_depth = 0
+        self.total_calls = 0
+        self.total_errors = 0
+        self.total_wait_seconds = 0.0
+        self.total_llm_seconds = 0.0
+
+    async def _acquire(self) -> float:
+        """Wait for a free slot; returns the time the call started"""
+        queued_at = time.monotonic()
+
+        if self._semaphore.locked():
+            # All slots busy - this caller is queued
+            self.queue_depth += 1
+            self.peak_queue_depth = max(self.peak_queue_depth, self.queue_depth)
+            try:
+                await self._semaphore.acquire()
+            finally:
+                self.queue_depth -= 1
+        else:
+            await self._semaphore.acquire()
+
+        started_at = time.monotonic()
+        self.total_wait_seconds += started_at - queued_at
+        self.in_flight += 1
+        self.total_calls += 1
+        return started_at
+
+    def _release(self, started_at: float):
+        """Free the slot taken by _acquire"""
+        self.total_llm_seconds += time.monotonic() - started_at
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    async def ainvoke(self, llm, messages: List[Any], **kwargs) -> Any:
+        """Invoke the LLM asynchronously, waiting for a free slot if the limit is reached"""
+        started_at = await self._acquire()
+        try:
+            return await llm.ainvoke(messages, **kwargs)
+        except Exception:
+            self.total_errors += 1
+            raise
+        finally:
+            self._release(started_at)
+
+    async def astream(self, llm, messages: List[Any], **kwargs) -> AsyncIterator[str]:
+        """Stream LLM output text, holding a slot until the stream ends"""
+        started_at = await self._acquire()
+        try:
+            async for chunk in llm.astream(messages, **kwargs):
+                yield chunk.content
+        except Exception:
+            self.total_errors += 1
+            raise
+        finally:
+            self._release(started_at)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get concurrency and queue-depth metrics"""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "peak_queue_depth": self.peak_queue_depth,
+            "total_calls": self.total_calls,
+            "total_errors": self.total_errors,
+            "avg_wait_ms": round(self.total_wait_seconds / self.total_calls * 1000, 1) if self.total_calls else 0.0,
+            "avg_llm_ms": round(self.total_llm_seconds / self.total_calls * 1000, 1) if self.total_calls else 0.0
+        }
+
+
+# Global instance - one concurrency limit per process
+llm_engine = LLMEngine(max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "32")))
@@ -0,0 +1,138 @@
+"""
+Shared LLM Client Pool
+One Gemini client per (model, temperature), reused by every conversation and entry point.
+Clients are built inside the running event loop so they get an async gRPC channel.
+"""
+
+import os
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+from langchain_google_genai import ChatGoogleGenerativeAI
+from google.ai.generativelanguage_v1beta.types import Content, Part
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+
+# Most distinct (model, temperature) clients kept open - each holds one connection
+MAX_CLIENTS = int(os.getenv("LLM_POOL_MAX_CLIENTS", "8"))
+
+# "grpc" (default, one multiplexed HTTP/2 channel per client) or "rest"
+GEMINI_TRANSPORT = os.getenv("GEMINI_TRANSPORT") or None
+
+# Open the connections at startup instead of on the first caller's turn
+LLM_WARMUP = os.getenv("LLM_WARMUP", "true").lower() == "true"
+LLM_WARMUP_TIMEOUT_SECONDS = float(os.getenv("LLM_WARMUP_TIMEOUT_SECONDS", "5"))
+
+# Time a dropped client's in-flight requests get to finish before its channel is closed
+LLM_CLOSE_GRACE_SECONDS = float(os.getenv("LLM_CLOSE_GRACE_SECONDS", "10"))
+
+ClientKey = Tuple[str, float]
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class LLMClientPool:
+    """Keyed pool of Gemini chat clients"""
+
+    def __init__(self, api_key: Optional[str] = None, max_clients: int = MAX_CLIENTS):
+        self.api_key = api_key
+        self.max_clients = max_clients
+        self._clients: "OrderedDict[ClientKey, Tuple[ChatGoogleGenerativeAI, Optional[asyncio.AbstractEventLoop]]]" = OrderedDict()
+        self._closing: set = set()
+
+        # Stats
+        self.hits = 0
+        self.created = 0
+        self.evicted = 0
+        self.closed = 0
+        self.warmed = 0
+
+    def get(self, model: str = DEFAULT_MODEL, temperature: float = 0.7) -> ChatGoogleGenerativeAI:
+        """Get the shared client for a model and temperature"""
+        key = (model, round(temperature, 2))
+        loop = _running_loop()
+
+        entry = self._clients.get(key)
+        if entry:
+            client, client_loop = entry
+            # A client built outside (or for another) event loop has no usable async channel
+            if loop is None or client_loop is loop:
+                self._clients.move_to_end(key)
+                self.hits += 1
+                return client
+            self._close(*entry)
+
+        client = ChatGoogleGenerativeAI(
+            model=model,
+            google_api_key=self.api_key or os.getenv("GEMINI_API_KEY"),
+            temperature=temperature,
+            transport=GEMINI_TRANSPORT
+        )
+        self._clients[key] = (client, loop)
+        self._clients.move_to_end(key)
+        self.created += 1
+        logger.info(f"🔌 LLM client created: {model} (temperature {temperature})")
+
+        while len(self._clients) > self.max_clients:
+            _, evicted = self._clients.popitem(last=False)
+            self.evicted += 1
+            self._close(*evicted)
+
+        return client
+
+    def _close(self, client: ChatGoogleGenerativeAI, client_loop: Optional[asyncio.AbstractEventLoop]):
+        """Close the connections of a client dropped from the pool"""
+        self.closed += 1
+        try:
+            client.client.transport.close()
+        except Exception as e:
+            logger.warning(f"Error closing LLM client: {str(e) or type(e).__name__}")
+
+        # The async channel can only be closed on the event loop it was built in
+        if client.async_client is None or client_loop is None or not client_loop.is_running():
+            return
+        close = client.async_client.transport.grpc_channel.close(LLM_CLOSE_GRACE_SECONDS)
+        if client_loop is _running_loop():
+            task = client_loop.create_task(close)
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+        else:
+            asyncio.run_coroutine_threadsafe(close, client_loop)
+
+    async def warmup(self, keys: Iterable[ClientKey]):
+        """Build the clients and open their connections with a token-count request"""
+        for model, temperature in keys:
+            client = self.get(model, temperature)
+            try:
+                if client.async_client:
+                    request = client.async_client.count_tokens(model=client.model, contents=[Content(parts=[Part(text="warmup")])])
+                else:
+                    request = asyncio.to_thread(client.get_num_tokens, "warmup")
+                await asyncio.wait_for(request, LLM_WARMUP_TIMEOUT_SECONDS)
+                self.warmed += 1
+                logger.info(f"🔥 LLM connection warmed: {model} (temperature {temperature})")
+            except Exception as e:
+                logger.warning(f"LLM warmup failed for {model}: {str(e) or type(e).__name__}")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "clients": [f"{model}@{temperature}" for model, temperature in self._clients],
+            "max_clients": self.max_clients,
+            "hits": self.hits,
+            "created": self.created,
+            "evicted": self.evicted,
+            "closed": self.closed,
+            "warmed": self.warmed
+        }
+
+
+# Global instance - shared by all entry points in the process
+llm_pool = LLMClientPool()
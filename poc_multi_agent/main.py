@@ -7,20 +7,22 @@ from fastapi import FastAPI, Request, Form
 from fastapi.responses import Response, FileResponse
 from twilio.rest import Client
 from twilio.twiml.voice_response import VoiceResponse
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage, SystemMessage
+from dotenv import load_dotenv
+
+# Load .env before the local modules below read their settings
+load_dotenv()
+
 from agent_config import AGENT_METADATA
 from elevenlabs_service import ElevenLabsTTS
 from database import CallDatabase
-from dotenv import load_dotenv
+from llm_engine import llm_engine
+from llm_pool import llm_pool
+from json_stream import parse_llm_reply
 import os
-import json
 import logging
 from typing import Optional, Dict, Any
 
-# Load environment variables from .env file
-load_dotenv()
-
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -45,11 +47,11 @@ if not TWILIO_PHONE_NUMBER:
 
 # Initialize services
 twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash",
-    google_api_key=GEMINI_API_KEY,
-    temperature=0.3
-)
+
+# LLM settings (clients come from the shared pool)
+LLM_MODEL = "gemini-2.0-flash"
+LLM_TEMPERATURE = 0.3
+
 elevenlabs_tts = ElevenLabsTTS()
 db = CallDatabase()
 
@@ -165,7 +167,7 @@ async def process_response(CallSid: str = Form(...), SpeechResult: Optional[str]
         db.save_call(CallSid, session)
         
         # Process with LLM
-        llm_response = process_with_llm(session, SpeechResult)
+        llm_response = await process_with_llm(session, SpeechResult)
         
         return handle_llm_response(CallSid, session, llm_response)
     
@@ -184,8 +186,8 @@ def detect_language(speech: str, supported_languages: list) -> str:
         return "English"
 
 
-def process_with_llm(session: Dict, user_input: str) -> Dict[str, Any]:
-    """Process user input with Gemini LLM"""
+async def process_with_llm(session: Dict, user_input: str) -> Dict[str, Any]:
+    """Process user input with Gemini LLM (runs on the shared async engine)"""
     agent_type = session["agent_type"]
     system_prompt = AGENT_METADATA[agent_type]["system_prompt"]
     
@@ -217,14 +219,12 @@ Rules:
             messages.append(HumanMessage(content=msg["content"]))
         
         # Call Gemini
-        response = llm.invoke(messages)
-        
-        # Parse JSON
-        content = response.content.strip()
-        if content.startswith('```json'):
-            content = content.replace('```json', '').replace('```', '').strip()
+        response = await llm_engine.ainvoke(llm_pool.get(LLM_MODEL, LLM_TEMPERATURE), messages)
         
-        result = json.loads(content)
+        # Parse JSON in one pass (tolerates code fences and leading text)
+        result = parse_llm_reply(response.content)
+        if result is None:
+            raise ValueError("No JSON object in LLM response")
         logger.info(f"LLM Response: {result}")
         
         return result
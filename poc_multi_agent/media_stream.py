@@ -0,0 +1,281 @@
+"""
+Media Streams
+Real-time call mode over a Twilio <Connect><Stream> WebSocket: caller audio in, synthesized audio out.
+Caller turns are cut by an energy VAD on the 8 kHz u-law frames and transcribed by a pluggable transcriber.
+"""
+
+import os
+import sys
+import math
+import time
+import array
+import base64
+import asyncio
+import logging
+import itertools
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, Optional
+from langchain_core.messages import HumanMessage
+from audio_formats import wav_header
+from llm_engine import llm_engine
+from llm_pool import llm_pool
+
+logger = logging.getLogger(__name__)
+
+# The only audio Twilio takes back on a media stream
+MEDIA_STREAM_OUTPUT_FORMAT = "ulaw_8000"
+
+# Twilio sends 20 ms frames of 8 kHz u-law (one byte per sample)
+FRAME_BYTES = 160
+FRAME_MS = 20
+
+# A frame is speech when its RMS (16-bit PCM scale) reaches this
+VAD_ENERGY_THRESHOLD = float(os.getenv("VAD_ENERGY_THRESHOLD", "500"))
+
+# Speech must last this long to start an utterance (filters clicks and line noise) ...
+VAD_MIN_SPEECH_MS = int(os.getenv("VAD_MIN_SPEECH_MS", "200"))
+
+# ... and the utterance ends after this much silence, or at the length cap
+VAD_END_SILENCE_MS = int(os.getenv("VAD_END_SILENCE_MS", "700"))
+VAD_MAX_UTTERANCE_SECONDS = float(os.getenv("VAD_MAX_UTTERANCE_SECONDS", "15"))
+
+# Model transcribing caller utterances (Gemini audio understanding)
+MEDIA_STREAM_STT_MODEL = os.getenv("MEDIA_STREAM_STT_MODEL", "gemini-2.0-flash")
+
+
+def _decode_ulaw(byte: int) -> int:
+    """G.711 u-law byte to a 16-bit linear sample"""
+    byte = ~byte & 0xFF
+    exponent = (byte >> 4) & 0x07
+    sample = ((((byte & 0x0F) << 3) + 0x84) << exponent) - 0x84
+    return -sample if byte & 0x80 else sample
+
+
+ULAW_TO_PCM = [_decode_ulaw(byte) for byte in range(256)]
+ULAW_SQUARES = [sample * sample for sample in ULAW_TO_PCM]
+
+
+def ulaw_to_pcm16(audio: bytes) -> bytes:
+    """Decode u-law audio to 16-bit little-endian PCM"""
+    samples = array.array("h", (ULAW_TO_PCM[byte] for byte in audio))
+    if sys.byteorder == "big":
+        samples.byteswap()
+    return samples.tobytes()
+
+
+def frame_energy(frame: bytes) -> float:
+    """RMS of a u-law frame on the 16-bit PCM scale"""
+    if not frame:
+        return 0.0
+    return math.sqrt(sum(ULAW_SQUARES[byte] for byte in frame) / len(frame))
+
+
+class EnergyVAD:
+    """Cuts caller audio into utterances by frame energy"""
+
+    def __init__(
+        self,
+        threshold: float = VAD_ENERGY_THRESHOLD,
+        min_speech_ms: int = VAD_MIN_SPEECH_MS,
+        end_silence_ms: int = VAD_END_SILENCE_MS,
+        max_utterance_seconds: float = VAD_MAX_UTTERANCE_SECONDS
+    ):
+        self.threshold = threshold
+        self.min_speech_frames = max(1, min_speech_ms // FRAME_MS)
+        self.end_silence_frames = max(1, end_silence_ms // FRAME_MS)
+        self.max_utterance_bytes = int(max_utterance_seconds * 1000 / FRAME_MS) * FRAME_BYTES
+
+        # True from the start of an utterance until it ends
+        self.speaking = False
+
+        self._pending = b""
+        self._onset = []
+        self._utterance = bytearray()
+        self._silent_frames = 0
+
+    def feed(self, audio: bytes) -> Optional[bytes]:
+        """Add caller audio; returns the u-law audio of an utterance once it has ended"""
+        self._pending += audio
+        utterance = None
+        while len(self._pending) >= FRAME_BYTES:
+            frame, self._pending = self._pending[:FRAME_BYTES], self._pending[FRAME_BYTES:]
+            utterance = self._feed_frame(frame) or utterance
+        return utterance
+
+    def _feed_frame(self, frame: bytes) -> Optional[bytes]:
+        voiced = frame_energy(frame) >= self.threshold
+
+        if not self.speaking:
+            if not voiced:
+                self._onset = []
+                return None
+            # The frames that started the utterance are part of it
+            self._onset.append(frame)
+            if len(self._onset) >= self.min_speech_frames:
+                self.speaking = True
+                self._utterance = bytearray(b"".join(self._onset))
+                self._onset = []
+                self._silent_frames = 0
+            return None
+
+        self._utterance += frame
+        self._silent_frames = 0 if voiced else self._silent_frames + 1
+        if self._silent_frames < self.end_silence_frames and len(self._utterance) < self.max_utterance_bytes:
+            return None
+
+        self.speaking = False
+        utterance, self._utterance = bytes(self._utterance), bytearray()
+        return utterance
+
+
+class Transcriber(ABC):
+    """Speech-to-text for caller utterances - subclass to plug in another STT service"""
+
+    @abstractmethod
+    async def transcribe(self, audio: bytes, language: Optional[str] = None) -> Optional[str]:
+        """Transcribe 8 kHz u-law audio (None if nothing was said)"""
+
+
+class GeminiTranscriber(Transcriber):
+    """Transcribes with Gemini audio understanding on the shared LLM client pool"""
+
+    def __init__(self, model: str = MEDIA_STREAM_STT_MODEL):
+        self.model = model
+
+    async def transcribe(self, audio: bytes, language: Optional[str] = None) -> Optional[str]:
+        pcm = ulaw_to_pcm16(audio)
+        spoken_in = f" The caller speaks {language}." if language else ""
+        message = HumanMessage(content=[
+            {
+                "type": "text",
+                "text": f"Transcribe this phone call audio.{spoken_in} Reply with the spoken words only, or nothing if no words are spoken."
+            },
+            {"type": "media", "mime_type": "audio/wav", "data": wav_header("pcm_8000", len(pcm)) + pcm}
+        ])
+
+        try:
+            response = await llm_engine.ainvoke(llm_pool.get(self.model, 0.0), [message])
+        except Exception as e:
+            logger.error(f"Error transcribing caller audio: {str(e) or type(e).__name__}")
+            return None
+
+        text = response.content.strip() if isinstance(response.content, str) else ""
+        return text or None
+
+
+class MediaStreamPlayer:
+    """Sends audio back over a Twilio media stream and tracks what the caller has heard (mark events)"""
+
+    def __init__(self, websocket: Any, stream_sid: str):
+        self.websocket = websocket
+        self.stream_sid = stream_sid
+        self.closed = False
+
+        # Marks sent after each reply; Twilio echoes them once the audio before them has played
+        self._marks = itertools.count(1)
+        self._pending_marks = set()
+        self._played = asyncio.Event()
+        self._played.set()
+
+        # Bumped by clear() so a reply still being sent stops
+        self._generation = 0
+        self._sending = False
+
+    def is_playing(self) -> bool:
+        return self._sending or bool(self._pending_marks)
+
+    async def _send(self, message: Dict[str, Any]):
+        await self.websocket.send_json({"streamSid": self.stream_sid, **message})
+
+    async def play(self, chunks: AsyncIterator[bytes]) -> Optional[float]:
+        """Send u-law audio as media messages followed by a mark; returns when the first audio went out
+
+        The chunks are read to the end even after a barge-in, so a streamed synthesis still completes its cache file.
+        """
+        generation = self._generation
+        first_audio_at = None
+        self._sending = True
+        try:
+            async for chunk in chunks:
+                if not chunk or self.closed or generation != self._generation:
+                    continue
+                await self._send({"event": "media", "media": {"payload": base64.b64encode(chunk).decode("ascii")}})
+                if first_audio_at is None:
+                    first_audio_at = time.monotonic()
+        finally:
+            self._sending = False
+
+        if first_audio_at is not None and generation == self._generation and not self.closed:
+            name = f"reply-{next(self._marks)}"
+            self._pending_marks.add(name)
+            self._played.clear()
+            await self._send({"event": "mark", "mark": {"name": name}})
+        return first_audio_at
+
+    def played(self, name: str):
+        """Twilio echoed a mark - the audio before it has been played"""
+        self._pending_marks.discard(name)
+        if not self._pending_marks:
+            self._played.set()
+
+    async def clear(self):
+        """Drop the audio Twilio has buffered but not played yet (the caller talks over the reply)"""
+        self._generation += 1
+        self._pending_marks.clear()
+        self._played.set()
+        await self._send({"event": "clear"})
+
+    async def wait_played(self, timeout: float):
+        """Wait until every reply sent has been played (at most timeout seconds)"""
+        try:
+            await asyncio.wait_for(self._played.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Media stream {self.stream_sid}: playback not confirmed within {timeout:.0f}s")
+
+    async def close(self):
+        """End the stream - Twilio moves on to the TwiML after <Connect>, which ends the call"""
+        if not self.closed:
+            self.closed = True
+            await self.websocket.close()
+
+
+class MediaStreamStats:
+    """Counters of media stream calls"""
+
+    def __init__(self):
+        self.calls = 0
+        self.active_calls = 0
+        self.utterances = 0
+        self.empty_transcripts = 0
+        self.barge_ins = 0
+        self.replies = 0
+        self.total_transcribe_seconds = 0.0
+        self.total_first_audio_seconds = 0.0
+        self.first_audio_replies = 0
+
+    def record_transcription(self, seconds: float, text: Optional[str]):
+        self.utterances += 1
+        self.total_transcribe_seconds += seconds
+        if not text:
+            self.empty_transcripts += 1
+
+    def record_first_audio(self, seconds: float):
+        """Time from the end of the caller's utterance to the first reply audio sent"""
+        self.first_audio_replies += 1
+        self.total_first_audio_seconds += seconds
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "active_calls": self.active_calls,
+            "utterances": self.utterances,
+            "empty_transcripts": self.empty_transcripts,
+            "barge_ins": self.barge_ins,
+            "replies": self.replies,
+            "avg_transcribe_ms": round(self.total_transcribe_seconds / self.utterances * 1000, 1) if self.utterances else 0.0,
+            "avg_first_audio_ms": round(self.total_first_audio_seconds / self.first_audio_replies * 1000, 1) if self.first_audio_replies else 0.0
+        }
+
+
+# Global instance - counters of every media stream call in the process
+media_stream_stats = MediaStreamStats()
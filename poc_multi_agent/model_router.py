@@ -0,0 +1,149 @@
+"""
+Two-Tier Model Router
+Short, low-entropy turns ("yes", "hello", "who is this") go to a faster, cheaper model tier.
+The main model takes over when the fast tier's reply fails validation or contradicts the collected slots.
+"""
+
+import os
+import math
+import time
+import logging
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import ValidationError
+from llm_engine import llm_engine
+from llm_pool import llm_pool
+from json_stream import parse_llm_reply
+from response_cache import normalize_utterance
+
+logger = logging.getLogger(__name__)
+
+MODEL_ROUTING = os.getenv("MODEL_ROUTING", "true").lower() == "true"
+
+FAST_MODEL = os.getenv("LLM_FAST_MODEL", "gemini-2.0-flash-lite")
+MAIN_MODEL = os.getenv("LLM_MAIN_MODEL", "gemini-2.0-flash")
+
+# A turn is simple when it is this short ...
+FAST_MAX_WORDS = int(os.getenv("ROUTER_FAST_MAX_WORDS", "6"))
+
+# ... and its character entropy (bits per character) is at most this
+FAST_MAX_ENTROPY = float(os.getenv("ROUTER_FAST_MAX_ENTROPY", "3.6"))
+
+def char_entropy(text: str) -> float:
+    """Shannon entropy of the text's characters (bits per character)"""
+    if not text:
+        return 0.0
+    counts = Counter(text)
+    return -sum(count / len(text) * math.log2(count / len(text)) for count in counts.values())
+
+
+class ModelTier:
+    """One model tier with its latency and escalation counters"""
+
+    def __init__(self, name: str, model: str, temperature: float, client: Any = None):
+        self.name = name
+        self.model = model
+        self.temperature = temperature
+
+        # Set to stand in another chat model (e.g. a local fake in tests)
+        self.client = client
+
+        self.calls = 0
+        self.errors = 0
+        self.escalations = 0
+        self.total_seconds = 0.0
+
+    def get_client(self):
+        """Get the tier's chat model (pooled Gemini client unless overridden)"""
+        return self.client or llm_pool.get(self.model, self.temperature)
+
+    async def ainvoke(self, messages: List[Any], **kwargs) -> Any:
+        started_at = time.monotonic()
+        self.calls += 1
+        try:
+            return await llm_engine.ainvoke(self.get_client(), messages, **kwargs)
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.total_seconds += time.monotonic() - started_at
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "calls": self.calls,
+            "errors": self.errors,
+            "escalations": self.escalations,
+            "escalation_rate": round(self.escalations / self.calls, 3) if self.calls else 0.0,
+            "avg_latency_ms": round(self.total_seconds / self.calls * 1000, 1) if self.calls else 0.0
+        }
+
+
+class ModelRouter:
+    """Routes each LLM turn to the fast or the main tier"""
+
+    def __init__(self, fast: ModelTier, main: ModelTier, enabled: bool = True):
+        self.fast = fast
+        self.main = main
+        self.enabled = enabled
+
+    def is_simple(self, user_input: str) -> bool:
+        """Whether a caller turn is short and low-entropy enough for the fast tier"""
+        if not self.enabled:
+            return False
+        text = normalize_utterance(user_input)
+        return 0 < len(text.split()) <= FAST_MAX_WORDS and char_entropy(text) <= FAST_MAX_ENTROPY
+
+    def accepts(self, content: str, profile, collected_data: Optional[Dict[str, Any]] = None) -> bool:
+        """Whether a fast-tier reply is valid and confident enough to use
+
+        Low confidence: no JSON, a reply failing the agent's schema, nothing to say back,
+        or a THANK_YOU while required slots are still missing (with the reply's values merged in).
+        """
+        result_dict = parse_llm_reply(content)
+        if result_dict is None:
+            return False
+        try:
+            llm_output = profile.validate_output(result_dict)
+        except ValidationError:
+            return False
+        if llm_output.response_type == "THANK_YOU_RESPONSE":
+            return profile.would_complete(collected_data or {}, result_dict)
+        return bool(llm_output.feedback.strip())
+
+    async def ainvoke(self, messages: List[Any], user_input: str, profile, collected_data: Optional[Dict[str, Any]] = None, **kwargs) -> Tuple[Any, str]:
+        """Invoke the tier for this turn; returns (response, tier name)"""
+        if self.is_simple(user_input):
+            try:
+                response = await self.fast.ainvoke(messages, **kwargs)
+                if self.accepts(response.content, profile, collected_data):
+                    return response, self.fast.name
+                reason = "reply not accepted"
+            except Exception as e:
+                reason = f"error: {str(e)}"
+
+            self.fast.escalations += 1
+            logger.info(f"⬆️ Escalating turn to {self.main.model} ({reason})")
+
+        response = await self.main.ainvoke(messages, **kwargs)
+        return response, self.main.name
+
+    def tier_keys(self) -> List[Tuple[str, float]]:
+        """(model, temperature) of both tiers, for pool warmup"""
+        tiers = [self.main, self.fast] if self.enabled else [self.main]
+        return [(tier.model, tier.temperature) for tier in tiers]
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "fast": self.fast.get_metrics(),
+            "main": self.main.get_metrics()
+        }
+
+
+# Global instance
+model_router = ModelRouter(
+    fast=ModelTier("fast", FAST_MODEL, temperature=0.3),
+    main=ModelTier("main", MAIN_MODEL, temperature=0.7),
+    enabled=MODEL_ROUTING
+)
@@ -0,0 +1,118 @@
+"""
+LLM Response Cache
+Answers repeated small-talk turns ("hello", "who is this", "can you repeat") from memory.
+Keyed on agent type, stage, language, normalized utterance and a hash of the turn's context
+(the question being answered and the slot values collected so far).
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, str, str, str, str]
+
+# Replies that finish collection depend on the caller's own data and are never cached
+UNCACHED_RESPONSE_TYPES = {"THANK_YOU_RESPONSE"}
+
+
+def normalize_utterance(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return " ".join(re.sub(r"[^\w\s']", " ", text.lower()).split())
+
+
+def build_cache_key(agent_type: str, stage: str, language: str, utterance: str, filled_slots: Dict[str, Any], last_assistant_msg: str) -> CacheKey:
+    """Cache key of one caller turn
+
+    "yes" or "can you repeat" depend on the previous assistant message, and replies may restate
+    the caller's values - so both are part of the key, and one caller's reply never reaches another's context.
+    """
+    context = json.dumps([last_assistant_msg, sorted(filled_slots.items())], ensure_ascii=False, default=str)
+    return (agent_type, stage, language, normalize_utterance(utterance), hashlib.sha256(context.encode()).hexdigest())
+
+
+class ResponseCache:
+    """LRU cache with TTL for parsed LLM replies"""
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 3600, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+        # Stats
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: CacheKey) -> Optional[Dict[str, Any]]:
+        """Get a cached reply (None on miss or expiry)"""
+        if not self.enabled:
+            return None
+
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        stored_at, reply = entry
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(reply)
+
+    def put(self, key: CacheKey, reply: Dict[str, Any], slots: Iterable[str] = ()) -> bool:
+        """Cache a reply if it is safe to reuse for other callers; returns True if stored"""
+        if not self.enabled or not key[3]:
+            return False
+        if reply.get("response_type") in UNCACHED_RESPONSE_TYPES:
+            return False
+        if any(reply.get(slot_name) for slot_name in slots):
+            # The caller gave information - the reply is about their data
+            return False
+
+        self._entries[key] = (time.monotonic(), dict(reply))
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return True
+
+    def clear(self):
+        self._entries.clear()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get size and hit-rate stats"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+
+# Global instance - shared by all calls in the process
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000")),
+    ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600")),
+    enabled=os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+)
@@ -0,0 +1,128 @@
+"""
+Segmented TTS
+Voices filled templates (e.g. confirmation messages) from separately cached audio segments.
+The fixed template text is synthesized once per language; only the slot values are new per call.
+"""
+
+import os
+import json
+import asyncio
+import hashlib
+import logging
+from string import Formatter
+from typing import Any, Dict, List, Optional
+from audio_formats import join_clips
+
+logger = logging.getLogger(__name__)
+
+SEGMENTED_TTS = os.getenv("SEGMENTED_TTS", "true").lower() == "true"
+
+
+def _is_spoken(text: str) -> bool:
+    """Whether a fragment has anything to say (not just spaces or punctuation)"""
+    return any(ch.isalnum() for ch in text)
+
+
+def template_fragments(template: str) -> List[str]:
+    """Fixed text fragments of a template (what can be pre-rendered per language)"""
+    return [literal.strip() for literal, _, _, _ in Formatter().parse(template) if _is_spoken(literal)]
+
+
+def split_template(template: str, values: Dict[str, Any]) -> List[str]:
+    """Spoken segments of a filled template, in order: fixed fragments and slot values"""
+    formatter = Formatter()
+    segments = []
+    for literal, field_name, format_spec, conversion in formatter.parse(template):
+        if _is_spoken(literal):
+            segments.append(literal.strip())
+        if field_name is not None:
+            value = formatter.convert_field(formatter.get_field(field_name, (), values)[0], conversion)
+            value = format(value, format_spec or "").strip()
+            if _is_spoken(value):
+                segments.append(value)
+    return segments
+
+
+class SegmentedRenderer:
+    """Renders filled templates by joining the audio of their segments"""
+
+    def __init__(self, tts, enabled: bool = SEGMENTED_TTS):
+        self.tts = tts
+        self.enabled = enabled
+
+        # Stats
+        self.renders = 0
+        self.full_hits = 0
+        self.segments = 0
+        self.segment_hits = 0
+        self.fresh_chars = 0
+        self.total_chars = 0
+
+    async def render(self, template: str, values: Dict[str, Any], language: str = "English") -> Optional[str]:
+        """Get the audio URL of a filled template (None if a segment could not be synthesized)"""
+        if not self.enabled or not self.tts.is_configured():
+            return None
+
+        text = template.format(**values)
+        self.renders += 1
+        self.total_chars += len(text)
+
+        # The same filled message was synthesized whole before
+        cached_url = self.tts.get_cached_audio_url(text, language)
+        if cached_url:
+            self.full_hits += 1
+            return cached_url
+
+        segments = split_template(template, values)
+        if not segments:
+            return None
+
+        # ... or joined from the same segments
+        joined_filename = self.get_joined_filename(segments, language)
+        cached_url = self.tts.get_cached_file_url(joined_filename)
+        if cached_url:
+            self.full_hits += 1
+            return cached_url
+
+        for segment in segments:
+            self.segments += 1
+            if self.tts.get_cached_audio_url(segment, language):
+                self.segment_hits += 1
+            else:
+                self.fresh_chars += len(segment)
+
+        audio_urls = await asyncio.gather(*(self.tts.agenerate_audio_url(segment, language) for segment in segments))
+        if not all(audio_urls):
+            logger.warning(f"Segmented TTS: {audio_urls.count(None)} of {len(segments)} segments failed")
+            return None
+
+        parts = await asyncio.gather(*(
+            asyncio.to_thread(self.tts.read_audio, self.tts.get_cache_filename(segment, language)) for segment in segments
+        ))
+        if not all(parts):
+            return None
+
+        # Every segment has the same output format, so their frames can be concatenated
+        audio = join_clips(parts, self.tts.output_format)
+        logger.info(f"🧩 Segmented TTS: {len(segments)} segments joined ({self.fresh_chars}/{self.total_chars} fresh characters so far)")
+        return await asyncio.to_thread(self.tts.save_audio, audio, joined_filename)
+
+    def get_joined_filename(self, segments: List[str], language: str = "English") -> str:
+        """Cache filename of joined segment audio - sha256 over the segments' own cache keys
+
+        Kept apart from the whole-text key, which stands for a single ElevenLabs synthesis of the text.
+        """
+        keys = [self.tts.get_cache_filename(segment, language) for segment in segments]
+        return f"segmented_{hashlib.sha256(json.dumps(keys).encode()).hexdigest()}{self.tts.file_extension}"
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "renders": self.renders,
+            "full_hits": self.full_hits,
+            "segments": self.segments,
+            "segment_hits": self.segment_hits,
+            "fresh_chars": self.fresh_chars,
+            "total_chars": self.total_chars,
+            "fresh_char_ratio": round(self.fresh_chars / self.total_chars, 3) if self.total_chars else 0.0
+        }
@@ -0,0 +1,138 @@
+"""
+Local Slot Extractor
+Matches slot values (amounts, times, sizes, menu items) with the per-slot rules in agent_config.py.
+Turns where every slot is resolved with high confidence skip the LLM round trip.
+"""
+
+import os
+import re
+import logging
+from typing import Any, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Lowest confidence at which a locally extracted value is trusted
+MIN_CONFIDENCE = float(os.getenv("SLOT_EXTRACT_MIN_CONFIDENCE", "0.9"))
+
+# Confidence of a rule match when the slot config does not set one
+DEFAULT_CONFIDENCE = 0.95
+
+# Several different values for one slot ("500 or 600 rupees")
+AMBIGUOUS_CONFIDENCE = 0.5
+
+# Words that mean the caller is unsure, correcting or asking something - leave those turns to the LLM
+UNCERTAIN_WORDS = {
+    "maybe", "perhaps", "probably", "about", "or", "not", "no", "don't", "dont", "instead",
+    "change", "wrong", "human", "person", "agent", "manager", "what", "why", "how"
+}
+
+SlotMatch = Tuple[str, float]  # (value, confidence)
+
+
+def compile_regex_rule(rule: Dict[str, Any]) -> Callable[[str], List[str]]:
+    """Rule kind "regex": every pattern match is a candidate value"""
+    patterns = [re.compile(pattern, re.IGNORECASE) for pattern in rule["patterns"]]
+
+    def match(text: str) -> List[str]:
+        values = []
+        for pattern in patterns:
+            for found in pattern.finditer(text):
+                values.append(" ".join(found.group(0).split()))
+        return values
+
+    return match
+
+
+def compile_choices_rule(rule: Dict[str, Any]) -> Callable[[str], List[str]]:
+    """Rule kind "choices": canonical value -> spoken aliases, matched as whole words"""
+    patterns = [
+        (value, re.compile(r"\b(?:" + "|".join(re.escape(alias) for alias in aliases) + r")\b", re.IGNORECASE))
+        for value, aliases in rule["choices"].items()
+    ]
+
+    def match(text: str) -> List[str]:
+        return [value for value, pattern in patterns if pattern.search(text)]
+
+    return match
+
+
+# Rule kind -> compiler (register more kinds with register_extractor)
+EXTRACTORS: Dict[str, Callable[[Dict[str, Any]], Callable[[str], List[str]]]] = {
+    "regex": compile_regex_rule,
+    "choices": compile_choices_rule
+}
+
+
+def register_extractor(kind: str, compiler: Callable[[Dict[str, Any]], Callable[[str], List[str]]]):
+    """Add a rule kind; the compiler turns a slot's "extract" config into a matcher"""
+    EXTRACTORS[kind] = compiler
+
+
+class SlotExtractor:
+    """Precompiled local extraction rules for one agent's slots"""
+
+    def __init__(self, slots_config: Dict[str, Dict[str, Any]], min_confidence: float = MIN_CONFIDENCE):
+        self.min_confidence = min_confidence
+        self.rules: Dict[str, Tuple[Callable[[str], List[str]], float]] = {}
+
+        for slot_name, slot_config in slots_config.items():
+            rule = slot_config.get("extract")
+            if not rule:
+                continue
+            if rule["kind"] not in EXTRACTORS:
+                raise ValueError(f"Unknown extractor kind for slot {slot_name}: {rule['kind']}")
+            self.rules[slot_name] = (EXTRACTORS[rule["kind"]](rule), rule.get("confidence", DEFAULT_CONFIDENCE))
+
+    def extract(self, text: str) -> Dict[str, SlotMatch]:
+        """Match every slot with a rule; returns slot -> (value, confidence)"""
+        words = set(re.findall(r"[\w']+", text.lower()))
+        uncertain = "?" in text or bool(words & UNCERTAIN_WORDS)
+
+        matches: Dict[str, SlotMatch] = {}
+        for slot_name, (match, confidence) in self.rules.items():
+            values = list(dict.fromkeys(match(text)))
+            if not values:
+                continue
+            if len(values) > 1:
+                confidence = min(confidence, AMBIGUOUS_CONFIDENCE)
+            if uncertain:
+                confidence *= 0.5
+            matches[slot_name] = (values[0], confidence)
+
+        return matches
+
+    def fill(self, text: str, collected_data: Dict[str, Any]) -> List[str]:
+        """Store high-confidence matches in collected data; returns the slots filled"""
+        filled = []
+        for slot_name, (value, confidence) in self.extract(text).items():
+            if confidence >= self.min_confidence:
+                collected_data[slot_name] = value
+                filled.append(slot_name)
+        return filled
+
+
+class ExtractionStats:
+    """Counters for the local extraction stage"""
+
+    def __init__(self):
+        self.turns = 0
+        self.fast_path_turns = 0
+        self.slots_filled = 0
+
+    def record(self, filled: List[str], fast_path: bool):
+        self.turns += 1
+        self.slots_filled += len(filled)
+        if fast_path:
+            self.fast_path_turns += 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "turns": self.turns,
+            "fast_path_turns": self.fast_path_turns,
+            "slots_filled": self.slots_filled,
+            "fast_path_rate": round(self.fast_path_turns / self.turns, 3) if self.turns else 0.0
+        }
+
+
+# Global instance
+extraction_stats = ExtractionStats()
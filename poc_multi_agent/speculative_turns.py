@@ -0,0 +1,128 @@
+"""
+Speculative Turns
+Starts the LLM turn from Twilio partial speech results while the caller is still finishing.
+The result is reused when the final SpeechResult matches the text the turn was started with.
+"""
+
+import os
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+from response_cache import normalize_utterance
+
+logger = logging.getLogger(__name__)
+
+# Send partialResultCallback on speech gathers and speculate on stable partial text
+SPECULATIVE_TURNS = os.getenv("SPECULATIVE_TURNS", "true").lower() == "true"
+
+# Shortest partial text (in words) worth starting an LLM turn for
+SPECULATIVE_MIN_WORDS = int(os.getenv("SPECULATIVE_MIN_WORDS", "2"))
+
+
+class SpeculativeTurn:
+    """One LLM turn started from partial speech"""
+
+    def __init__(self, text: str, task: asyncio.Task):
+        self.text = text
+        self.key = normalize_utterance(text)
+        self.task = task
+
+
+class SpeculativeTurnManager:
+    """Tracks at most one speculative turn per call"""
+
+    def __init__(self, min_words: int = SPECULATIVE_MIN_WORDS):
+        self.min_words = min_words
+        self.turns: Dict[str, SpeculativeTurn] = {}
+        self._last_partial: Dict[str, str] = {}
+        self._last_final: Dict[str, str] = {}
+
+        # Stats
+        self.started = 0
+        self.reused = 0
+        self.discarded = 0
+
+    def is_stable(self, call_sid: str, stable_text: str, unstable_text: str) -> Optional[str]:
+        """Get the partial text to speculate on (None while the caller is still mid-phrase)
+
+        Partial text counts as stable when Twilio has nothing left in the unstable part,
+        or when the same text arrives twice in a row (the caller has paused).
+        """
+        text = " ".join(f"{stable_text} {unstable_text}".split())
+        partial = normalize_utterance(text)
+        previous = self._last_partial.get(call_sid)
+        self._last_partial[call_sid] = partial
+
+        if len(partial.split()) < self.min_words or partial == self._last_final.get(call_sid):
+            # Too short, or a late callback for the turn that was already answered
+            return None
+        if unstable_text.strip() and partial != previous:
+            return None
+        return text
+
+    def start(self, call_sid: str, text: str, run: Callable[[], Awaitable[Any]]) -> bool:
+        """Start a speculative turn for the text unless one is already running for it"""
+        current = self.turns.get(call_sid)
+        if current and current.key == normalize_utterance(text):
+            return False
+
+        self.cancel(call_sid)
+        self.turns[call_sid] = SpeculativeTurn(text, asyncio.create_task(run()))
+        self.started += 1
+        logger.info(f"🔮 Speculative turn started - CallSid: {call_sid}, Text: {text}")
+        return True
+
+    def take(self, call_sid: str, final_text: str) -> Optional[asyncio.Task]:
+        """Claim the speculative turn if it was started with the final text (cancels it otherwise)
+
+        Claiming is not a reuse yet - the caller reports that with record_reuse() once the result is used.
+        """
+        final = normalize_utterance(final_text)
+        self._last_final[call_sid] = final
+        self._last_partial.pop(call_sid, None)
+
+        turn = self.turns.pop(call_sid, None)
+        if turn is None:
+            return None
+        if turn.key != final:
+            logger.info(f"🔮 Speculative turn discarded - CallSid: {call_sid}, Partial: {turn.text}, Final: {final}")
+            self._discard(turn)
+            return None
+        return turn.task
+
+    def record_reuse(self, call_sid: str):
+        """The claimed turn's result answered the caller"""
+        self.reused += 1
+        logger.info(f"🔮 Speculative turn reused - CallSid: {call_sid}")
+
+    def cancel(self, call_sid: str):
+        """Drop the call's speculative turn (if any)"""
+        turn = self.turns.pop(call_sid, None)
+        if turn:
+            self._discard(turn)
+
+    def end_call(self, call_sid: str):
+        """Forget all state of a finished call"""
+        self.cancel(call_sid)
+        self._last_partial.pop(call_sid, None)
+        self._last_final.pop(call_sid, None)
+
+    def _discard(self, turn: SpeculativeTurn):
+        self.discarded += 1
+        if not turn.task.done():
+            # Frees the LLM slot held by the in-flight call
+            turn.task.cancel()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "enabled": SPECULATIVE_TURNS,
+            "pending": len(self.turns),
+            "started": self.started,
+            "reused": self.reused,
+            "discarded": self.discarded,
+            "reuse_rate": round(self.reused / self.started, 3) if self.started else 0.0
+        }
+
+
+# Global instance
+speculative_turns = SpeculativeTurnManager()
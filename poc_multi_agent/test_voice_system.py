@@ -4,11 +4,23 @@ Tests all components: MongoDB, Twilio, ElevenLabs, LLM
 """
 
 import os
+import shutil
+import atexit
+import asyncio
+import tempfile
 import requests
 from dotenv import load_dotenv
+
+# Audio the tests write (clips and manifest) goes to a scratch directory, not temp_audio/ in the working tree
+os.environ["AUDIO_DIR"] = tempfile.mkdtemp(prefix="voice_test_audio_")
+atexit.register(shutil.rmtree, os.environ["AUDIO_DIR"], ignore_errors=True)
+
 from database import CallDatabase
 from elevenlabs_service import ElevenLabsTTS
 from agent_config import AGENT_METADATA
+from agent_registry import get_agent_profile
+from model_router import ModelRouter, ModelTier
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
 
 load_dotenv()
 
@@ -191,6 +203,8 @@ def test_agent_config():
             # Check required fields
             required_fields = [
                 "system_prompt",
+                "slots",
+                "required_slots",
                 "positive_thank_you_msg",
                 "negative_thank_you_msg",
                 "welcome_msg",
@@ -212,6 +226,446 @@ def test_agent_config():
         return False
 
 
+def test_model_router():
+    """Test fast/main model routing with local fake models"""
+    print("=" * 70)
+    print("🧭 Testing Model Router (fake models)")
+    print("=" * 70)
+    
+    try:
+        fast_reply = '{"response_type": "NEED_MORE_INFO", "feedback": "This is the ERP desk. What are the charges?"}'
+        fast_thank_you = '{"response_type": "THANK_YOU_RESPONSE", "availability_time": "5 pm", "feedback": "Thank you!"}'
+        fast_handover = '{"response_type": "HANDOVER_TO_HUMAN", "feedback": "Connecting you to a colleague."}'
+        main_reply = '{"response_type": "NEED_MORE_INFO", "charge": "500 rupees", "feedback": "Noted. What time are you available?"}'
+        
+        router = ModelRouter(
+            fast=ModelTier("fast", "fake-fast", 0.3, client=FakeListChatModel(responses=[fast_reply, "not json", fast_thank_you, fast_thank_you, fast_handover])),
+            main=ModelTier("main", "fake-main", 0.7, client=FakeListChatModel(responses=[main_reply]))
+        )
+        profile = get_agent_profile("LOGISTICS")
+        
+        async def run_turns():
+            return [
+                await router.ainvoke([], "who is this", profile),
+                await router.ainvoke([], "sorry what", profile),
+                await router.ainvoke([], "the charge for this route is five hundred rupees including loading", profile),
+                # THANK_YOU is taken when the slots agree, escalated while the charge is still missing
+                await router.ainvoke([], "at five pm", profile, {"charge": "500 rupees"}),
+                await router.ainvoke([], "at five pm", profile, {}),
+                await router.ainvoke([], "a human please", profile)
+            ]
+        
+        tiers = [tier for _, tier in asyncio.run(run_turns())]
+        print(f"Tiers used: {tiers}")
+        print(f"Metrics: {router.get_metrics()}")
+        
+        if tiers == ["fast", "main", "main", "fast", "main", "fast"] and router.fast.escalations == 2:
+            print("✅ Simple turns use the fast tier, invalid or inconsistent replies escalate")
+            return True
+        
+        print("❌ Unexpected routing")
+        return False
+        
+    except Exception as e:
+        print(f"❌ Model router test failed: {str(e)}")
+        return False
+
+
+def test_streaming_turn_field_order():
+    """Test streamed turns with Gemini's alphabetical schema order (feedback before response_type and slots)"""
+    print("=" * 70)
+    print("🔀 Testing Streaming Turn Field Order")
+    print("=" * 70)
+    
+    try:
+        import json
+        from turn_pipeline import StreamingTurn
+        
+        class FakeTTS:
+            output_format = "mp3_22050_32"
+            audio_storage = None
+            
+            def __init__(self):
+                self.spoken = []
+            
+            async def agenerate_audio_url(self, text, language="English"):
+                self.spoken.append(text)
+                return f"http://t/audio/{len(self.spoken)}.mp3"
+        
+        async def tokens(reply):
+            text = json.dumps(reply)
+            for start in range(0, len(text), 7):
+                yield text[start:start + 7]
+        
+        async def run_turn(reply, collected_data):
+            profile = get_agent_profile("PIZZA")
+            tts = FakeTTS()
+            turn = StreamingTurn(tts, suppress_feedback=lambda fields: profile.would_complete(collected_data, fields))
+            await turn.run(tokens(dict(sorted(reply.items()))))
+            await asyncio.gather(*turn.segments)
+            return turn, tts
+        
+        # The last slots arrive after the feedback - it must not be spoken (the confirmation is played instead)
+        completing = {
+            "response_type": "NEED_MORE_INFO", "pizza_type": "Veggie", "size": "large",
+            "delivery_address": "12 Main Street", "delivery_time": "7 pm",
+            "feedback": "Great. Anything else you would like to add to the order?"
+        }
+        suppressed_turn, suppressed_tts = asyncio.run(run_turn(completing, {}))
+        
+        # An ordinary question is still spoken, sentence by sentence, once the reply is complete
+        asking = {
+            "response_type": "NEED_MORE_INFO", "pizza_type": "Veggie", "size": None,
+            "delivery_address": None, "delivery_time": None,
+            "feedback": "Veggie it is, a fine choice. Which size would you like for it?"
+        }
+        spoken_turn, spoken_tts = asyncio.run(run_turn(asking, {}))
+        
+        print(f"Suppressed: {suppressed_turn.feedback_suppressed}, spoken: {suppressed_tts.spoken}")
+        print(f"Spoken segments: {spoken_tts.spoken}")
+        
+        if (suppressed_turn.feedback_suppressed and not suppressed_tts.spoken
+                and spoken_tts.spoken == ["Veggie it is, a fine choice.", "Which size would you like for it?"]
+                and spoken_turn.result()["pizza_type"] == "Veggie"):
+            print("✅ Out-of-order replies are held until every field is known")
+            return True
+        
+        print("❌ Unexpected streaming behavior")
+        return False
+        
+    except Exception as e:
+        print(f"❌ Streaming turn test failed: {str(e)}")
+        return False
+
+
+def test_streaming_json_parser():
+    """Test the incremental JSON parser on escapes, \\u surrogate pairs and truncated replies"""
+    print("=" * 70)
+    print("🧩 Testing Streaming JSON Parser")
+    print("=" * 70)
+    
+    try:
+        import json
+        from json_stream import StreamingJSONParser, parse_llm_reply, FIELD_DELTA
+        
+        reply = {
+            "response_type": "NEED_MORE_INFO", "charge": None, "count": 2, "items": [{"note": "a } in a string"}],
+            "feedback": 'Say "hi" to Jürgen 😀\nThen C:\\orders/today.'
+        }
+        # ensure_ascii escapes ü as \u00fc and the emoji as a \ud83d\ude00 surrogate pair
+        text = "Here you go:\n```json\n" + json.dumps(reply) + "\n```"
+        
+        # One character per chunk, so every escape is split across feeds
+        parser = StreamingJSONParser()
+        deltas = []
+        for char in text:
+            deltas += [text for kind, key, text in parser.feed(char) if kind == FIELD_DELTA and key == "feedback"]
+        
+        truncated = StreamingJSONParser()
+        truncated.feed(json.dumps(reply)[:-12])
+        invalid = parse_llm_reply('{"feedback": "ok" "charge": 1}')
+        
+        print(f"Parsed: {parser.result()}")
+        print(f"Feedback deltas: {len(deltas)}, truncated fields: {list(truncated.fields)}, invalid: {invalid}")
+        
+        if (parser.result() == reply and "".join(deltas) == reply["feedback"]
+                and truncated.result() is None and truncated.fields["items"] == reply["items"] and invalid is None):
+            print("✅ Escapes and surrogate pairs decoded, incomplete and invalid replies rejected")
+            return True
+        
+        print("❌ Unexpected parser output")
+        return False
+    
+    except Exception as e:
+        print(f"❌ Streaming JSON parser test failed: {str(e)}")
+        return False
+
+
+def test_slot_extractor():
+    """Test local slot extraction confidence (clear, ambiguous and uncertain replies)"""
+    print("=" * 70)
+    print("🎯 Testing Local Slot Extraction")
+    print("=" * 70)
+    
+    try:
+        from slot_extractor import SlotExtractor, MIN_CONFIDENCE
+        
+        extractor = SlotExtractor(AGENT_METADATA["PIZZA"]["slots"])
+        
+        clear_data = {}
+        clear = extractor.fill("A big veggie pizza at 7:30 pm please", clear_data)
+        ambiguous = extractor.extract("large pepperoni, or small")
+        uncertain = extractor.extract("probably a medium one")
+        question = extractor.extract("is margherita available at 8 pm?")
+        
+        print(f"Clear: {clear_data}")
+        print(f"Ambiguous: {ambiguous}")
+        print(f"Uncertain: {uncertain}, question: {question}")
+        
+        if (clear_data == {"pizza_type": "Veggie", "size": "large", "delivery_time": "7:30 pm"} and sorted(clear) == sorted(clear_data)
+                and ambiguous["size"][1] < MIN_CONFIDENCE
+                and uncertain["size"] == ("medium", 0.475)
+                and all(confidence < MIN_CONFIDENCE for _, confidence in question.values()) and len(question) == 2):
+            print("✅ Clear replies filled locally, ambiguous or uncertain ones left to the LLM")
+            return True
+        
+        print("❌ Unexpected slot extraction")
+        return False
+    
+    except Exception as e:
+        print(f"❌ Slot extractor test failed: {str(e)}")
+        return False
+
+
+def test_response_cache_key():
+    """Test that cached replies are keyed on the turn's context, not just the utterance"""
+    print("=" * 70)
+    print("💾 Testing Response Cache Key")
+    print("=" * 70)
+    
+    try:
+        from response_cache import ResponseCache, build_cache_key
+        
+        question = "What are the charges for this route?"
+        key = build_cache_key("LOGISTICS", "conversation", "English", "Can you repeat?", {"charge": "500 rupees"}, question)
+        
+        same = [
+            build_cache_key("LOGISTICS", "conversation", "English", "  can you REPEAT ", {"charge": "500 rupees"}, question)
+        ]
+        different = [
+            build_cache_key("LOGISTICS", "conversation", "English", "Can you repeat?", {"charge": "600 rupees"}, question),
+            build_cache_key("LOGISTICS", "conversation", "English", "Can you repeat?", {"charge": "500 rupees"}, "What time are you available?"),
+            build_cache_key("LOGISTICS", "conversation", "Hindi", "Can you repeat?", {"charge": "500 rupees"}, question),
+            build_cache_key("PIZZA", "conversation", "English", "Can you repeat?", {"charge": "500 rupees"}, question)
+        ]
+        
+        cache = ResponseCache()
+        cache.put(key, {"response_type": "NEED_MORE_INFO", "feedback": question})
+        
+        print(f"Key: {key}")
+        print(f"Metrics: {cache.get_metrics()}")
+        
+        if all(other == key for other in same) and all(other != key for other in different) and cache.get(same[0]) and not cache.get(different[0]):
+            print("✅ Same turn context shares a key, another question or caller data does not")
+            return True
+        
+        print("❌ Unexpected cache keys")
+        return False
+    
+    except Exception as e:
+        print(f"❌ Response cache key test failed: {str(e)}")
+        return False
+
+
+def test_media_stream():
+    """Test a media stream call end to end against a local fake Twilio stream client"""
+    print("=" * 70)
+    print("🎧 Testing Media Stream Call (fake Twilio client)")
+    print("=" * 70)
+    
+    try:
+        import base64
+        import httpx
+        from starlette.testclient import TestClient
+        from media_stream import Transcriber, MEDIA_STREAM_OUTPUT_FORMAT
+        import agent_voice_conversation as voice_app
+        
+        class FakeTranscriber(Transcriber):
+            async def transcribe(self, audio, language=None):
+                return "the charge is five hundred rupees"
+        
+        # ElevenLabs answers every stream request with a second of u-law audio
+        audio_client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, content=b"\x7f" * 8000)))
+        stream_tts = ElevenLabsTTS(audio_storage=voice_app.audio_storage, output_format=MEDIA_STREAM_OUTPUT_FORMAT)
+        stream_tts.api_key = stream_tts.voice_id = "fake"
+        stream_tts._get_async_client = lambda: (audio_client, asyncio.Semaphore(1))
+        
+        reply = '{"response_type": "NEED_MORE_INFO", "feedback": "Noted. What time are you available?"}'
+        saved = (voice_app.stream_tts, voice_app.media_stream_transcriber, voice_app.model_router.fast.client, voice_app.model_router.main.client)
+        voice_app.stream_tts = stream_tts
+        voice_app.media_stream_transcriber = FakeTranscriber()
+        voice_app.model_router.fast.client = FakeListChatModel(responses=[reply])
+        voice_app.model_router.main.client = FakeListChatModel(responses=[reply])
+        
+        def receive_reply(ws):
+            """Collect media messages up to the reply's mark, then acknowledge it like Twilio does"""
+            audio = b""
+            while True:
+                message = ws.receive_json()
+                if message["event"] == "media":
+                    audio += base64.b64decode(message["media"]["payload"])
+                elif message["event"] == "mark":
+                    ws.send_json({"event": "mark", "streamSid": "MZ-test", "mark": message["mark"]})
+                    return audio
+        
+        def send_audio(ws, frame, count):
+            for _ in range(count):
+                payload = base64.b64encode(frame).decode("ascii")
+                ws.send_json({"event": "media", "streamSid": "MZ-test", "media": {"track": "inbound", "payload": payload}})
+        
+        try:
+            with TestClient(voice_app.app).websocket_connect("/media-stream") as ws:
+                ws.send_json({"event": "connected", "protocol": "Call", "version": "1.0.0"})
+                ws.send_json({"event": "start", "streamSid": "MZ-test", "start": {
+                    "streamSid": "MZ-test", "callSid": "CA-stream-test", "customParameters": {"agent_type": "LOGISTICS"}
+                }})
+                welcome_audio = receive_reply(ws)
+                
+                # 400 ms of loud speech, then 1 s of silence ends the utterance
+                send_audio(ws, b"\x00" * 160, 20)
+                send_audio(ws, b"\xff" * 160, 50)
+                reply_audio = receive_reply(ws)
+                
+                ws.send_json({"event": "stop", "streamSid": "MZ-test"})
+        finally:
+            voice_app.stream_tts, voice_app.media_stream_transcriber, voice_app.model_router.fast.client, voice_app.model_router.main.client = saved
+            
+            # Leave no call state behind for the tests that follow
+            session = voice_app.active_calls.pop("CA-stream-test", None)
+            voice_app.pending_turns.pop("CA-stream-test", None)
+            voice_app.speculative_turns.end_call("CA-stream-test")
+        
+        history = session["history"]
+        print(f"Welcome audio: {len(welcome_audio)} bytes, reply audio: {len(reply_audio)} bytes")
+        print(f"History: {[entry['role'] for entry in history]}")
+        print(f"Metrics: {voice_app.media_stream_stats.get_metrics()}")
+        
+        if welcome_audio and reply_audio and history[1]["content"] == "the charge is five hundred rupees" and len(history) == 3:
+            print("✅ Caller turn transcribed, answered and streamed back")
+            return True
+        
+        print("❌ Unexpected media stream conversation")
+        return False
+        
+    except Exception as e:
+        print(f"❌ Media stream test failed: {str(e)}")
+        return False
+
+
+def test_audio_ranges():
+    """Test clip responses (from memory and from a file): byte ranges, If-Range, multipart, 416 and 304"""
+    print("=" * 70)
+    print("📼 Testing Audio Range Responses")
+    print("=" * 70)
+    
+    try:
+        import httpx
+        from fastapi import FastAPI, Request
+        from audio_response import clip_response, parse_range
+        
+        content = bytes(range(256)) * 4
+        etag = '"range-test"'
+        path = os.path.join(os.environ["AUDIO_DIR"], "range_test.mp3")
+        with open(path, "wb") as f:
+            f.write(content)
+        
+        app = FastAPI()
+        
+        @app.get("/memory")
+        async def from_memory(request: Request):
+            return clip_response(request, len(content), etag, "audio/mpeg", "no-cache", content=content)
+        
+        @app.get("/file")
+        async def from_file(request: Request):
+            return clip_response(request, len(content), etag, "audio/mpeg", "no-cache", path=path)
+        
+        requests_headers = [
+            {"Range": "bytes=100-199"},
+            {"Range": "bytes=0-9,-10"},
+            {"Range": "bytes=2000-"},
+            {"Range": "bytes=0-9", "If-Range": '"stale"'},
+            # If-Range needs a strong match - a weak tag sends the whole clip
+            {"Range": "bytes=0-9", "If-Range": f"W/{etag}"},
+            {"If-None-Match": etag}
+        ]
+        
+        async def run():
+            async with httpx.AsyncClient(app=app, base_url="http://t") as client:
+                return {
+                    source: [await client.get(source, headers=headers) for headers in requests_headers]
+                    for source in ("/memory", "/file")
+                }
+        
+        try:
+            responses = asyncio.run(run())
+        finally:
+            os.remove(path)
+        
+        def as_expected(single, multiple, unsatisfiable, stale, weak, not_modified):
+            return (single.status_code == 206 and single.content == content[100:200]
+                    and single.headers["content-range"] == "bytes 100-199/1024"
+                    and multiple.status_code == 206 and multiple.headers["content-type"].startswith("multipart/byteranges")
+                    and content[:10] in multiple.content and b"Content-Range: bytes 1014-1023/1024" in multiple.content
+                    and unsatisfiable.status_code == 416 and unsatisfiable.headers["content-range"] == "bytes */1024"
+                    and stale.status_code == 200 and stale.content == content
+                    and weak.status_code == 200 and weak.content == content
+                    and not_modified.status_code == 304 and not not_modified.content)
+        
+        parsed = [parse_range("bytes=0-5,3-9,20-", 30), parse_range("bytes=9-1", 30), parse_range("items=0-1", 30)]
+        for source, results in responses.items():
+            print(f"{source}: {[response.status_code for response in results]}")
+        print(f"Parsed ranges: {parsed}")
+        
+        if all(as_expected(*results) for results in responses.values()) and parsed == [[(0, 9), (20, 29)], None, None]:
+            print("✅ Ranges, conditional requests and multipart bodies served from memory and from disk")
+            return True
+        
+        print("❌ Unexpected audio responses")
+        return False
+    
+    except Exception as e:
+        print(f"❌ Audio range test failed: {str(e)}")
+        return False
+
+
+def test_audio_stream_fallback():
+    """Test that a reply is streamed only once ElevenLabs has started, else spoken with Twilio <Say>"""
+    print("=" * 70)
+    print("🔊 Testing Streamed Reply Audio (fake ElevenLabs client)")
+    print("=" * 70)
+    
+    try:
+        import httpx
+        import agent_voice_conversation as voice_app
+        
+        async def run():
+            status = {"code": 200}
+            audio_client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(status["code"], content=b"ID3" + b"\x00" * 4000)))
+            semaphore = asyncio.Semaphore(1)
+            tts = voice_app.elevenlabs_tts
+            saved = (tts.api_key, tts.voice_id, voice_app.TTS_STREAMING)
+            tts.api_key = tts.voice_id = "fake"
+            tts._get_async_client = lambda: (audio_client, semaphore)
+            voice_app.TTS_STREAMING = True
+            try:
+                stream_url = await voice_app.synthesize_within("Your stream test reply is ready.", "English")
+                async with httpx.AsyncClient(app=voice_app.app, base_url="http://t") as client:
+                    played = await client.get(stream_url.replace(voice_app.WEBHOOK_BASE_URL, "")) if stream_url else None
+                    missing = await client.get("/audio-stream/elevenlabs_missing.mp3")
+                
+                status["code"] = 500
+                twiml = await voice_app.generate_twiml("Your failed stream test reply.", "/process-response", "English")
+            finally:
+                tts.api_key, tts.voice_id, voice_app.TTS_STREAMING = saved
+                del tts._get_async_client
+            return played, missing, twiml, semaphore.locked()
+        
+        played, missing, twiml, slot_held = asyncio.run(run())
+        print(f"Streamed: {played.status_code if played else None} ({len(played.content) if played else 0} bytes), miss: {missing.status_code}")
+        print(f"TwiML after a failed stream: {twiml}")
+        
+        if played and played.status_code == 200 and len(played.content) == 4003 and missing.status_code == 404 and "<Say" in twiml and not slot_held:
+            print("✅ Stream played once started, failed stream spoken with Twilio TTS")
+            return True
+        
+        print("❌ Unexpected streamed reply audio")
+        return False
+    
+    except Exception as e:
+        print(f"❌ Streamed reply audio test failed: {str(e)}")
+        return False
+
+
 def test_api_server():
     """Test if API server is running"""
     print("=" * 70)
@@ -267,6 +721,14 @@ def main():
         ("Audio Storage", test_audio_storage),
         ("ElevenLabs TTS", test_elevenlabs),
         ("Agent Configuration", test_agent_config),
+        ("Model Router", test_model_router),
+        ("Streaming Turn Field Order", test_streaming_turn_field_order),
+        ("Streaming JSON Parser", test_streaming_json_parser),
+        ("Local Slot Extraction", test_slot_extractor),
+        ("Response Cache Key", test_response_cache_key),
+        ("Media Stream Call", test_media_stream),
+        ("Audio Range Responses", test_audio_ranges),
+        ("Streamed Reply Audio", test_audio_stream_fallback),
         ("API Server", test_api_server),
         ("Call Initiation", test_start_call)
     ]
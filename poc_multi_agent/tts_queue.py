@@ -0,0 +1,206 @@
+"""
+TTS Job Queue
+Priority worker pool for ElevenLabs synthesis: live turns first, then prefetch, then warmup.
+Jobs are deduplicated by cache key; bulk warmup never occupies every worker.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import itertools
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TTS_QUEUE = os.getenv("TTS_QUEUE", "true").lower() == "true"
+
+# Workers running synthesis jobs (ElevenLabs plans cap concurrent requests)
+TTS_QUEUE_WORKERS = int(os.getenv("TTS_QUEUE_WORKERS", "5"))
+
+# Most workers warmup jobs may hold at once - the rest stay free for live turns
+TTS_QUEUE_BULK_WORKERS = int(os.getenv("TTS_QUEUE_BULK_WORKERS", "3"))
+
+# Priorities (lower runs first)
+PRIORITY_LIVE = 0
+PRIORITY_PREFETCH = 1
+PRIORITY_WARMUP = 2
+
+PRIORITY_NAMES = {PRIORITY_LIVE: "live", PRIORITY_PREFETCH: "prefetch", PRIORITY_WARMUP: "warmup"}
+
+
+class TTSJob:
+    """One synthesis, shared by every submitter of the same cache key"""
+
+    def __init__(self, key: str, run: Callable[[], Awaitable[Any]], priority: int, future: asyncio.Future):
+        self.key = key
+        self.run = run
+        self.priority = priority
+        self.future = future
+        self.submitted_at = time.monotonic()
+        self.started = False
+        self.bulk_slot = False
+
+
+class TTSQueue:
+    """Priority queue of TTS jobs served by a fixed worker pool"""
+
+    def __init__(self, workers: int = TTS_QUEUE_WORKERS, bulk_workers: int = TTS_QUEUE_BULK_WORKERS, enabled: bool = TTS_QUEUE):
+        self.workers = workers
+        self.bulk_workers = max(1, min(bulk_workers, workers - 1)) if workers > 1 else 1
+        self.enabled = enabled
+
+        # Bound to the running event loop on first submit
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._bulk_slots: Optional[asyncio.Semaphore] = None
+        self._tasks: List[asyncio.Task] = []
+        self._admitting: set = set()
+        self._jobs: Dict[str, TTSJob] = {}
+        self._seq = itertools.count()
+
+        # Stats per priority name
+        self.submitted = {name: 0 for name in PRIORITY_NAMES.values()}
+        self.completed = {name: 0 for name in PRIORITY_NAMES.values()}
+        self.total_wait = {name: 0.0 for name in PRIORITY_NAMES.values()}
+        self.max_wait = {name: 0.0 for name in PRIORITY_NAMES.values()}
+        self.deduplicated = 0
+        self.promoted = 0
+        self.failed = 0
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+
+        # First use, or a new event loop (the old loop's workers are gone)
+        self._loop = loop
+        self._queue = asyncio.PriorityQueue()
+        self._bulk_slots = asyncio.Semaphore(self.bulk_workers)
+        self._jobs = {}
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"🧵 TTS queue started: {self.workers} workers ({self.bulk_workers} for warmup)")
+
+    def submit(self, key: str, run: Callable[[], Awaitable[Any]], priority: int = PRIORITY_LIVE) -> asyncio.Future:
+        """Queue a job (or join the pending one with the same key); returns the future of its result"""
+        self._ensure_started()
+        self.submitted[PRIORITY_NAMES[priority]] += 1
+
+        job = self._jobs.get(key)
+        if job is not None:
+            self.deduplicated += 1
+            self.promote(key, priority)
+            return job.future
+
+        job = TTSJob(key, run, priority, self._loop.create_future())
+        self._jobs[key] = job
+        if priority >= PRIORITY_WARMUP:
+            task = asyncio.create_task(self._admit_bulk(job))
+            self._admitting.add(task)
+            task.add_done_callback(self._admitting.discard)
+        else:
+            self._enqueue(job, priority)
+        return job.future
+
+    def priority_of(self, key: str) -> int:
+        """Current priority of a pending or running job (live if there is none)"""
+        job = self._jobs.get(key)
+        return job.priority if job is not None else PRIORITY_LIVE
+
+    def promote(self, key: str, priority: int):
+        """Move a job that has not started yet up to a more urgent priority"""
+        job = self._jobs.get(key)
+        if job is None or job.started or priority >= job.priority:
+            return
+        # The old queue entry is skipped when it comes up
+        self.promoted += 1
+        self._enqueue(job, priority)
+
+    def _enqueue(self, job: TTSJob, priority: int):
+        job.priority = priority
+        self._queue.put_nowait((priority, next(self._seq), job))
+
+    async def _admit_bulk(self, job: TTSJob):
+        """Queue a warmup job once a bulk slot is free"""
+        await self._bulk_slots.acquire()
+        if job.started or job.priority < PRIORITY_WARMUP:
+            # Promoted and queued as live/prefetch meanwhile
+            self._bulk_slots.release()
+            return
+        job.bulk_slot = True
+        self._enqueue(job, job.priority)
+
+    async def _worker(self):
+        while True:
+            _, _, job = await self._queue.get()
+            if job.started:
+                continue
+            job.started = True
+
+            name = PRIORITY_NAMES[job.priority]
+            wait = time.monotonic() - job.submitted_at
+            self.total_wait[name] += wait
+            self.max_wait[name] = max(self.max_wait[name], wait)
+
+            try:
+                result = await job.run()
+                if not job.future.done():
+                    job.future.set_result(result)
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"TTS job failed ({job.key}): {str(e) or type(e).__name__}")
+                if not job.future.done():
+                    job.future.set_exception(e)
+            finally:
+                self.completed[name] += 1
+                if job.bulk_slot:
+                    self._bulk_slots.release()
+                if self._jobs.get(job.key) is job:
+                    del self._jobs[job.key]
+
+    def depth(self) -> Dict[str, int]:
+        """Jobs waiting to start, per priority"""
+        depth = {name: 0 for name in PRIORITY_NAMES.values()}
+        for job in self._jobs.values():
+            if not job.started:
+                depth[PRIORITY_NAMES[job.priority]] += 1
+        return depth
+
+    async def aclose(self):
+        """Stop the workers (on application shutdown); jobs that never finished resolve to None"""
+        jobs = list(self._jobs.values())
+        tasks = self._tasks + list(self._admitting)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        # Callers awaiting a job must not hang
+        for job in jobs:
+            if not job.future.done():
+                job.future.set_result(None)
+        self._tasks = []
+        self._admitting = set()
+        self._jobs = {}
+        self._loop = None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "workers": self.workers,
+            "bulk_workers": self.bulk_workers,
+            "depth": self.depth(),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "deduplicated": self.deduplicated,
+            "promoted": self.promoted,
+            "failed": self.failed,
+            "avg_wait_ms": {
+                name: round(self.total_wait[name] / self.completed[name] * 1000, 1) if self.completed[name] else 0.0
+                for name in PRIORITY_NAMES.values()
+            },
+            "max_wait_ms": {name: round(wait * 1000, 1) for name, wait in self.max_wait.items()}
+        }
+
+
+# Global instance - shared by every TTS caller in the process
+tts_queue = TTSQueue()
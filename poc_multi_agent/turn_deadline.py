@@ -0,0 +1,79 @@
+"""
+Turn Deadline
+Latency budget for one caller turn, shared by the LLM, TTS and database calls of that turn.
+When the budget runs out the turn degrades to a fallback, which is recorded on the call.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Dict, List, Optional
+from agent_config import AGENT_METADATA
+
+logger = logging.getLogger(__name__)
+
+# Budget used when an agent does not configure one for the stage
+DEFAULT_TURN_BUDGET_SECONDS = float(os.getenv("TURN_BUDGET_SECONDS", "8"))
+
+# Time kept back from the LLM so the reply can still be voiced
+TTS_RESERVE_SECONDS = float(os.getenv("TURN_TTS_RESERVE_SECONDS", "1.5"))
+
+# Below this much remaining budget, ElevenLabs is skipped for Twilio <Say>
+MIN_TTS_SECONDS = float(os.getenv("TURN_MIN_TTS_SECONDS", "0.5"))
+
+# Below this much remaining budget, call writes go to the background
+DB_WRITE_RESERVE_SECONDS = float(os.getenv("TURN_DB_WRITE_RESERVE_SECONDS", "0.3"))
+
+# Latest fallbacks kept in detail per call (all of them are counted)
+FALLBACKS_KEEP = int(os.getenv("TURN_FALLBACKS_KEEP", "20"))
+
+# Fallback names recorded in session["fallbacks"]
+FALLBACK_REPROMPT = "reprompt"
+FALLBACK_TWILIO_SAY = "twilio_say"
+FALLBACK_DEFERRED_DB_WRITE = "deferred_db_write"
+
+
+def get_turn_budget(agent_type: str, stage: str) -> float:
+    """Get the turn budget (seconds) of an agent's stage from agent_config.py"""
+    budgets = AGENT_METADATA.get(agent_type, {}).get("turn_budget_seconds", {})
+    return float(budgets.get(stage, budgets.get("default", DEFAULT_TURN_BUDGET_SECONDS)))
+
+
+class TurnDeadline:
+    """Deadline of one turn; fallbacks taken are appended to the call's fallback list and counted"""
+
+    def __init__(self, budget_seconds: float, fallbacks: List[Dict[str, Any]], stage: str = "", fallback_counts: Optional[Dict[str, int]] = None):
+        self.budget_seconds = budget_seconds
+        self.stage = stage
+        self.fallbacks = fallbacks
+        self.fallback_counts = fallback_counts if fallback_counts is not None else {}
+        self._started_at = time.monotonic()
+        self._expires_at = self._started_at + budget_seconds
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self._started_at
+
+    def remaining(self, reserve: float = 0.0) -> float:
+        """Seconds left, keeping `reserve` seconds (at most half the budget) back for later steps"""
+        reserve = min(reserve, self.budget_seconds / 2)
+        return max(0.0, self._expires_at - time.monotonic() - reserve)
+
+    async def run(self, awaitable: Awaitable[Any], reserve: float = 0.0) -> Any:
+        """Await within the remaining budget (raises asyncio.TimeoutError when it runs out)"""
+        return await asyncio.wait_for(awaitable, timeout=self.remaining(reserve))
+
+    def record_fallback(self, fallback: str, reason: str):
+        """Record that the turn degraded to a fallback"""
+        self.fallbacks.append({
+            "stage": self.stage,
+            "fallback": fallback,
+            "reason": reason,
+            "elapsed_ms": round(self.elapsed() * 1000),
+            "budget_ms": round(self.budget_seconds * 1000),
+            "at": datetime.utcnow().isoformat()
+        })
+        del self.fallbacks[:-max(1, FALLBACKS_KEEP)]
+        self.fallback_counts[fallback] = self.fallback_counts.get(fallback, 0) + 1
+        logger.warning(f"⏱️ Turn budget fallback: {fallback} ({reason}) after {self.elapsed():.2f}s of {self.budget_seconds:.1f}s")
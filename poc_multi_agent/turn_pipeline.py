@@ -0,0 +1,221 @@
+"""
+Streaming Turn Pipeline
+Reads LLM tokens as they arrive, pulls out the feedback, splits it into sentences
+and starts TTS on each sentence while the rest is still being generated
+"""
+
+import os
+import re
+import time
+import uuid
+import asyncio
+import logging
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, Dict, List, Optional
+from json_stream import StreamingJSONParser, FIELD_DELTA, FIELD_VALUE
+from audio_formats import payload, stream_header
+
+logger = logging.getLogger(__name__)
+
+# Only NEED_MORE_INFO feedback is spoken to the caller; other response types
+# are answered with configured messages (confirmation, negative thank-you)
+SPOKEN_RESPONSE_TYPE = "NEED_MORE_INFO"
+
+# Nothing after this decision is used, so the stream is stopped as soon as it arrives
+EARLY_EXIT_RESPONSE_TYPE = "HANDOVER_TO_HUMAN"
+
+# Very short sentences ("Sure.") are merged with the next one
+MIN_SEGMENT_CHARS = int(os.getenv("TTS_MIN_SEGMENT_CHARS", "20"))
+
+SENTENCE_BOUNDARY = re.compile(r'[.!?।]+[\'")\]]*(?=\s)')
+
+
+class SentenceSplitter:
+    """Split incrementally arriving text at sentence boundaries"""
+
+    def __init__(self, min_chars: int = MIN_SEGMENT_CHARS):
+        self.min_chars = min_chars
+        self.buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        """Add text; returns the sentences completed so far"""
+        self.buffer += text
+        sentences = []
+        start = 0
+
+        for match in SENTENCE_BOUNDARY.finditer(self.buffer):
+            candidate = self.buffer[start:match.end()].strip()
+            if len(candidate) >= self.min_chars:
+                sentences.append(candidate)
+                start = match.end()
+
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def flush(self) -> Optional[str]:
+        """Return whatever text is left at the end of the stream"""
+        remainder = self.buffer.strip()
+        self.buffer = ""
+        return remainder or None
+
+
+class StreamingTurn:
+    """One streamed LLM turn whose feedback is synthesized sentence by sentence"""
+
+    def __init__(self, tts, language: str = "English", suppress_feedback: Optional[Callable[[Dict[str, Any]], bool]] = None):
+        self.turn_id = uuid.uuid4().hex
+        self.tts = tts
+        self.language = language
+
+        # Called with the fields parsed before the feedback; True keeps the feedback silent
+        self._suppress_feedback = suppress_feedback
+        self.feedback_suppressed = False
+        self._feedback_started = False
+
+        # The feedback came before response_type (e.g. schema order): nothing is spoken until the reply is complete
+        self._out_of_order = False
+
+        self.response_type: Optional[str] = None
+        self.finished = False
+        self.finished_at: Optional[float] = None
+        self.stopped_early = False
+
+        # sentences[i] is synthesized by segments[i] (resolves to audio URL or None)
+        self.sentences: List[str] = []
+        self.segments: List[asyncio.Task] = []
+
+        self.parser = StreamingJSONParser()
+        self._splitter = SentenceSplitter()
+        self._held: List[str] = []
+        self._changed = asyncio.Event()
+
+    @property
+    def content(self) -> str:
+        """Raw LLM reply received so far"""
+        return self.parser.text
+
+    async def run(self, token_stream: AsyncGenerator[str, None]) -> str:
+        """Consume the LLM token stream; returns the full raw reply"""
+        try:
+            async for token in token_stream:
+                sentences = []
+                for kind, key, value in self.parser.feed(token):
+                    if key == "feedback" and not self._feedback_started:
+                        self._on_feedback_start()
+                    if kind == FIELD_DELTA and key == "feedback":
+                        sentences.extend(self._splitter.feed(value))
+                    elif kind == FIELD_VALUE and key == "response_type":
+                        self.response_type = value
+                        self._changed.set()
+
+                self._dispatch(sentences)
+
+                if self.response_type == EARLY_EXIT_RESPONSE_TYPE:
+                    logger.info(f"⏹️ {self.response_type} decided early - stopping LLM stream for turn {self.turn_id}")
+                    self.stopped_early = True
+                    break
+
+            if self.stopped_early:
+                # Release the LLM slot now instead of when the generator is collected
+                await token_stream.aclose()
+
+            if self._out_of_order and not self.stopped_early:
+                # Every field is known now - decide on the feedback with all of them
+                self._out_of_order = False
+                self._on_feedback_start()
+
+            tail = self._splitter.flush()
+            self._dispatch([tail] if tail else [])
+        finally:
+            self.finished = True
+            self.finished_at = time.monotonic()
+            self._changed.set()
+
+        return self.content
+
+    def result(self) -> Optional[Dict[str, Any]]:
+        """Get the parsed reply (None if the LLM did not return a JSON object)"""
+        if self.stopped_early:
+            return {"feedback": "", **self.parser.fields}
+        return self.parser.result()
+
+    def _on_feedback_start(self):
+        """The fields before the feedback are complete - decide whether it is spoken"""
+        self._feedback_started = True
+        if self.response_type is None:
+            # Slots may still follow the feedback - the decision waits for the end of the reply
+            self._out_of_order = True
+            return
+        if self._suppress_feedback and self._suppress_feedback(self.parser.fields):
+            logger.info(f"🔇 Feedback of turn {self.turn_id} not spoken")
+            self.feedback_suppressed = True
+            self._changed.set()
+
+    def _dispatch(self, sentences: List[str]):
+        """Start TTS for sentences once we know the feedback will be spoken"""
+        self._held.extend(sentences)
+
+        if self.response_type != SPOKEN_RESPONSE_TYPE or self.feedback_suppressed or self._out_of_order or not self._held:
+            return
+
+        for sentence in self._held:
+            self.sentences.append(sentence)
+            self.segments.append(asyncio.create_task(self._synthesize(sentence)))
+            logger.info(f"🔊 TTS segment {len(self.segments)} started: {sentence[:60]}")
+
+        self._held = []
+        self._changed.set()
+
+    async def _synthesize(self, text: str) -> Optional[str]:
+        """Synthesize one sentence over the shared async TTS client"""
+        return await self.tts.agenerate_audio_url(text, self.language)
+
+    async def _wait_for_change(self):
+        self._changed.clear()
+        await self._changed.wait()
+
+    async def wait_for_first_segment(self) -> Optional[str]:
+        """Wait for the first audio segment (None if nothing will be streamed)"""
+        while True:
+            if self.segments:
+                return await self.segments[0]
+
+            if self.finished or self.feedback_suppressed or (self.response_type and self.response_type != SPOKEN_RESPONSE_TYPE):
+                return None
+
+            await self._wait_for_change()
+
+    async def collect_audio_urls(self) -> Optional[List[str]]:
+        """Get all segment URLs once the turn is done (None if any segment failed)"""
+        if not self.segments:
+            return None
+
+        urls = await asyncio.gather(*self.segments)
+        if not all(urls):
+            return None
+        return list(urls)
+
+    async def iter_remaining_audio(self) -> AsyncIterator[bytes]:
+        """Yield audio for segments after the first, as each one is synthesized"""
+        # One continuous stream: a single (WAV) header, then each segment's frames
+        header = stream_header(self.tts.output_format)
+        if header:
+            yield header
+
+        index = 1
+        while True:
+            if index < len(self.segments):
+                audio_url = await self.segments[index]
+                if audio_url and self.tts.audio_storage:
+                    filename = self.tts.get_cache_filename(self.sentences[index], self.language)
+                    audio_content = self.tts.audio_storage.read_audio_file(filename)
+                    if audio_content:
+                        yield payload(audio_content, self.tts.output_format)
+                else:
+                    logger.warning(f"Skipping failed TTS segment {index + 1} of turn {self.turn_id}")
+                index += 1
+                continue
+
+            if self.finished:
+                return
+
+            await self._wait_for_change()